@@ -3,20 +3,25 @@
 # run by (streamlit run app.py)
 import streamlit as st
 import requests
-from bs4 import BeautifulSoup
-from openai import OpenAI
 import json
 import os
 from dotenv import load_dotenv
-import tempfile
-import shutil
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
+import time
+from driver_binary import get_chrome_service
+from driver_pool import get_driver_pool
+from fetcher import fetch_static, fetch_in_browser, domain_of
+from text_extract import clean_html
+from document import Document
+from context_packing import pack_for_extraction
+from retrieval import RetrievalIndex
+from json_stream import stream_json_fields
+from structured_data import harvest, merge_prefilled, reduce_extraction
+from resilience import budget_scope, call_with_retries
+from json_repair import load_llm_json
+from instrumentation import traced, start_metrics_server
+from http_cache import remember_page_text, remembered_structured
+from llm_gateway import get_gateway
+from extraction_cache import ExtractionCache, get_extraction_cache
 
 
 load_dotenv()
@@ -29,11 +34,8 @@ if not GAIA_DOMAIN_URL or not OPENAI_API_KEY or not model:
     st.error("⚠ Missing GAIA_DOMAIN_URL, GAIA_API_KEY, or MODEL in your .env file!")
     st.stop()
 
-client = OpenAI(
-    base_url=f"{GAIA_DOMAIN_URL}/v1",
-    api_key=OPENAI_API_KEY,
-    timeout=90.0
-)
+client = get_gateway(f"{GAIA_DOMAIN_URL}/v1", OPENAI_API_KEY, timeout=90.0)
+start_metrics_server()  # no-op unless GAIA_METRICS_PORT is set; safe on every rerun
 
 UNIVERSAL_SYSTEM_PROMPT = """ """
 
@@ -52,60 +54,46 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
+@traced("fetch_page")
 def get_text_from_url(url, service_obj, max_bytes_to_read=100 * 1024 * 1024, retries=3, initial_timeout=20):
-    temp_dir = tempfile.mkdtemp()
-    temp_file_path = os.path.join(temp_dir, 'extracted_content.txt')
-
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/91 Safari/537.36'
-    }
-
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--window-size=1920,1080")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--incognito")
-    chrome_options.add_argument(f"user-agent={headers['User-Agent']}")
-    chrome_options.add_argument("--log-level=3")
-
-    for attempt in range(retries):
-        try:
-            driver = webdriver.Chrome(service=service_obj, options=chrome_options)
-            driver.set_page_load_timeout(initial_timeout)
-            driver.get(url)
-
-            WebDriverWait(driver, initial_timeout * 2).until(
-                EC.presence_of_element_located((By.TAG_NAME, "body"))
-            )
+    fetch_start = time.perf_counter()
+    page_source, text_content = fetch_static(url)
+    served_over_http = page_source is not None
+    if page_source is None and text_content is None:
+        pool = get_driver_pool(service_obj)
 
-            soup = BeautifulSoup(driver.page_source, 'html.parser')
+        def load_in_browser():
+            return fetch_in_browser(pool, url, initial_timeout)
 
-            for tag in soup(['script', 'style', 'header', 'footer', 'nav', 'aside', 'noscript']):
-                tag.decompose()
-
-            text_content = ' '.join(soup.get_text(separator=' ', strip=True).split())
+        try:
+            page_source = call_with_retries(load_in_browser, domain_of(url), attempts=retries)
+        except Exception as e:
+            st.error(f"❌ Failed to fetch content: {e}")
+            return None
+
+    timings = {"fetch": round(time.perf_counter() - fetch_start, 3)}
+    structured = {}
+    if text_content is not None:
+        source = "not_modified"
+        structured = remembered_structured(url)
+    else:
+        structured = harvest(page_source)
+        source = "http" if served_over_http else "browser"
+        clean_start = time.perf_counter()
+        text_content = clean_html(page_source)
+        timings["clean"] = round(time.perf_counter() - clean_start, 3)
 
-            if len(text_content.encode('utf-8')) > max_bytes_to_read:
-                text_content = text_content[:max_bytes_to_read]
+        if len(text_content.encode('utf-8')) > max_bytes_to_read:
+            text_content = text_content[:max_bytes_to_read]
 
-            with open(temp_file_path, 'w', encoding='utf-8') as f:
-                f.write(text_content)
+        if served_over_http:
+            remember_page_text(url, text_content, structured)
 
-            return temp_file_path
-        except Exception as e:
-            if attempt == retries - 1:
-                st.error(f"❌ Failed to fetch content after {retries} attempts: {e}")
-                return None
-        finally:
-            if 'driver' in locals():
-                driver.quit()
-    return None
+    return Document(url, text_content, source, timings, structured=structured)
 
 def safe_chat_completion(messages, response_format=None):
     try:
-        completion = client.chat.completions.create(
+        completion = client.chat(
             model=model,
             messages=messages,
             response_format=response_format
@@ -115,27 +103,54 @@ def safe_chat_completion(messages, response_format=None):
         st.error(f"❌ API request failed: {e}")
         return None
 
-def extract_info_with_gaia_agent(temp_file_path: str):
-    with open(temp_file_path, 'r', encoding='utf-8') as f:
-        text_content = f.read()
-
-    user_message_extraction = f"Extract information from the following web page content:\n\n{text_content[:8000]}..."
-
-    completion = safe_chat_completion(
-        [
-            {"role": "system", "content": UNIVERSAL_SYSTEM_PROMPT},
-            {"role": "user", "content": user_message_extraction},
-        ],
-        response_format=None
-    )
-
-    if not completion:
-        return None, None
+def safe_stream_chat(messages, response_format=None):
+    try:
+        yield from client.stream_chat(model=model, messages=messages, response_format=response_format)
+    except Exception as e:
+        st.error(f"❌ API request failed: {e}")
 
-    llm_response_content = completion.choices[0].message.content or ""
+@traced("extract_page")
+def extract_info_with_gaia_agent(document: Document, on_field=None):
+    text_content = document.text
+
+    # JSON-LD / microdata / OpenGraph fields first; the AI is only asked for what they leave out.
+    prefilled, remaining = reduce_extraction(document.structured)
+    if on_field:
+        for key, value in prefilled.items():
+            on_field(key, value)
+    if prefilled and remaining is None:
+        return prefilled, text_content
+    system_prompt = remaining.prompt if prefilled else UNIVERSAL_SYSTEM_PROMPT
+
+    user_message_extraction = f"Extract information from the following web page content:\n\n{pack_for_extraction(text_content, system_prompt)}..."
+
+    cache = get_extraction_cache()
+    cache_key = ExtractionCache.make_key(user_message_extraction, model, system_prompt)
+    if cache:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return merge_prefilled(prefilled, cached), text_content
+
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_message_extraction},
+    ]
+    if on_field:
+        llm_response_content, _ = stream_json_fields(safe_stream_chat(messages), on_field)
+        if not llm_response_content:
+            return None, None
+    else:
+        completion = safe_chat_completion(messages, response_format=None)
+        if not completion:
+            return None, None
+        llm_response_content = completion.choices[0].message.content or ""
 
     try:
-        extracted_info_dict = json.loads(llm_response_content)
+        extracted_info_dict = load_llm_json(llm_response_content, client.chat, model)
+        if cache and isinstance(extracted_info_dict, dict):
+            cache.put(cache_key, extracted_info_dict)
+        if prefilled and isinstance(extracted_info_dict, dict):
+            extracted_info_dict = merge_prefilled(prefilled, extracted_info_dict)
         return extracted_info_dict, text_content
     except json.JSONDecodeError:
         return llm_response_content.strip(), text_content
@@ -145,13 +160,12 @@ st.title("✨ DOBBY 🤖 : Smart Webpage Q/A")
 
 if "service" not in st.session_state:
     try:
-        chrome_driver_path = ChromeDriverManager().install()
-        st.session_state.service = Service(chrome_driver_path)
+        st.session_state.service = get_chrome_service()
     except Exception as e:
-        st.error(f"Error installing Chrome Driver: {e}")
+        st.error(f"Error locating Chrome Driver: {e}")
         st.stop()
 
-for key in ["full_text", "extracted_info", "temp_file_path"]:
+for key in ["full_text", "extracted_info", "document", "qa_index"]:
     if key not in st.session_state:
         st.session_state[key] = None
 
@@ -163,13 +177,24 @@ with tab1:
         if not url.startswith(('http://', 'https://')):
             st.error("Please enter a valid URL starting with http:// or https://")
         else:
-            with st.spinner("Fetching and processing webpage..."):
-                temp_file_path = get_text_from_url(url, st.session_state.service)
-                if temp_file_path:
-                    st.session_state.temp_file_path = temp_file_path
-                    extracted_info, full_webpage_text = extract_info_with_gaia_agent(temp_file_path)
+            with st.spinner("Fetching and processing webpage..."), budget_scope():  # fresh retry budget per click
+                document = get_text_from_url(url, st.session_state.service)
+                if document:
+                    if st.session_state.document:
+                        st.session_state.document.release()
+                    st.session_state.document = document
+                    live_fields = {}
+                    live_box = st.empty()
+
+                    def show_field(key, value):
+                        live_fields[key] = value
+                        live_box.json(live_fields)
+
+                    extracted_info, full_webpage_text = extract_info_with_gaia_agent(document, on_field=show_field)
+                    live_box.empty()
                     st.session_state.extracted_info = extracted_info
                     st.session_state.full_text = full_webpage_text
+                    st.session_state.qa_index = RetrievalIndex(full_webpage_text) if full_webpage_text else None
                 else:
                     st.error("Failed to retrieve content from the URL.")
 
@@ -188,17 +213,13 @@ with tab2:
         question = st.text_input("Ask a question about the webpage content", placeholder="Type your question here...")
         if st.button("Get Answer"):
             qa_system_prompt = "You are a highly intelligent AI assistant...  Answer in unfiltered and funny way also..."
-            qa_text_context = st.session_state.full_text[:15000]
+            qa_text_context = st.session_state.qa_index.context_for(question)
             qa_user_message = f"Based on the following content, please answer the question:\n\nContent:\n{qa_text_context}\n\nQuestion: {question}"
 
-            with st.spinner("Thinking..."):
-                completion = safe_chat_completion(
+            with budget_scope():
+                st.write_stream(safe_stream_chat(
                     [
                         {"role": "system", "content": qa_system_prompt},
                         {"role": "user", "content": qa_user_message},
                     ]
-                )
-
-                if completion:
-                    answer = completion.choices[0].message.content or ""
-                    st.markdown(answer)
+                ))
@@ -0,0 +1,231 @@
+# CONCURRENT BATCH EXTRACTION FOR URL LISTS (USED BY `python extractor.py --batch FILE`).
+
+# Fetching and LLM extraction run as two separate stages with their own bounded worker counts,
+# connected by bounded queues so a slow stage applies backpressure instead of piling up pages.
+# Results are appended to a JSONL file as soon as each URL completes. With an extract_many_fn, each
+# LLM worker gathers whatever fetched pages are waiting (up to group_size, lingering briefly) and
+# hands them over together so small pages can share one Gaia request.
+
+import sys
+import json
+import time
+import queue
+import logging
+import threading
+from resilience import classify, with_budget, RETRYABLE
+
+logger = logging.getLogger(__name__)
+
+FETCH_WORKERS = 4
+LLM_WORKERS = 4
+GROUP_LINGER = 0.25  # seconds an LLM worker waits for more fetched pages before extracting a group
+URL_KEYS = ("url", "link", "href")
+ID_KEYS = ("id", "request_id")
+_DONE = object()
+
+
+def _url_from_record(record: dict) -> str | None:
+    for key in URL_KEYS:
+        if isinstance(record.get(key), str):
+            return record[key].strip()
+    for value in record.values():
+        if isinstance(value, str) and value.startswith(('http://', 'https://')):
+            return value.strip()
+    return None
+
+
+def read_urls(source: str):
+    # Yields (item_id, url). Accepts one URL per line or JSONL objects; "-" reads stdin.
+    stream = sys.stdin if source == "-" else open(source, 'r', encoding='utf-8')
+    try:
+        for line_no, line in enumerate(stream, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            item_id, url = str(line_no), line
+            if line.startswith('{'):
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    logger.warning("Skipping line %d: invalid JSON (%s)", line_no, e)
+                    continue
+                url = _url_from_record(record)
+                item_id = next((str(record[k]) for k in ID_KEYS if k in record), item_id)
+            if not url or not url.startswith(('http://', 'https://')):
+                logger.warning("Skipping line %d: no http(s) URL found", line_no)
+                continue
+            yield item_id, url
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def _start_workers(count: int, target, inbox: queue.Queue, outbox: queue.Queue, name: str) -> list[threading.Thread]:
+    def loop():
+        while True:
+            item = inbox.get()
+            if item is _DONE:
+                return
+            outbox.put(target(item))
+
+    threads = [threading.Thread(target=loop, name=f"{name}-{i}", daemon=True) for i in range(count)]
+    for t in threads:
+        t.start()
+    return threads
+
+
+def _start_group_workers(count: int, target, inbox: queue.Queue, outbox: queue.Queue, group_size: int,
+                         name: str) -> list[threading.Thread]:
+    def loop():
+        while True:
+            item = inbox.get()
+            if item is _DONE:
+                return
+            group, finished = [item], False
+            while len(group) < group_size:
+                try:
+                    item = inbox.get(timeout=GROUP_LINGER)
+                except queue.Empty:
+                    break
+                if item is _DONE:
+                    finished = True
+                    break
+                group.append(item)
+            for record in target(group):
+                outbox.put(record)
+            if finished:
+                return
+
+    threads = [threading.Thread(target=loop, name=f"{name}-{i}", daemon=True) for i in range(count)]
+    for t in threads:
+        t.start()
+    return threads
+
+
+def run_batch(items, fetch_fn, extract_fn, output_path: str, fetch_workers: int = FETCH_WORKERS,
+              llm_workers: int = LLM_WORKERS, extract_many_fn=None, group_size: int = 1, on_fetched=None,
+              on_record=None, scheduler=None, budget=None) -> dict:
+    # fetch_fn(url) -> document or None; extract_fn(document) -> dict (may raise);
+    # extract_many_fn(documents) -> list of dicts or exceptions, one per document.
+    # on_fetched(item_id) and on_record(record) let a job store checkpoint progress.
+    # With a PolitenessScheduler, URLs are handed to fetch workers per host, round-robin.
+    # With a RetryBudget, every fetch and extraction of this run draws its retries from it.
+    if budget is not None:
+        fetch_fn, extract_fn = with_budget(fetch_fn, budget), with_budget(extract_fn, budget)
+        extract_many_fn = extract_many_fn and with_budget(extract_many_fn, budget)
+    fetch_workers = max(1, fetch_workers)
+    llm_workers = max(1, llm_workers)
+    to_fetch = scheduler.queue() if scheduler is not None else queue.Queue(maxsize=fetch_workers * 2)
+    to_extract = queue.Queue(maxsize=llm_workers * 2)
+    results = queue.Queue()
+    stats = {"total": 0, "ok": 0, "fetch_failed": 0, "extract_failed": 0}
+
+    def fetch(item):
+        item_id, url = item
+        record = {"id": item_id, "url": url}
+        start = time.perf_counter()
+        try:
+            record["document"] = fetch_fn(url)
+            if record["document"] is None:
+                record["error"] = "fetch returned no content"
+            elif on_fetched:
+                on_fetched(item_id)
+        except Exception as e:
+            record["document"], record["error"] = None, str(e)
+            record["retryable"] = classify(e) == RETRYABLE
+        record["fetch_seconds"] = round(time.perf_counter() - start, 3)
+        return record
+
+    def extract(record):
+        document = record.pop("document", None)
+        if document is None:
+            record["status"] = "fetch_failed"
+            return record
+        start = time.perf_counter()
+        try:
+            record["data"] = extract_fn(document)
+            record["status"] = "ok"
+        except Exception as e:
+            record["status"], record["error"] = "extract_failed", str(e)
+            record["retryable"] = classify(e) == RETRYABLE
+        record["extract_seconds"] = round(time.perf_counter() - start, 3)
+        return record
+
+    def extract_group(records):
+        ready = [r for r in records if r.get("document") is not None]
+        for record in records:
+            if record.get("document") is None:
+                record.pop("document", None)
+                record["status"] = "fetch_failed"
+        if ready:
+            start = time.perf_counter()
+            try:
+                outcomes = extract_many_fn([r.pop("document") for r in ready])
+            except Exception as e:
+                outcomes = [e] * len(ready)
+            elapsed = round(time.perf_counter() - start, 3)
+            for record, outcome in zip(ready, outcomes):
+                if isinstance(outcome, Exception):
+                    record["status"], record["error"] = "extract_failed", str(outcome)
+                    record["retryable"] = classify(outcome) == RETRYABLE
+                else:
+                    record["data"], record["status"] = outcome, "ok"
+                record["extract_seconds"] = elapsed
+                record["group_size"] = len(ready)
+        return records
+
+    if scheduler is not None:
+        def polite_fetch():
+            while True:
+                picked = to_fetch.get()
+                if picked is None:
+                    return
+                record = fetch(picked[0])
+                scheduler.release(picked[1], record["fetch_seconds"], ok=record["document"] is not None)
+                to_extract.put(record)
+
+        fetchers = [threading.Thread(target=polite_fetch, name=f"fetch-{i}", daemon=True) for i in range(fetch_workers)]
+        for t in fetchers:
+            t.start()
+    else:
+        fetchers = _start_workers(fetch_workers, fetch, to_fetch, to_extract, "fetch")
+    if extract_many_fn is not None and group_size > 1:
+        extractors = _start_group_workers(llm_workers, extract_group, to_extract, results, group_size, "llm")
+    else:
+        extractors = _start_workers(llm_workers, extract, to_extract, results, "llm")
+
+    def feed():
+        for item in items:
+            if scheduler is not None:
+                to_fetch.put(item, item[1])
+            else:
+                to_fetch.put(item)
+        if scheduler is not None:
+            to_fetch.close()
+        else:
+            for _ in fetchers:
+                to_fetch.put(_DONE)
+        for t in fetchers:
+            t.join()
+        for _ in extractors:
+            to_extract.put(_DONE)
+        for t in extractors:
+            t.join()
+        results.put(_DONE)
+
+    threading.Thread(target=feed, name="feeder", daemon=True).start()
+
+    started = time.perf_counter()
+    with open(output_path, 'a', encoding='utf-8') as out:
+        while True:
+            record = results.get()
+            if record is _DONE:
+                break
+            stats["total"] += 1
+            stats[record["status"]] += 1
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            if on_record:
+                on_record(record)
+    stats["seconds"] = round(time.perf_counter() - started, 2)
+    return stats
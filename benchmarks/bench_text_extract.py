@@ -0,0 +1,82 @@
+# MICROBENCHMARK FOR THE HTML -> TEXT ENGINES IN text_extract.py.
+
+# run by (python benchmarks/bench_text_extract.py [page.html | corpus_dir ...])
+# Without arguments a few synthetic pages (article, product, multi-MB listing) are generated.
+# Every engine's output is compared with the bs4 reference before it is timed.
+
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from text_extract import ENGINES, bs4_clean_text
+
+BOILERPLATE = ("<header><nav><a href='/'>Home</a> <a href='/shop'>Shop</a></nav></header>"
+               "<script>window.dataLayer = window.dataLayer || []; if (a < b) { track(); }</script>"
+               "<style>.x { color: red; }</style>")
+
+
+def _words(rng: random.Random, n: int) -> str:
+    vocab = ["price", "rating", "stock", "widget", "great", "battery", "&amp;", "review", "café", "delivery", "$19.99"]
+    return " ".join(rng.choice(vocab) for _ in range(n))
+
+
+def synthetic_corpus() -> dict[str, str]:
+    rng = random.Random(42)
+    article = (f"<html><head><title>Article</title>{BOILERPLATE}</head><body>"
+               + "".join(f"<p>{_words(rng, 60)} <b>{_words(rng, 3)}</b><!-- ad --></p>" for _ in range(80))
+               + "<footer>Copyright</footer></body></html>")
+    product = (f"<html><head><title>Product</title>{BOILERPLATE}</head><body><h1>XYZ Smartwatch Pro</h1>"
+               "<span class='price'>$299.99</span><ul>" + "".join(f"<li>{_words(rng, 8)}" for _ in range(40))
+               + "</ul><aside>Related products</aside><noscript>Enable JavaScript</noscript></body></html>")
+    listing = ("<html><body>" + BOILERPLATE + "".join(
+        f"<div class='card'><h2>{_words(rng, 4)}</h2><p>{_words(rng, 30)}</p><span>$ {rng.randint(1, 999)}.99</span></div>"
+        for _ in range(12000)) + "</body></html>")
+    return {"article": article, "product": product, "huge_listing": listing,
+            # Small pages where the parsers disagree on what counts as text.
+            "template": "<p>a</p><template><p>tpl</p></template><p>b</p>",
+            "cdata": "<p>a</p><![CDATA[x < y]]><p>b</p><svg><![CDATA[svg data]]></svg>",
+            "textarea": "<p>a</p><textarea>hello <b>bold</b> &amp; more</textarea><p>b</p>"}
+
+
+def load_pages(paths: list[str]) -> dict[str, str]:
+    pages = {}
+    for path in paths:
+        files = [os.path.join(path, f) for f in sorted(os.listdir(path))] if os.path.isdir(path) else [path]
+        for file in files:
+            if file.endswith((".html", ".htm")):
+                with open(file, 'r', encoding='utf-8', errors='replace') as f:
+                    pages[os.path.basename(file)] = f.read()
+    return pages
+
+
+def best_of(fn, html: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(html)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv: list[str]) -> int:
+    pages = load_pages(argv) if argv else synthetic_corpus()
+    mismatches = 0
+    print(f"{'page':<28}{'size':>10}  " + "".join(f"{name:>12}" for name in ENGINES))
+    for name, html in pages.items():
+        reference = bs4_clean_text(html)
+        for engine, fn in ENGINES.items():
+            if fn(html) != reference:
+                mismatches += 1
+                print(f"!! {engine} output differs from bs4 on {name}")
+        repeat = 3 if len(html) > 1024 * 1024 else 10
+        timings = [best_of(fn, html, repeat) for fn in ENGINES.values()]
+        print(f"{name:<28}{len(html) / 1024:>8.0f}KB  " + "".join(f"{t * 1000:>10.1f}ms" for t in timings))
+    print("parity: OK" if not mismatches else f"parity: {mismatches} mismatches")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
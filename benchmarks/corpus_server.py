@@ -0,0 +1,95 @@
+# LOCAL HTTP SERVER FOR THE BENCHMARK PAGE CORPUS.
+
+# run by (python benchmarks/corpus_server.py --port 8088 [--delay 0.05])
+# Serves every file in benchmarks/corpus/ plus /huge.html, a multi-MB listing page generated from a
+# fixed seed so it does not have to be committed. Any query string is ignored, so one page can be
+# requested under many distinct URLs (e.g. /article.html?i=17) for throughput runs.
+
+import os
+import sys
+import time
+import argparse
+import threading
+from urllib.parse import urlsplit
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+
+
+def load_corpus(directory: str = CORPUS_DIR) -> dict[str, bytes]:
+    from bench_text_extract import synthetic_corpus
+    pages = {}
+    for name in sorted(os.listdir(directory)):
+        if name.endswith((".html", ".htm")):
+            with open(os.path.join(directory, name), 'rb') as f:
+                pages[name] = f.read()
+    pages["huge.html"] = synthetic_corpus()["huge_listing"].encode('utf-8')
+    return pages
+
+
+class CorpusServer:
+    def __init__(self, pages: dict[str, bytes] | None = None, delay: float = 0.0):
+        self.pages = pages if pages is not None else load_corpus()
+        self.delay = delay
+        self.stats = {"requests": 0, "bytes": 0}
+        self.lock = threading.Lock()
+        self.server = None
+
+    def start(self, port: int = 0, host: str = "127.0.0.1") -> str:
+        corpus = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                name = urlsplit(self.path).path.lstrip("/") or "index.html"
+                body = corpus.pages.get(name)
+                if corpus.delay:
+                    time.sleep(corpus.delay)
+                if body is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                with corpus.lock:
+                    corpus.stats["requests"] += 1
+                    corpus.stats["bytes"] += len(body)
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name="corpus-server", daemon=True).start()
+        return f"http://{host}:{self.server.server_port}"
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(description="Serve the benchmark page corpus")
+    parser.add_argument("--port", type=int, default=8088)
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds added to every response")
+    args = parser.parse_args(argv)
+    server = CorpusServer(delay=args.delay)
+    base = server.start(args.port)
+    for name in server.pages:
+        print(f"{base}/{name}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
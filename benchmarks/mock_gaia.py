@@ -0,0 +1,188 @@
+# MOCK GAIA NODE: AN OPENAI-COMPATIBLE /v1/chat/completions SERVER WITH SIMULATED LATENCY.
+
+# run by (python benchmarks/mock_gaia.py --port 8089 --latency 0.5 --tokens-per-second 40)
+# then point GAIA_DOMAIN_URL at http://127.0.0.1:8089. Answers are deterministic JSON built from the
+# page text (one object per <document id> block for micro-batched requests), so the extractor's
+# parsing, caching and batching paths all run. Time to first token, prompt processing and generation
+# speed, node concurrency and the share of 503 answers are configurable. Like on a real node, prompts
+# are processed one at a time (it is compute bound) while generation runs in every slot at once.
+
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_DOCUMENT_RE = re.compile(r'<document id="([^"]+)">\s*(.*?)\s*</document>', re.S)
+_SCHEMA_FIELD_RE = re.compile(r'^- \*\*([^*]+)\*\*', re.M)
+CHUNK_CHARS = 16
+
+
+def _extraction(text: str, fields: list[str] | None = None) -> dict:
+    words = text.split()
+    if fields:
+        return {name: None for name in fields}
+    return {
+        "title": " ".join(words[:8]) or None,
+        "summary": " ".join(words[8:60]) or None,
+        "main_content_type": "informational page",
+        "key_details": [" ".join(words[i:i + 6]) for i in range(60, min(len(words), 90), 6)],
+    }
+
+
+def build_answer(messages: list[dict], json_mode: bool) -> str:
+    system = next((m.get("content") or "" for m in messages if m.get("role") == "system"), "")
+    user = next((m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), "")
+    if not json_mode and "JSON" not in system:
+        return "Based on the page, " + " ".join(user.split()[:40]) + "."
+    fields = _SCHEMA_FIELD_RE.findall(system)
+    documents = _DOCUMENT_RE.findall(user)
+    if documents:
+        return json.dumps({doc_id: _extraction(text, fields) for doc_id, text in documents}, ensure_ascii=False)
+    body = user.split("\n\n", 1)[-1]
+    return json.dumps(_extraction(body, fields), ensure_ascii=False)
+
+
+class MockGaia:
+    def __init__(self, latency: float = 0.3, tokens_per_second: float = 50.0, max_concurrency: int = 8,
+                 error_rate: float = 0.0, seed: int = 7, prompt_tokens_per_second: float = 0.0):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.prompt_tokens_per_second = prompt_tokens_per_second
+        self.error_rate = error_rate
+        self.slots = threading.BoundedSemaphore(max(1, max_concurrency))
+        self.rng = random.Random(seed)
+        self.stats = {"requests": 0, "errors": 0, "prompt_tokens": 0, "completion_tokens": 0}
+        self.lock = threading.Lock()
+        self.prefill_lock = threading.Lock()
+        self.server = None
+
+    def start(self, port: int = 0, host: str = "127.0.0.1") -> str:
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                if self.path.rstrip("/") == "/v1/models":
+                    self._json(200, {"object": "list", "data": [{"id": "mock-gaia", "object": "model"}]})
+                else:
+                    self._json(404, {"error": {"message": "not found"}})
+
+            def do_POST(self):
+                if self.path.rstrip("/") != "/v1/chat/completions":
+                    self._json(404, {"error": {"message": "not found"}})
+                    return
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                mock.handle(self, body)
+
+            def _json(self, status: int, payload: dict):
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name="mock-gaia", daemon=True).start()
+        return f"http://{host}:{self.server.server_port}"
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+    def handle(self, handler, body: dict):
+        messages = body.get("messages", [])
+        json_mode = (body.get("response_format") or {}).get("type") == "json_object"
+        with self.lock:
+            self.stats["requests"] += 1
+            fail = self.rng.random() < self.error_rate
+        if fail:
+            with self.lock:
+                self.stats["errors"] += 1
+            handler._json(503, {"error": {"message": "mock node overloaded", "type": "server_error"}})
+            return
+        answer = build_answer(messages, json_mode)
+        prompt_tokens = sum(len(m.get("content") or "") for m in messages) // 4 + 1
+        completion_tokens = len(answer) // 4 + 1
+        with self.lock:
+            self.stats["prompt_tokens"] += prompt_tokens
+            self.stats["completion_tokens"] += completion_tokens
+        per_char = 1 / (self.tokens_per_second * 4) if self.tokens_per_second else 0
+        prefill = prompt_tokens / self.prompt_tokens_per_second if self.prompt_tokens_per_second else 0
+        with self.slots:  # requests beyond the node's concurrency queue here, like a busy node
+            with self.prefill_lock:
+                time.sleep(prefill)
+            time.sleep(self.latency)
+            if body.get("stream"):
+                self._stream(handler, body, answer, per_char, prompt_tokens, completion_tokens)
+                return
+            time.sleep(len(answer) * per_char)
+        handler._json(200, {
+            "id": "chatcmpl-mock", "object": "chat.completion", "created": int(time.time()), "model": body.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        })
+
+    def _stream(self, handler, body: dict, answer: str, per_char: float, prompt_tokens: int, completion_tokens: int):
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/event-stream")
+        handler.send_header("Cache-Control", "no-cache")
+        handler.send_header("Connection", "close")
+        handler.end_headers()
+        handler.close_connection = True
+
+        def event(delta: dict, finish=None):
+            chunk = {"id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": int(time.time()),
+                     "model": body.get("model"), "choices": [{"index": 0, "delta": delta, "finish_reason": finish}]}
+            handler.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+            handler.wfile.flush()
+
+        event({"role": "assistant", "content": ""})
+        for i in range(0, len(answer), CHUNK_CHARS):
+            piece = answer[i:i + CHUNK_CHARS]
+            time.sleep(len(piece) * per_char)
+            event({"content": piece})
+        event({}, "stop")
+        if (body.get("stream_options") or {}).get("include_usage"):
+            usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                     "total_tokens": prompt_tokens + completion_tokens}
+            chunk = {"id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": int(time.time()),
+                     "model": body.get("model"), "choices": [], "usage": usage}
+            handler.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+        handler.wfile.write(b"data: [DONE]\n\n")
+        handler.wfile.flush()
+
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(description="Mock OpenAI-compatible Gaia node for benchmarks")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0, help="generation speed (0 = instant)")
+    parser.add_argument("--prompt-tokens-per-second", type=float, default=0.0, help="prompt processing speed (0 = free)")
+    parser.add_argument("--max-concurrency", type=int, default=8, help="requests the node runs at once")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 503")
+    args = parser.parse_args(argv)
+    mock = MockGaia(args.latency, args.tokens_per_second, args.max_concurrency, args.error_rate,
+                    prompt_tokens_per_second=args.prompt_tokens_per_second)
+    print(f"Mock Gaia node on {mock.start(args.port)}/v1 (Ctrl-C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        mock.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
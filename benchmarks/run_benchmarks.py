@@ -0,0 +1,183 @@
+# OFFLINE BENCHMARK SUITE: LOCAL PAGE CORPUS + MOCK GAIA NODE, COMPARED AGAINST A SAVED BASELINE.
+
+# run by (python benchmarks/run_benchmarks.py [--save-baseline] [--check] [--browser])
+# Starts corpus_server.py and mock_gaia.py in-process, points the extractor at them and times:
+#   clean/<page>    text_extract.clean_html on each corpus page
+#   fetch/<page>    extractor.get_text_from_url (HTTP tier; the SPA page needs --browser and Chrome)
+#   extract/<page>  extractor.extract_info_with_gaia_agent against the mock node
+#   batch/*         end-to-end run_batch throughput, with and without micro-batching
+# The mock node charges for prompt processing, one prompt at a time, as well as for generation.
+# Micro-batching pays the system prompt once per group instead of once per page. With free prompts it
+# would only save the per-request latency, and the group linger and the serial generation of a
+# grouped answer cost more than that.
+# Caches are disabled so every repeat does the full work. Results go to benchmarks/results/latest.json
+# and are compared with benchmarks/baseline.json; --check exits 1 when anything regressed.
+
+import io
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import platform
+import statistics
+import tempfile
+from contextlib import redirect_stdout
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from corpus_server import CorpusServer
+from mock_gaia import MockGaia
+
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+RESULTS_PATH = os.path.join(BENCH_DIR, "results", "latest.json")
+STATIC_PAGES = ("product.html", "product_jsonld.html", "article.html", "huge.html")
+# The pages micro-batching is for: no structured data to answer from, small enough to share a request.
+# The JSON-LD product and the article are answered from their metadata one by one in either mode.
+BATCH_PAGES = ("product.html",)
+NOISE_FLOOR = 0.002  # seconds; smaller differences are never reported as regressions
+
+
+def median_time(fn, repeat: int) -> float:
+    timings = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        fn(i)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def run(args) -> dict:
+    mock = MockGaia(args.latency, args.tokens_per_second, args.node_concurrency,
+                    prompt_tokens_per_second=args.prompt_tokens_per_second)
+    gaia_url = mock.start()
+    corpus = CorpusServer()
+    site = corpus.start()
+    cache_dir = tempfile.mkdtemp(prefix="gaia_bench_")
+    os.environ.update({
+        "GAIA_DOMAIN_URL": gaia_url, "GAIA_API_KEY": "bench", "MODEL": "mock-gaia",
+        "GAIA_EXTRACTION_CACHE": "0", "GAIA_HTTP_CACHE": "0", "GAIA_CACHE_DIR": cache_dir,
+        "GAIA_HOST_DELAY": "0", "GAIA_RESPECT_ROBOTS": "0",
+    })
+    import extractor
+    from batch import run_batch
+    from politeness import PolitenessScheduler
+    from text_extract import clean_html
+    from instrumentation import stage_summary
+
+    results, warnings = {}, []
+    get_text = extractor.get_text_from_url
+    extract = extractor.extract_info_with_gaia_agent
+
+    for name in STATIC_PAGES:
+        html = corpus.pages[name].decode('utf-8')
+        repeat = 3 if len(html) > 1024 * 1024 else args.repeat
+        results[f"clean/{name}"] = median_time(lambda i: clean_html(html), repeat)
+
+    service = None
+    pages = list(STATIC_PAGES)
+    if args.browser:
+        from driver_binary import get_chrome_service
+        service = get_chrome_service()
+        pages.append("spa.html")
+    documents = {}
+    for name in pages:
+        host = "localhost" if name == "spa.html" else "127.0.0.1"  # keep the SPA's tier memory separate
+        url = f"{site.replace('127.0.0.1', host)}/{name}"
+        repeat = 3 if name in ("huge.html", "spa.html") else args.repeat
+        results[f"fetch/{name}"] = median_time(lambda i: get_text(f"{url}?r={i}", service), repeat)
+        documents[name] = get_text(url, service)
+
+    for name, document in documents.items():
+        if document is None:
+            warnings.append(f"could not fetch {name}, skipping its extraction benchmark")
+            continue
+        if name == "huge.html":
+            continue  # packing caps it like any long page; the per-page numbers above cover the cost
+        results[f"extract/{name}"] = median_time(lambda i: extract(document), args.repeat)
+
+    items = [(str(i), f"{site}/{BATCH_PAGES[i % len(BATCH_PAGES)]}?b={i}") for i in range(args.batch_size)]
+    output = os.path.join(cache_dir, "batch.jsonl")
+    fetch = lambda url: get_text(url, service)
+    scheduler = PolitenessScheduler(max_per_host=args.workers, delay=0)
+    for label, options in (("batch/single", {}),
+                           ("batch/micro_batch", {"extract_many_fn": extractor.extract_many_and_release,
+                                                  "group_size": 4})):
+        stats = run_batch(items, fetch, extractor.extract_and_release, output, args.workers, args.workers,
+                          scheduler=scheduler, **options)
+        if stats["ok"] != len(items):
+            warnings.append(f"{label}: only {stats['ok']}/{len(items)} pages succeeded")
+        results[f"{label}_seconds_per_page"] = stats["seconds"] / max(1, len(items))
+
+    mock.stop()
+    corpus.stop()
+    return {
+        "results": {name: round(seconds, 5) for name, seconds in results.items()},
+        "stages": stage_summary(),
+        "warnings": warnings,
+        "environment": {"python": platform.python_version(), "platform": platform.platform(),
+                        "latency": args.latency, "tokens_per_second": args.tokens_per_second,
+                        "prompt_tokens_per_second": args.prompt_tokens_per_second,
+                        "workers": args.workers, "batch_size": args.batch_size},
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> int:
+    regressions = 0
+    print(f"{'benchmark':<44}{'baseline':>12}{'current':>12}{'change':>10}")
+    for name, seconds in current.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<44}{'-':>12}{seconds * 1000:>10.1f}ms{'new':>10}")
+            continue
+        change = (seconds - base) / base if base else 0.0
+        regressed = change > threshold and seconds - base > NOISE_FLOOR
+        regressions += regressed
+        flag = "  !!" if regressed else ""
+        print(f"{name:<44}{base * 1000:>10.1f}ms{seconds * 1000:>10.1f}ms{change:>+10.0%}{flag}")
+    return regressions
+
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the GAIA extractor")
+    parser.add_argument("--repeat", type=int, default=7, help="repeats per benchmark (median is reported)")
+    parser.add_argument("--batch-size", type=int, default=40, help="URLs in the batch throughput runs")
+    parser.add_argument("--workers", type=int, default=4, help="fetch and LLM workers in the batch runs")
+    parser.add_argument("--latency", type=float, default=0.05, help="mock node time to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=400.0, help="mock node generation speed")
+    parser.add_argument("--prompt-tokens-per-second", type=float, default=20000.0,
+                        help="mock node prompt processing speed (0 = free, which hides what micro-batching saves)")
+    parser.add_argument("--node-concurrency", type=int, default=4, help="requests the mock node runs at once")
+    parser.add_argument("--threshold", type=float, default=0.2, help="slowdown that counts as a regression (0.2 = 20%%)")
+    parser.add_argument("--browser", action="store_true", help="also fetch the client-rendered page with Chrome")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as benchmarks/baseline.json")
+    parser.add_argument("--check", action="store_true", help="exit with status 1 if any benchmark regressed")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    with redirect_stdout(io.StringIO()):  # the CLI functions print progress for every page
+        report = run(args)
+    for warning in report["warnings"]:
+        print(f"!! {warning}")
+    os.makedirs(os.path.dirname(RESULTS_PATH), exist_ok=True)
+    with open(RESULTS_PATH, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, 'r', encoding='utf-8') as f:
+            baseline = json.load(f).get("results", {})
+    regressions = compare(report["results"], baseline, args.threshold)
+    if args.save_baseline:
+        with open(BASELINE_PATH, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"baseline saved to {BASELINE_PATH}")
+    elif baseline:
+        print(f"{regressions} regression(s) over {args.threshold:.0%}" if regressions else "no regressions")
+    return 1 if args.check and regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,140 @@
+# RELEVANCE-AWARE CONTEXT PACKING FOR EXTRACTION PROMPTS, PLUS THE CHUNKING AND BM25 USED BY retrieval.py.
+
+# Instead of sending the first N characters of a page, the text is split into sentence chunks,
+# each chunk is scored with cheap lexical signals (currency amounts, ratings, dates, the field
+# names listed in the extraction prompt) and the best chunks are packed, in page order, into a
+# token budget. The opening chunk is always kept since it usually holds the title.
+
+import os
+import re
+import math
+from collections import Counter
+from llm_gateway import estimate_tokens
+from instrumentation import span
+
+EXTRACT_TOKEN_BUDGET = int(os.getenv("GAIA_EXTRACT_TOKEN_BUDGET", "1800"))
+CHUNK_CHARS = 500
+LEAD_CHUNKS = 1
+GAP_MARKER = " ... "
+
+DEFAULT_FIELDS = ("title", "summary", "author", "publication_date", "product_name", "price", "currency",
+                  "availability", "rating", "number_of_reviews", "key_details")
+FIELD_SYNONYMS = {
+    "price": ("price", "cost", "mrp", "sale", "deal", "offer", "discount", "buy"),
+    "currency": ("usd", "inr", "eur", "gbp", "rs"),
+    "availability": ("stock", "available", "unavailable", "ships", "delivery", "sold"),
+    "rating": ("rating", "rated", "stars", "star"),
+    "number_of_reviews": ("reviews", "ratings", "review"),
+    "author": ("author", "by", "written", "posted"),
+    "publication_date": ("published", "updated", "date", "posted"),
+    "product_name": ("model", "brand", "product"),
+}
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+_FIELD_RE = re.compile(r"\*\*(\w+)\*\*")
+_CURRENCY_RE = re.compile(r"[$€£¥₹]\s?\d|\d[\d,.]*\s?(usd|eur|inr|gbp|rs\.?)\b|\brs\.?\s?\d", re.I)
+_RATING_RE = re.compile(r"\d(\.\d)?\s*(out of|/)\s*5|\d[\d,]*\s+(reviews|ratings)", re.I)
+_DATE_RE = re.compile(r"\b(19|20)\d{2}-\d{2}-\d{2}\b|\b(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?\s+\d{1,2},?\s+(19|20)\d{2}\b", re.I)
+
+
+def tokenize(text: str) -> list[str]:
+    return _WORD_RE.findall(text.lower())
+
+
+def split_chunks(text: str, target_chars: int = CHUNK_CHARS) -> list[str]:
+    chunks, current = [], ""
+    for sentence in _SENTENCE_RE.split(text):
+        while len(sentence) > target_chars:  # very long "sentences" (lists, tables) are hard-split
+            cut = sentence.rfind(" ", 0, target_chars)
+            cut = cut if cut > 0 else target_chars
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(sentence[:cut])
+            sentence = sentence[cut:].lstrip()
+        if current and len(current) + len(sentence) + 1 > target_chars:
+            chunks.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class BM25:
+    # Small inverted index: postings map each term to the (chunk, frequency) pairs containing it.
+    def __init__(self, documents: list[list[str]], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.size = len(documents)
+        self.lengths = [len(doc) for doc in documents]
+        self.avg_length = (sum(self.lengths) / self.size) if self.size else 0.0
+        self.postings = {}
+        for index, doc in enumerate(documents):
+            for term, freq in Counter(doc).items():
+                self.postings.setdefault(term, []).append((index, freq))
+        self.idf = {term: math.log(1 + (self.size - len(p) + 0.5) / (len(p) + 0.5)) for term, p in self.postings.items()}
+
+    def scores(self, query: list[str]) -> list[float]:
+        scores = [0.0] * self.size
+        avg = self.avg_length or 1
+        for term in set(query):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for index, freq in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[index] / avg)
+                scores[index] += idf * freq * (self.k1 + 1) / (freq + norm)
+        return scores
+
+
+def field_keywords(system_prompt: str | None) -> set[str]:
+    fields = _FIELD_RE.findall(system_prompt or "") or DEFAULT_FIELDS
+    keywords = set()
+    for field in fields:
+        keywords.update(part for part in field.lower().split("_") if len(part) > 2)
+        keywords.update(FIELD_SYNONYMS.get(field.lower(), ()))
+    return keywords
+
+
+def _extraction_score(chunk: str, keywords: set[str]) -> float:
+    words = tokenize(chunk)
+    keyword_hits = sum(1 for w in words if w in keywords)
+    return (3.0 * len(_CURRENCY_RE.findall(chunk)) + 2.0 * len(_RATING_RE.findall(chunk))
+            + 2.0 * len(_DATE_RE.findall(chunk)) + keyword_hits / math.sqrt(len(words) + 1))
+
+
+def pack_chunks(chunks: list[str], scores: list[float], token_budget: int, lead_chunks: int = LEAD_CHUNKS,
+                candidates: list[int] | None = None) -> str:
+    chosen, used = set(), 0
+    pool = range(len(chunks)) if candidates is None else candidates
+    ranked = list(range(min(lead_chunks, len(chunks)))) + sorted(pool, key=lambda i: -scores[i])
+    for i in ranked:
+        if i in chosen:
+            continue
+        cost = estimate_tokens(chunks[i])
+        if used + cost > token_budget:
+            continue
+        chosen.add(i)
+        used += cost
+    parts, previous = [], -1
+    for i in sorted(chosen):
+        if parts and i != previous + 1:
+            parts.append(GAP_MARKER)
+        elif parts:
+            parts.append(" ")
+        parts.append(chunks[i])
+        previous = i
+    return "".join(parts)
+
+
+def pack_for_extraction(text: str, system_prompt: str | None = None, token_budget: int = EXTRACT_TOKEN_BUDGET) -> str:
+    with span("prompt_build", text_chars=len(text)):
+        if estimate_tokens(text) <= token_budget:
+            return text
+        chunks = split_chunks(text)
+        keywords = field_keywords(system_prompt)
+        return pack_chunks(chunks, [_extraction_score(c, keywords) for c in chunks], token_budget)
+
@@ -0,0 +1,54 @@
+# IN-MEMORY RESULT OF THE FETCH STAGE, HANDED STRAIGHT TO EXTRACTION AND Q&A.
+
+# Replaces the old temp-file round trip. Text stays in memory unless it is larger than
+# GAIA_SPILL_BYTES, in which case it is written once to a temporary file and read on demand.
+
+import os
+import logging
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+SPILL_BYTES = int(os.getenv("GAIA_SPILL_BYTES", str(16 * 1024 * 1024)))
+
+
+class Document:
+    def __init__(self, url: str, text: str, source: str, timings: dict | None = None, spill_bytes: int = SPILL_BYTES,
+                 structured: dict | None = None):
+        self.url = url
+        self.source = source  # "http", "browser" or "not_modified"
+        self.timings = timings or {}
+        self.structured = structured or {}  # JSON-LD / microdata / OpenGraph fields harvested from the raw HTML
+        encoded = text.encode('utf-8')
+        self.byte_length = len(encoded)
+        self.char_length = len(text)
+        self._text = text
+        self.spill_path = None
+        if spill_bytes and self.byte_length > spill_bytes:
+            with tempfile.NamedTemporaryFile(delete=False, mode='wb', suffix='.txt', prefix='gaia_') as f:
+                f.write(encoded)
+                self.spill_path = f.name
+            self._text = None
+            logger.info("Spilled %.1f MB of page text for %s to %s", self.byte_length / (1024 * 1024), url, self.spill_path)
+
+    @property
+    def text(self) -> str:
+        if self._text is not None:
+            return self._text
+        if self.spill_path is None:
+            return ""
+        with open(self.spill_path, 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def release(self):
+        if self.spill_path and os.path.exists(self.spill_path):
+            os.remove(self.spill_path)
+        self.spill_path = None
+        self._text = None
+
+    def summary(self) -> dict:
+        return {"url": self.url, "source": self.source, "bytes": self.byte_length, "timings": self.timings,
+                "structured_fields": sorted(self.structured)}
+
+    def __repr__(self):
+        return f"Document({self.url!r}, {self.byte_length} bytes via {self.source})"
@@ -0,0 +1,160 @@
+# CHROMEDRIVER RESOLUTION WITHOUT A NETWORK ROUND TRIP (USED BY CLI, STREAMLIT, GUI AND SERVICE).
+
+# ChromeDriverManager().install() probes versions and usually hits the network on every call, which
+# costs seconds and fails offline. The driver is now looked up in this order:
+#   1. GAIA_CHROMEDRIVER_PATH, if set
+#   2. the path resolved last time, stored with the Chrome version in GAIA_CACHE_DIR/chromedriver.json
+#      and reused as long as the driver and the Chrome binary are unchanged on disk
+#   3. a chromedriver on PATH, or one webdriver-manager already downloaded (~/.wdm), matching Chrome's major version
+#   4. only then ChromeDriverManager().install(), once, and the result is cached for next time
+
+import os
+import re
+import sys
+import json
+import glob
+import shutil
+import logging
+import threading
+import subprocess
+from selenium.webdriver.chrome.service import Service
+from extraction_cache import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+CHROMEDRIVER_PATH = os.getenv("GAIA_CHROMEDRIVER_PATH")
+CHROME_BINARY = os.getenv("GAIA_CHROME_BINARY")
+RESOLUTION_CACHE = os.path.join(CACHE_DIR, "chromedriver.json")
+WDM_DIR = os.path.join(os.path.expanduser("~"), ".wdm", "drivers", "chromedriver")
+VERSION_TIMEOUT = 10  # seconds for a `--version` probe
+CHROME_NAMES = ("google-chrome", "google-chrome-stable", "chromium", "chromium-browser", "chrome")
+DRIVER_NAME = "chromedriver.exe" if sys.platform == "win32" else "chromedriver"
+_VERSION_RE = re.compile(r"(\d+)\.\d+\.\d+(?:\.\d+)?")
+
+_service = None
+_lock = threading.Lock()
+
+
+def _major(version: str | None) -> str | None:
+    match = _VERSION_RE.search(version or "")
+    return match.group(1) if match else None
+
+
+def _stamp(path: str) -> list | None:
+    # Cheap "unchanged on disk" check: size and mtime, no process started.
+    try:
+        info = os.stat(path)
+    except OSError:
+        return None
+    return [info.st_size, int(info.st_mtime)]
+
+
+def _is_executable(path: str | None) -> bool:
+    return bool(path) and os.path.isfile(path) and os.access(path, os.X_OK)
+
+
+def find_chrome() -> str | None:
+    if CHROME_BINARY:
+        return CHROME_BINARY if os.path.isfile(CHROME_BINARY) else None
+    candidates = [shutil.which(name) for name in CHROME_NAMES]
+    if sys.platform == "darwin":
+        candidates.append("/Applications/Google Chrome.app/Contents/MacOS/Google Chrome")
+    elif sys.platform == "win32":
+        for root in (os.getenv("PROGRAMFILES"), os.getenv("PROGRAMFILES(X86)"), os.getenv("LOCALAPPDATA")):
+            if root:
+                candidates.append(os.path.join(root, "Google", "Chrome", "Application", "chrome.exe"))
+    return next((path for path in candidates if path and os.path.isfile(path)), None)
+
+
+def binary_version(path: str) -> str | None:
+    if sys.platform == "win32" and path.lower().endswith("chrome.exe"):
+        # chrome.exe --version prints nothing on Windows; the install keeps a folder named after the version.
+        versions = [name for name in os.listdir(os.path.dirname(path)) if _VERSION_RE.fullmatch(name)]
+        return max(versions, key=lambda v: [int(part) for part in v.split(".")], default=None)
+    try:
+        output = subprocess.run([path, "--version"], capture_output=True, text=True, timeout=VERSION_TIMEOUT).stdout
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.debug("Could not read the version of %s: %s", path, e)
+        return None
+    match = _VERSION_RE.search(output)
+    return match.group(0) if match else None
+
+
+def _load_cached() -> dict:
+    try:
+        with open(RESOLUTION_CACHE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_cached(record: dict):
+    try:
+        os.makedirs(os.path.dirname(RESOLUTION_CACHE), exist_ok=True)
+        tmp = RESOLUTION_CACHE + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(record, f, indent=2)
+        os.replace(tmp, RESOLUTION_CACHE)
+    except OSError as e:
+        logger.warning("Could not store the chromedriver location in %s: %s", RESOLUTION_CACHE, e)
+
+
+def _chrome_version(chrome: str | None, cached: dict) -> str | None:
+    if not chrome:
+        return None
+    if cached.get("chrome") == chrome and cached.get("chrome_stamp") == _stamp(chrome):
+        return cached.get("chrome_version")
+    return binary_version(chrome)
+
+
+def _local_candidates() -> list[str]:
+    # A chromedriver on PATH first, then drivers webdriver-manager downloaded earlier, newest first.
+    found = [shutil.which(DRIVER_NAME)]
+    downloaded = glob.glob(os.path.join(WDM_DIR, "**", DRIVER_NAME), recursive=True)
+    found += sorted(downloaded, key=lambda path: os.path.getmtime(path), reverse=True)
+    return [path for path in found if _is_executable(path)]
+
+
+def resolve_chromedriver() -> str:
+    # Returns the chromedriver path. Only reaches the network when nothing usable is on disk.
+    if CHROMEDRIVER_PATH:
+        if not _is_executable(CHROMEDRIVER_PATH):
+            raise FileNotFoundError(f"GAIA_CHROMEDRIVER_PATH={CHROMEDRIVER_PATH} is not an executable file")
+        return CHROMEDRIVER_PATH
+
+    cached = _load_cached()
+    chrome = find_chrome()
+    chrome_version = _chrome_version(chrome, cached)
+    record = {"chrome": chrome, "chrome_stamp": _stamp(chrome) if chrome else None, "chrome_version": chrome_version}
+    driver = cached.get("driver")
+    if (_is_executable(driver) and cached.get("driver_stamp") == _stamp(driver)
+            and (chrome_version is None or _major(cached.get("driver_version")) == _major(chrome_version))):
+        if cached.get("chrome_version") != chrome_version or cached.get("chrome") != chrome:
+            _save_cached({**cached, **record})
+        logger.debug("Using cached chromedriver %s", driver)
+        return driver
+
+    for path in _local_candidates():
+        version = binary_version(path)
+        if chrome_version is None or _major(version) == _major(chrome_version):
+            _save_cached({**record, "driver": path, "driver_stamp": _stamp(path), "driver_version": version,
+                          "source": "local"})
+            logger.info("Using chromedriver %s (%s) for Chrome %s", path, version, chrome_version or "unknown")
+            return path
+        logger.info("Skipping chromedriver %s: version %s does not match Chrome %s", path, version, chrome_version)
+
+    from webdriver_manager.chrome import ChromeDriverManager
+    logger.info("No matching chromedriver on disk, downloading one with webdriver-manager")
+    path = ChromeDriverManager().install()
+    _save_cached({**record, "driver": path, "driver_stamp": _stamp(path), "driver_version": binary_version(path),
+                  "source": "webdriver-manager"})
+    return path
+
+
+def get_chrome_service() -> Service:
+    # One Service per process: the CLI, every Streamlit session and every GUI click share it.
+    global _service
+    with _lock:
+        if _service is None:
+            _service = Service(resolve_chromedriver())
+        return _service
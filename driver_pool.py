@@ -0,0 +1,325 @@
+# SHARED POOL OF WARM HEADLESS CHROME SESSIONS (USED BY CLI, STREAMLIT AND GUI VERSIONS).
+
+# Instead of launching a new browser for every URL and every retry, drivers are checked out
+# from the pool, reset between uses and recycled after too many pages or too much memory.
+# Sessions only need the page text, so images, fonts, media, stylesheets and ad/analytics hosts are
+# blocked through CDP, navigation returns at DOMContentLoaded ("eager") and load_page() waits for the
+# body text to stop growing instead of for every subresource.
+
+import os
+import time
+import atexit
+import logging
+import threading
+from contextlib import contextmanager
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from instrumentation import span
+from driver_binary import CHROME_BINARY
+
+try:
+    import psutil
+except ImportError:  # optional, only used for a more accurate memory reading
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+POOL_SIZE = int(os.getenv("GAIA_DRIVER_POOL_SIZE", "2"))
+MAX_PAGES_PER_DRIVER = int(os.getenv("GAIA_DRIVER_MAX_PAGES", "50"))
+MAX_DRIVER_MEMORY_MB = int(os.getenv("GAIA_DRIVER_MAX_MEMORY_MB", "1024"))
+CHECKOUT_TIMEOUT = 120
+PAGE_LOAD_STRATEGY = os.getenv("GAIA_PAGE_LOAD_STRATEGY", "eager")
+BLOCK_RESOURCES = os.getenv("GAIA_BLOCK_RESOURCES", "1") != "0"
+BLOCKED_EXTENSIONS = (
+    "png", "jpg", "jpeg", "gif", "webp", "avif", "svg", "ico", "bmp",  # images
+    "woff", "woff2", "ttf", "otf", "eot",  # fonts
+    "mp4", "webm", "ogg", "mp3", "m4a", "wav", "m3u8", "mpd",  # media
+    "css",
+)
+BLOCKED_DOMAINS = (
+    "doubleclick.net", "googlesyndication.com", "googleadservices.com", "google-analytics.com",
+    "googletagmanager.com", "googletagservices.com", "adservice.google.com", "connect.facebook.net",
+    "amazon-adsystem.com", "adnxs.com", "criteo.com", "taboola.com", "outbrain.com", "scorecardresearch.com",
+    "quantserve.com", "hotjar.com", "mixpanel.com", "segment.io", "nr-data.net", "optimizely.com", "clarity.ms",
+) + tuple(d.strip() for d in os.getenv("GAIA_BLOCKED_DOMAINS", "").split(",") if d.strip())
+STABLE_TEXT_INTERVAL = 0.25  # seconds between body text length checks
+STABLE_TEXT_CHECKS = 3  # equal readings in a row before the page counts as loaded
+
+
+def build_chrome_options() -> Options:
+    opts = Options()
+    for arg in ("--headless", "--no-sandbox", "--disable-dev-shm-usage", "--window-size=1920,1080",
+                "--disable-gpu", "--incognito", "--log-level=3"):
+        opts.add_argument(arg)
+    opts.add_argument(f"user-agent={USER_AGENT}")
+    opts.page_load_strategy = PAGE_LOAD_STRATEGY
+    if CHROME_BINARY:
+        opts.binary_location = CHROME_BINARY
+    if BLOCK_RESOURCES:
+        # Images are also switched off in the profile, which covers inline and CSS-less image loads.
+        opts.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+    return opts
+
+
+def blocked_url_patterns() -> list[str]:
+    patterns = []
+    for ext in BLOCKED_EXTENSIONS:
+        patterns += [f"*.{ext}", f"*.{ext}?*"]
+    for domain in BLOCKED_DOMAINS:
+        patterns += [f"*://{domain}/*", f"*.{domain}/*"]
+    return patterns
+
+
+def block_resources(driver):
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": blocked_url_patterns()})
+    except Exception as e:  # non-Chromium drivers have no CDP
+        logger.warning("Could not enable resource blocking, pages will load in full: %s", e)
+
+
+def wait_for_stable_text(driver, timeout: float, interval: float = STABLE_TEXT_INTERVAL,
+                         checks: int = STABLE_TEXT_CHECKS) -> int:
+    # Polls the length of the body text until it stops growing; returns the last length seen.
+    deadline = time.monotonic() + timeout
+    last, same = -1, 0
+    while True:
+        length = driver.execute_script("return document.body ? document.body.innerText.length : -1")
+        same = same + 1 if length == last and length > 0 else 0
+        last = length
+        if same >= checks - 1:
+            return length
+        if time.monotonic() >= deadline:
+            if length < 0:
+                raise TimeoutError(f"No page body after {timeout}s")
+            logger.info("Page text still changing after %.0fs, using what has loaded", timeout)
+            return length
+        time.sleep(interval)
+
+
+def load_page(driver, url: str, timeout: float) -> str:
+    with span("navigation") as fields:
+        start = time.perf_counter()
+        driver.set_page_load_timeout(timeout)
+        driver.get(url)
+        fields["text_chars"] = wait_for_stable_text(driver, timeout)
+        try:
+            transferred = driver.execute_script(
+                "return performance.getEntries().reduce((n, e) => n + (e.transferSize || 0), 0)")
+            fields["transferred_bytes"] = transferred or 0
+            logger.info("Loaded %s in %.2fs, %.0f KB transferred", url, time.perf_counter() - start, (transferred or 0) / 1024)
+        except Exception:
+            pass
+        return driver.page_source
+
+
+def frame_origins(driver) -> set[str]:
+    # Security origins of the current tab's page and all of its iframes, e.g. "https://shop.example".
+    try:
+        tree = driver.execute_cdp_cmd("Page.getFrameTree", {})["frameTree"]
+    except Exception:
+        return set()
+    origins, pending = set(), [tree]
+    while pending:
+        node = pending.pop()
+        origin = node.get("frame", {}).get("securityOrigin", "")
+        if origin.startswith(("http://", "https://")):
+            origins.add(origin)
+        pending.extend(node.get("childFrames", []))
+    return origins
+
+
+def navigation_status(driver) -> int | None:
+    # HTTP status of the page's main document (Chrome 109+); None when the browser does not expose it.
+    try:
+        status = driver.execute_script(
+            "const nav = performance.getEntriesByType('navigation')[0]; return nav ? nav.responseStatus || null : null")
+    except Exception:
+        return None
+    return int(status) if status else None
+
+
+class PooledDriver:
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages = 0
+        self.created_at = time.time()
+
+    def memory_mb(self) -> float | None:
+        if psutil is not None:
+            try:
+                proc = psutil.Process(self.driver.service.process.pid)
+                procs = [proc] + proc.children(recursive=True)
+                return sum(p.memory_info().rss for p in procs) / (1024 * 1024)
+            except Exception:
+                pass
+        try:
+            heap = self.driver.execute_script("return window.performance.memory ? window.performance.memory.usedJSHeapSize : null")
+            return heap / (1024 * 1024) if heap else None
+        except Exception:
+            return None
+
+
+class DriverPool:
+    def __init__(self, service, size: int = POOL_SIZE, max_pages: int = MAX_PAGES_PER_DRIVER,
+                 max_memory_mb: int = MAX_DRIVER_MEMORY_MB, options_factory=build_chrome_options):
+        self.service = service
+        self.size = max(1, size)
+        self.max_pages = max_pages
+        self.max_memory_mb = max_memory_mb
+        self.options_factory = options_factory
+        self._idle = []
+        self._created = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self.stats = {"launched": 0, "reused": 0, "recycled": 0, "unhealthy": 0}
+
+    def _launch(self) -> PooledDriver:
+        logger.info("Launching headless Chrome session (%d/%d)", self._created, self.size)
+        driver = webdriver.Chrome(service=self.service, options=self.options_factory())
+        if BLOCK_RESOURCES:
+            block_resources(driver)
+        self.stats["launched"] += 1
+        return PooledDriver(driver)
+
+    def _destroy(self, pooled: PooledDriver):
+        try:
+            pooled.driver.quit()
+        except Exception as e:
+            logger.debug("Error while quitting Chrome session: %s", e)
+        with self._cond:
+            self._created -= 1
+            self._cond.notify()
+
+    def _is_healthy(self, pooled: PooledDriver) -> bool:
+        try:
+            return pooled.driver.execute_script("return 1") == 1 and len(pooled.driver.window_handles) > 0
+        except Exception:
+            return False
+
+    def _needs_recycle(self, pooled: PooledDriver) -> bool:
+        if self.max_pages and pooled.pages >= self.max_pages:
+            return True
+        if self.max_memory_mb:
+            mem = pooled.memory_mb()
+            if mem is not None and mem > self.max_memory_mb:
+                logger.info("Chrome session using %.0f MB (limit %d MB), recycling", mem, self.max_memory_mb)
+                return True
+        return False
+
+    def _reset(self, pooled: PooledDriver):
+        driver = pooled.driver
+        handles = driver.window_handles
+        origins = set()
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            origins |= frame_origins(driver)
+            driver.close()
+        driver.switch_to.window(handles[0])
+        origins |= frame_origins(driver)
+        try:
+            driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+        except Exception:
+            pass  # about:blank and some error pages have no storage
+        try:
+            # WebDriver only reaches the current page's origin. Cookies go for every site at once;
+            # storage has to be cleared per origin, for each page and iframe that is still open.
+            driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+            for origin in sorted(origins):
+                driver.execute_cdp_cmd("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": "all"})
+        except Exception as e:  # non-Chromium drivers have no CDP
+            logger.debug("Could not clear browser data through CDP: %s", e)
+            driver.delete_all_cookies()
+        driver.get("about:blank")
+
+    def checkout(self, timeout: float | None = CHECKOUT_TIMEOUT) -> PooledDriver:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            pooled = None
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("Driver pool is closed")
+                    if self._idle:
+                        pooled = self._idle.pop()
+                        break
+                    if self._created < self.size:
+                        self._created += 1
+                        break
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError(f"No Chrome session became available within {timeout}s")
+                    self._cond.wait(remaining)
+            if pooled is None:
+                try:
+                    return self._launch()
+                except Exception:
+                    with self._cond:
+                        self._created -= 1
+                        self._cond.notify()
+                    raise
+            if self._is_healthy(pooled):
+                self.stats["reused"] += 1
+                return pooled
+            logger.warning("Discarding unhealthy Chrome session")
+            self.stats["unhealthy"] += 1
+            self._destroy(pooled)
+
+    def checkin(self, pooled: PooledDriver):
+        pooled.pages += 1
+        if self._closed or self._needs_recycle(pooled):
+            self.stats["recycled"] += 1
+            self._destroy(pooled)
+            return
+        try:
+            self._reset(pooled)
+        except Exception as e:
+            logger.warning("Failed to reset Chrome session, discarding it: %s", e)
+            self.stats["unhealthy"] += 1
+            self._destroy(pooled)
+            return
+        with self._cond:
+            self._idle.append(pooled)
+            self._cond.notify()
+
+    @contextmanager
+    def driver(self, timeout: float | None = CHECKOUT_TIMEOUT):
+        with span("driver_acquire"):
+            pooled = self.checkout(timeout)
+        try:
+            yield pooled.driver
+        finally:
+            self.checkin(pooled)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for pooled in idle:
+            self._destroy(pooled)
+
+
+_shared_pool = None
+_shared_lock = threading.Lock()
+
+
+def get_driver_pool(service, size: int | None = None) -> DriverPool:
+    global _shared_pool
+    with _shared_lock:
+        if _shared_pool is None or _shared_pool._closed:
+            _shared_pool = DriverPool(service, size=size or POOL_SIZE)
+        elif size and size > _shared_pool.size:
+            _shared_pool.size = size
+        return _shared_pool
+
+
+def shutdown_driver_pool():
+    global _shared_pool
+    with _shared_lock:
+        if _shared_pool is not None:
+            _shared_pool.close()
+            _shared_pool = None
+
+
+atexit.register(shutdown_driver_pool)
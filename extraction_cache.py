@@ -0,0 +1,113 @@
+# ON-DISK CACHE OF LLM EXTRACTION RESULTS, KEYED ON THE PAGE TEXT, MODEL AND PROMPT VERSION.
+
+# Re-extracting a page whose text has not changed returns the stored JSON instead of paying for
+# another Gaia call. Entries expire after a TTL and the least recently used ones are evicted
+# once the cache grows past its size limit.
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.getenv("GAIA_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "gaia-extractor"))
+CACHE_ENABLED = os.getenv("GAIA_EXTRACTION_CACHE", "1") != "0"
+CACHE_TTL = int(os.getenv("GAIA_CACHE_TTL", str(7 * 24 * 3600)))
+CACHE_MAX_ENTRIES = int(os.getenv("GAIA_CACHE_MAX_ENTRIES", "10000"))
+
+
+def sha256(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class ExtractionCache:
+    def __init__(self, path: str, ttl: int = CACHE_TTL, max_entries: int = CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0}
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS extractions ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_extractions_access ON extractions(last_access)")
+        self._db.commit()
+
+    @staticmethod
+    def make_key(text: str, model: str, system_prompt: str) -> str:
+        return sha256("\0".join((sha256(text), model or "", sha256(system_prompt or ""))))
+
+    def get(self, key: str) -> dict | None:
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT value, created_at FROM extractions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            value, created_at = row
+            if self.ttl and now - created_at > self.ttl:
+                self._db.execute("DELETE FROM extractions WHERE key = ?", (key,))
+                self._db.commit()
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+                return None
+            self._db.execute("UPDATE extractions SET last_access = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            self.stats["hits"] += 1
+        return json.loads(value)
+
+    def put(self, key: str, value: dict):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO extractions (key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now, now),
+            )
+            if self.max_entries:
+                (count,) = self._db.execute("SELECT COUNT(*) FROM extractions").fetchone()
+                overflow = count - self.max_entries
+                if overflow > 0:
+                    self._db.execute(
+                        "DELETE FROM extractions WHERE key IN "
+                        "(SELECT key FROM extractions ORDER BY last_access ASC LIMIT ?)", (overflow,)
+                    )
+                    self.stats["evictions"] += overflow
+            self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM extractions")
+            self._db.commit()
+
+    def summary(self) -> dict:
+        with self._lock:
+            (entries,) = self._db.execute("SELECT COUNT(*) FROM extractions").fetchone()
+        lookups = self.stats["hits"] + self.stats["misses"]
+        hit_rate = self.stats["hits"] / lookups if lookups else 0.0
+        return {**self.stats, "entries": entries, "hit_rate": round(hit_rate, 3)}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_extraction_cache() -> ExtractionCache | None:
+    global _cache
+    if not CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = ExtractionCache(os.path.join(CACHE_DIR, "extractions.sqlite"))
+            except (OSError, sqlite3.Error) as e:
+                logger.warning("Extraction cache disabled, could not open it: %s", e)
+                return None
+        return _cache
@@ -6,20 +6,33 @@
 # MAKE SURE YOU USE PUBLIC LINK THAT DONT REQUIRE AUTHENTICATION
 
 import requests
-from bs4 import BeautifulSoup
-from openai import OpenAI
+import argparse
 import json
 import os
 from dotenv import load_dotenv
-import tempfile
-import shutil
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
+import time
+from driver_binary import get_chrome_service
+from driver_pool import get_driver_pool
+from fetcher import fetch_static, fetch_in_browser, domain_of
+from text_extract import clean_html
+from document import Document
+from context_packing import pack_for_extraction
+from retrieval import RetrievalIndex
+from json_stream import stream_json_fields
+from http_cache import get_http_cache, remember_page_text, remembered_structured
+from llm_gateway import get_gateway, estimate_tokens
+from extraction_cache import ExtractionCache, get_extraction_cache
+from batch import run_batch, read_urls, FETCH_WORKERS, LLM_WORKERS
+from schema import ExtractionSchema, SchemaValidationError, load_schema, SCHEMA_MESSAGE
+from structured_data import harvest, merge_prefilled, reduce_extraction
+from monitor import PageMonitor, get_monitor, diff_json, SIMHASH_THRESHOLD
+from job_store import JobStore, run_job, MAX_ATTEMPTS
+from politeness import get_scheduler, MAX_PER_HOST
+from instrumentation import is_worker_process, traced, start_metrics_server, stage_summary, token_summary
+from json_repair import coerce_to_schema, load_llm_json, summary as json_repair_summary
+from resilience import CircuitOpenError, RetryBudget, call_with_retries, classify, open_circuits, RETRY_BUDGET
+from micro_batch import plan_groups, extract_group, MICRO_BATCH_MAX_DOCS, stats as micro_batch_stats
+from datetime import datetime
 
 load_dotenv()
 
@@ -28,11 +41,8 @@ GAIA_DOMAIN_URL = os.getenv("GAIA_DOMAIN_URL")
 OPENAI_API_KEY = os.getenv("GAIA_API_KEY")
 model = os.getenv("MODEL")
 
-client = OpenAI(
-    base_url=f"{GAIA_DOMAIN_URL}/v1",
-    api_key=OPENAI_API_KEY,
-    timeout=90.0
-)
+# Spawned HTML cleaning workers re-import this module as __mp_main__ and never call Gaia.
+client = None if is_worker_process() else get_gateway(f"{GAIA_DOMAIN_URL}/v1", OPENAI_API_KEY, timeout=90.0)
 
 UNIVERSAL_SYSTEM_PROMPT = """
 You are a highly intelligent and versatile AI assistant. Your primary task is to extract relevant information from any given web page text content and return it in a structured JSON format.
@@ -103,105 +113,377 @@ Example for a General Informational Page (e.g., Wikipedia):
 }
 """
 
+@traced("fetch_page")
 def get_text_from_url(url, service_obj, max_bytes_to_read=100 * 1024 * 1024, retries=3, initial_timeout=20):
-    temp_file_path = None
-    driver = None
-
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
-
-    temp_dir = tempfile.mkdtemp()
-    temp_file_path = os.path.join(temp_dir, 'extracted_content.txt')
-
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--window-size=1920,1080")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--incognito")
-    chrome_options.add_argument(f"user-agent={headers['User-Agent']}")
-    chrome_options.add_argument("--log-level=3")
-
-    for attempt in range(retries):
-        print(f"GAIA 🤖 : Attempt {attempt + 1}/{retries}: Fetching {url} with Selenium... ⏳")
-
-        driver = None 
+    fetch_start = time.perf_counter()
+    full_html_content, text_content = fetch_static(url)
+    served_over_http = full_html_content is not None
+    if text_content is not None:
+        print("GAIA 🤖 : Page not modified since the last visit (HTTP 304), reusing stored text. ♻️")
+    elif served_over_http:
+        print("GAIA 🤖 : Page served as plain HTML, no browser needed. ⚡")
+    else:
+        pool = get_driver_pool(service_obj)
+
+        def load_in_browser():
+            page_source = fetch_in_browser(pool, url, initial_timeout)
+            print("GAIA 🤖 : Page text finished loading, proceeding to extract. ✅")
+            return page_source
+
+        def on_retry(attempt, error, delay):
+            print(f"GAIA 🤖 : Attempt {attempt}/{retries} failed: {error} ❌ Retrying in {delay:.1f}s... ⏳")
+
+        print(f"GAIA 🤖 : Fetching {url} with Selenium... ⏳")
         try:
-            driver = webdriver.Chrome(service=service_obj, options=chrome_options)
-            driver.set_page_load_timeout(initial_timeout)
-            driver.get(url)
-
-            WebDriverWait(driver, initial_timeout * 2).until(
-                EC.presence_of_element_located((By.TAG_NAME, "body"))
-            )
-            print("GAIA 🤖 : Page content (body tag) found, proceeding to extract. ✅")
-
-            full_html_content = driver.page_source
-
-            soup = BeautifulSoup(full_html_content, 'html.parser')
-
-            for script_or_style in soup(['script', 'style', 'header', 'footer', 'nav', 'aside', 'noscript']):
-                script_or_style.decompose()
-
-            text_content = soup.get_text(separator=' ', strip=True)
-            text_content = ' '.join(text_content.split())
-
-            if len(text_content.encode('utf-8')) > max_bytes_to_read:
-                print(f"GAIA 🤖 : Warning: Extracted text content is large ({len(text_content.encode('utf-8')) / (1024*1024):.2f} MB), truncating for temp file. ✂️")
-                text_content = text_content[:max_bytes_to_read]
-
-            with open(temp_file_path, 'w', encoding='utf-8') as f:
-                f.write(text_content)
-
-            print(f"GAIA 🤖 : Extracted text written to temporary file: {temp_file_path} 📝")
-            return temp_file_path 
-        except Exception as e: 
-            print(f"GAIA 🤖 : Error during Selenium fetch attempt {attempt + 1}: {e} ❌")
-            if attempt == retries - 1:
-                print("GAIA 🤖 : Max retries reached for fetching URL. Returning None. 😔")
-                return None
-        finally:
-            if driver:
-                driver.quit() 
-    return None 
-
-def extract_info_with_gaia_agent(temp_file_path: str) -> tuple[dict, str]:
-    with open(temp_file_path, 'r', encoding='utf-8') as f:
-        text_content = f.read()
-
-    user_message_extraction = f"Extract information from the following web page content:\n\n{text_content[:8000]}..."
-
-    chat_completion = client.chat.completions.create(
+            full_html_content = call_with_retries(load_in_browser, domain_of(url), attempts=retries, on_retry=on_retry)
+        except CircuitOpenError as e:
+            print(f"GAIA 🤖 : {e}. Returning None. 😔")
+            return None
+        except Exception as e:
+            print(f"GAIA 🤖 : Could not fetch {url} ({classify(e)} error): {e} ❌ Returning None. 😔")
+            return None
+
+    timings = {"fetch": round(time.perf_counter() - fetch_start, 3)}
+    structured = {}
+    if text_content is not None:
+        source = "not_modified"
+        structured = remembered_structured(url)
+    else:
+        structured = harvest(full_html_content)
+        source = "http" if served_over_http else "browser"
+        clean_start = time.perf_counter()
+        text_content = clean_html(full_html_content)
+        timings["clean"] = round(time.perf_counter() - clean_start, 3)
+
+        if len(text_content.encode('utf-8')) > max_bytes_to_read:
+            print(f"GAIA 🤖 : Warning: Extracted text content is large ({len(text_content.encode('utf-8')) / (1024*1024):.2f} MB), truncating. ✂️")
+            text_content = text_content[:max_bytes_to_read]
+
+        if served_over_http:
+            remember_page_text(url, text_content, structured)
+
+    document = Document(url, text_content, source, timings, structured=structured)
+    print(f"GAIA 🤖 : Extracted {document.byte_length / 1024:.1f} KB of text in {timings['fetch'] + timings.get('clean', 0):.2f}s. 📝")
+    return document
+
+EXTRACTION_MESSAGE = "Extract information from the following web page content:\n\n{}..."
+QA_SYSTEM_PROMPT = "You are a highly intelligent, insightful, and adaptable AI assistant of GAIANET. Based on the provided webpage content, answer the user's question. If a direct answer isn't present, use your intelligence to infer, evaluate, or provide a reasoned assessment based on the information and implications of the text. This includes subjective qualities or potential 'ratings' if the content describes features that support such an assessment. Always ensure your response is logically derived from and consistent with the provided content. If an answer truly cannot be formed, state so professionally."
+QA_MESSAGE = "Based on the following content, please answer the question:\n\nContent:\n{}\n\nQuestion: {}"
+
+def prepare_extraction(text_content: str, schema: ExtractionSchema | None = None) -> tuple[str, str, str]:
+    # Returns (system prompt, packed page text, user message) for the universal prompt or a targeted schema.
+    system_prompt = schema.prompt if schema else UNIVERSAL_SYSTEM_PROMPT
+    packed = pack_for_extraction(text_content, system_prompt)
+    return system_prompt, packed, (SCHEMA_MESSAGE if schema else EXTRACTION_MESSAGE).format(packed)
+
+def ask_gaia_for_fields(text_content: str, on_field=None, schema: ExtractionSchema | None = None) -> dict:
+    system_prompt, _, user_message_extraction = prepare_extraction(text_content, schema)
+
+    cache = get_extraction_cache()
+    cache_key = ExtractionCache.make_key(user_message_extraction, model, system_prompt)
+    if cache:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            print("GAIA 🤖 : Page text unchanged since a previous extraction, using cached result. ♻️")
+            return cached
+
+    request = dict(
         model=model,
         messages=[
-            {"role": "system", "content": UNIVERSAL_SYSTEM_PROMPT},
+            {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_message_extraction},
         ],
         response_format={"type": "json_object"}
     )
-    llm_response_content = chat_completion.choices[0].message.content
-    extracted_info_dict = json.loads(llm_response_content) 
+    if on_field:
+        # Streamed so each field can be shown as soon as the model has finished writing it.
+        llm_response_content, _ = stream_json_fields(client.stream_chat(**request), on_field)
+    else:
+        llm_response_content = client.chat(**request).choices[0].message.content
+    extracted_info_dict = load_llm_json(llm_response_content, client.chat, model, schema)
+    if schema:
+        extracted_info_dict = schema.validate(extracted_info_dict)
+
+    if cache:
+        cache.put(cache_key, extracted_info_dict)
+    return extracted_info_dict
+
+@traced("extract_page")
+def extract_info_with_gaia_agent(document: Document, on_field=None, schema: ExtractionSchema | None = None) -> tuple[dict, str]:
+    text_content = document.text
+
+    prefilled, remaining = reduce_extraction(document.structured, schema)
+    if not prefilled:
+        return ask_gaia_for_fields(text_content, on_field, schema), text_content
+
+    if on_field:
+        for key, value in prefilled.items():
+            on_field(key, value)
+    if remaining is None:
+        print("GAIA 🤖 : All key fields found in the page's structured data (JSON-LD/microdata/OpenGraph), no AI call needed. ⚡")
+        return (schema.validate(prefilled) if schema else prefilled), text_content
+    print(f"GAIA 🤖 : {len(prefilled)} fields found in the page's structured data, asking the AI only for: {', '.join(remaining.properties)}. 🎯")
+    missing_info = ask_gaia_for_fields(text_content, on_field, remaining)
+    merged = merge_prefilled(prefilled, missing_info)
+    return (schema.validate(merged) if schema else merged), text_content
+
+def extract_and_release(document: Document, schema: ExtractionSchema | None = None) -> dict:
+    try:
+        extracted_info, _ = extract_info_with_gaia_agent(document, schema=schema)
+        return extracted_info
+    finally:
+        document.release()
+
+def extract_many_and_release(documents: list[Document], max_docs: int = MICRO_BATCH_MAX_DOCS,
+                             schema: ExtractionSchema | None = None) -> list:
+    # Returns one dict (or the exception it raised) per document, in order. Small pages share a request.
+    results = [None] * len(documents)
+    try:
+        cache = get_extraction_cache()
+        pending = []
+        system_prompt = schema.prompt if schema else UNIVERSAL_SYSTEM_PROMPT
+        for i, document in enumerate(documents):
+            if reduce_extraction(document.structured, schema)[0]:
+                # Structured data already answers most of it: skip the call or ask for the gaps only.
+                try:
+                    results[i], _ = extract_info_with_gaia_agent(document, schema=schema)
+                except Exception as e:
+                    results[i] = e
+                continue
+            _, packed, message = prepare_extraction(document.text, schema)
+            cache_key = ExtractionCache.make_key(message, model, system_prompt)
+            cached = cache.get(cache_key) if cache else None
+            if cached is not None:
+                results[i] = cached
+            else:
+                pending.append((i, packed, cache_key))
 
-    return extracted_info_dict, text_content
+        sizes = [estimate_tokens(packed) for _, packed, _ in pending]
+        for group in plan_groups(sizes, max_docs=max_docs):
+            batched = {}
+            if len(group) > 1:
+                texts = {f"doc{n}": pending[n][1] for n in group}
+                try:
+                    batched = extract_group(client.chat, model, system_prompt, texts)
+                except Exception as e:
+                    print(f"GAIA 🤖 : Grouped extraction of {len(group)} pages failed ({e}), extracting them one by one. 🔁")
+            for n in group:
+                i, _, cache_key = pending[n]
+                data = batched.get(f"doc{n}")
+                if data is not None and schema:
+                    try:
+                        data = schema.validate(coerce_to_schema(data, schema))
+                    except ValueError:
+                        data = None
+                if data is None:
+                    try:
+                        data, _ = extract_info_with_gaia_agent(documents[i], schema=schema)
+                    except Exception as e:
+                        results[i] = e
+                        continue
+                elif cache:
+                    cache.put(cache_key, data)
+                results[i] = data
+        return results
+    finally:
+        for document in documents:
+            document.release()
+
+def _monitor_result(report, extracted: dict) -> dict:
+    result = report.summary()
+    result["extracted"] = extracted
+    if report.changed and report.previous is not None:
+        result["diff"] = diff_json(report.previous, extracted)
+    return result
+
+def monitor_many_and_release(documents: list[Document], monitor: PageMonitor, max_docs: int = MICRO_BATCH_MAX_DOCS,
+                             schema: ExtractionSchema | None = None) -> list:
+    # Like extract_many_and_release(), but pages whose relevant content did not change reuse the last JSON.
+    system_prompt = schema.prompt if schema else UNIVERSAL_SYSTEM_PROMPT
+    profile = schema.hash if schema else "universal"
+    results, changed = [None] * len(documents), []
+    for i, document in enumerate(documents):
+        try:
+            report = monitor.check(document.url, document.text, system_prompt, profile)
+        except Exception as e:
+            results[i] = e
+            document.release()
+            continue
+        if report.changed:
+            changed.append((i, report))
+        else:
+            results[i] = _monitor_result(report, report.previous)
+            document.release()
+    extracted = extract_many_and_release([documents[i] for i, _ in changed], max_docs, schema)
+    for (i, report), data in zip(changed, extracted):
+        if isinstance(data, Exception):
+            results[i] = data
+            continue
+        monitor.record(documents[i].url, report, data, profile)
+        results[i] = _monitor_result(report, data)
+    return results
+
+def monitor_and_release(document: Document, monitor: PageMonitor, schema: ExtractionSchema | None = None) -> dict:
+    result = monitor_many_and_release([document], monitor, 1, schema)[0]
+    if isinstance(result, Exception):
+        raise result
+    return result
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="GAIA Universal Smart Data Extractor")
+    parser.add_argument("--batch", metavar="FILE", help="extract every URL in FILE (one per line or JSONL, '-' for stdin) instead of the interactive prompt")
+    parser.add_argument("--output", metavar="FILE", help="JSONL file for batch results (default: gaia_batch_<timestamp>.jsonl)")
+    parser.add_argument("--fetch-workers", type=int, default=FETCH_WORKERS, help="concurrent page fetches in batch mode")
+    parser.add_argument("--llm-workers", type=int, default=LLM_WORKERS, help="concurrent Gaia extraction calls in batch mode")
+    parser.add_argument("--micro-batch", type=int, default=MICRO_BATCH_MAX_DOCS, metavar="N", help="pack up to N small pages into one Gaia request in batch mode (1 disables)")
+    parser.add_argument("--monitor", metavar="FILE", help="like --batch, but only re-extract pages whose relevant content changed since the last run, and report JSON diffs")
+    parser.add_argument("--change-threshold", type=int, default=SIMHASH_THRESHOLD, metavar="BITS", help="SimHash distance above which a page counts as changed in monitor mode")
+    parser.add_argument("--schema", metavar="SCHEMA", help="extract only these fields: a JSON Schema file, inline JSON or a list like 'price:number,availability'")
+    parser.add_argument("--max-per-host", type=int, default=MAX_PER_HOST, help="concurrent fetches allowed per host in batch mode")
+    parser.add_argument("--job-db", metavar="FILE", help="track --batch/--monitor progress per URL in this SQLite job store so the run can be resumed")
+    parser.add_argument("--resume", metavar="FILE", help="resume the job stored in FILE: skip extracted URLs and retry failed ones")
+    parser.add_argument("--max-attempts", type=int, default=MAX_ATTEMPTS, help="attempts per URL before a job gives up on it")
+    parser.add_argument("--retry-budget", type=int, default=RETRY_BUDGET, metavar="N", help="retries allowed across the whole batch for fetches and Gaia calls (0 = unlimited)")
+    parser.add_argument("--export", metavar="FILE", help="after a job run, write all extracted results from the job store to FILE as JSONL")
+    args = parser.parse_args()
+
+    job_store = None
+    mode = "monitor" if args.monitor else "batch"
+    if args.resume:
+        if not os.path.exists(args.resume):
+            print(f"GAIA 🤖 : Job store {args.resume} not found. ❌")
+            exit(1)
+        job_store = JobStore(args.resume, args.max_attempts)
+        saved_options = job_store.get_meta("options", {})
+        mode = saved_options.get("mode", mode)
+        args.schema = args.schema or saved_options.get("schema")
+        args.output = args.output or saved_options.get("output")
+        args.micro_batch = saved_options.get("micro_batch", args.micro_batch)
+        args.change_threshold = saved_options.get("change_threshold", args.change_threshold)
+    elif args.job_db:
+        if not (args.batch or args.monitor):
+            print("GAIA 🤖 : --job-db needs --batch or --monitor. ❌")
+            exit(1)
+        job_store = JobStore(args.job_db, args.max_attempts)
+
+    extraction_schema = None
+    if args.schema:
+        try:
+            extraction_schema = load_schema(args.schema)
+        except (OSError, ValueError) as e:
+            print(f"GAIA 🤖 : Invalid --schema: {e} ❌")
+            exit(1)
+
     print("========================================================")
     print("✨ GAIA 🤖 : Universal Smart Data Extractor Initiated ✨")
     print(f"GAIA 🤖 : Connecting to Gaia Domain... 🌐")
+    metrics_port = start_metrics_server()
+    if metrics_port:
+        print(f"GAIA 🤖 : Metrics at http://localhost:{metrics_port}/metrics 📊")
+    if extraction_schema:
+        print(f"GAIA 🤖 : Targeted extraction of {len(extraction_schema.properties)} fields (schema {extraction_schema.hash}). 🎯")
     print("========================================================")
 
     service = None
     try:
-        print("GAIA 🤖 : Installing Chrome Driver (this happens once)... ⏳")
-        chrome_driver_path = ChromeDriverManager().install()
-        service = Service(chrome_driver_path)
-        print("GAIA 🤖 : Chrome Driver installed successfully. ✅")
+        service = get_chrome_service()
+        print(f"GAIA 🤖 : Using Chrome Driver at {service.path}. ✅")
     except Exception as e:
-        print(f"GAIA 🤖 : Error installing Chrome Driver: {e}. Cannot proceed without WebDriver. Exiting. ❌, Please close this Terminal and run script again.")
+        print(f"GAIA 🤖 : Error locating Chrome Driver: {e}. Cannot proceed without WebDriver. Exiting. ❌, Please close this Terminal and run script again.")
         exit(1) 
 
+    if args.batch or args.monitor or job_store:
+        output_path = args.output or f"gaia_{mode}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+        get_driver_pool(service, size=args.fetch_workers)
+        print(f"GAIA 🤖 : {mode.capitalize()} mode: {args.fetch_workers} fetch workers, {args.llm_workers} LLM workers, writing to {output_path} 📦")
+        print("========================================================")
+        if mode == "monitor":
+            page_monitor = get_monitor(args.change_threshold)
+            extract_one = lambda document: monitor_and_release(document, page_monitor, extraction_schema)
+            extract_many = lambda documents: monitor_many_and_release(documents, page_monitor, args.micro_batch, extraction_schema)
+        else:
+            extract_one = lambda document: extract_and_release(document, extraction_schema)
+            extract_many = lambda documents: extract_many_and_release(documents, args.micro_batch, extraction_schema)
+        run_options = dict(
+            fetch_workers=args.fetch_workers,
+            llm_workers=args.llm_workers,
+            extract_many_fn=extract_many if args.micro_batch > 1 else None,
+            group_size=args.micro_batch,
+            scheduler=get_scheduler(),
+            budget=RetryBudget(max(0, args.retry_budget)),
+        )
+        run_options["scheduler"].max_per_host = max(1, args.max_per_host)
+        try:
+            if job_store:
+                if not args.resume:
+                    added = job_store.add_items(read_urls(args.batch or args.monitor))
+                    job_store.set_meta("options", {"mode": mode, "schema": args.schema, "output": output_path,
+                                                   "micro_batch": args.micro_batch, "change_threshold": args.change_threshold})
+                    print(f"GAIA 🤖 : {added} new URLs added to job store {job_store.path}. 🗂️")
+                job_stats = run_job(job_store, lambda url: get_text_from_url(url, service), extract_one, output_path, **run_options)
+                print("========================================================")
+                print(f"GAIA 🤖 : Job finished in {job_stats['seconds']}s: {job_stats['extracted']}/{job_stats['total']} extracted, "
+                      f"{job_stats['gave_up']} failed after {args.max_attempts} attempts. ✅")
+                if args.export:
+                    print(f"GAIA 🤖 : {job_store.export(args.export)} results exported to {args.export}. 💾")
+            else:
+                stats = run_batch(
+                    read_urls(args.batch or args.monitor),
+                    lambda url: get_text_from_url(url, service),
+                    extract_one,
+                    output_path,
+                    **run_options,
+                )
+                print("========================================================")
+                print(f"GAIA 🤖 : Batch finished in {stats['seconds']}s: {stats['ok']}/{stats['total']} extracted, "
+                      f"{stats['fetch_failed']} fetch failures, {stats['extract_failed']} extraction failures. ✅")
+        except KeyboardInterrupt:
+            print("\n========================================================")
+            if job_store:
+                print(f"GAIA 🤖 : Interrupted. Finished URLs are saved; continue with --resume {job_store.path} ⏸️")
+            else:
+                print(f"GAIA 🤖 : Interrupted. Results so far are in {output_path}; use --job-db next time to make runs resumable. ⏸️")
+            exit(130)
+        host_stats = run_options["scheduler"].summary()
+        if host_stats:
+            slowest = sorted(host_stats.items(), key=lambda item: -(item[1]["avg_latency"] or 0))[:5]
+            print(f"GAIA 🤖 : Fetched from {len(host_stats)} hosts, "
+                  f"{sum(h['throttled'] for h in host_stats.values())} throttled responses (429/503). Slowest hosts: 🐢")
+            for host, host_summary in slowest:
+                print(f"GAIA 🤖 :   {host}: {host_summary['fetches']} fetches, avg {host_summary['avg_latency']}s, "
+                      f"{host_summary['errors']} errors, {host_summary['throttled']} throttled, gap {host_summary['delay']}s")
+        stages = stage_summary()
+        if stages:
+            print("GAIA 🤖 : Time per stage (calls, average, total): ⏱️")
+            for stage, stage_stats in sorted(stages.items(), key=lambda item: -item[1]["total"]):
+                print(f"GAIA 🤖 :   {stage}: {stage_stats['count']}x, avg {stage_stats['avg']}s, total {stage_stats['total']}s")
+        tokens = token_summary()
+        if tokens.get("requests"):
+            print(f"GAIA 🤖 : Gaia usage: {tokens['requests']:.0f} requests, {tokens.get('prompt', 0):.0f} prompt tokens, "
+                  f"{tokens.get('completion', 0):.0f} completion tokens. 🧮")
+        budget = run_options["budget"].summary()
+        print(f"GAIA 🤖 : Retries: {budget['spent']} of {budget['total'] or 'unlimited'} budget used. 🔁")
+        if open_circuits():
+            print(f"GAIA 🤖 : Still failing, skipped fast after repeated errors: {', '.join(open_circuits())} 🚧")
+        if mode == "monitor":
+            monitor_stats = page_monitor.summary()
+            print(f"GAIA 🤖 : Monitor: {monitor_stats['changed']} pages changed and were re-extracted, "
+                  f"{monitor_stats['unchanged']} unchanged pages reused their last result. 🔍")
+        if micro_batch_stats["requests"]:
+            print(f"GAIA 🤖 : Micro-batching: {micro_batch_stats['documents']} pages sent in {micro_batch_stats['requests']} grouped requests, "
+                  f"{micro_batch_stats['fallbacks']} fell back to single requests. 📦")
+        repairs = json_repair_summary()
+        if repairs["repaired"] or repairs["llm_repaired"] or repairs["failed"]:
+            print(f"GAIA 🤖 : JSON answers: {repairs['repaired']} repaired locally, {repairs['llm_repaired']} fixed by a follow-up call, "
+                  f"{repairs['failed']} unusable ({repairs['repair_rate']:.0%} needed repair). 🩹")
+        if get_http_cache():
+            http_stats = get_http_cache().summary()
+            print(f"GAIA 🤖 : HTTP cache: {http_stats['fetches_avoided']} fetches avoided, {http_stats['bytes_saved'] / 1024:.0f} KB not downloaded. 📉")
+        if get_extraction_cache():
+            cache_stats = get_extraction_cache().summary()
+            print(f"GAIA 🤖 : Extraction cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses ({cache_stats['hit_rate']:.0%} hit rate). ♻️")
+        print("========================================================")
+        exit(0)
 
     while True:
         user_url = input("YOU 🙋 : Enter the URL to extract data from (or 'exit' to quit): ").strip()
@@ -215,22 +497,29 @@ if __name__ == "__main__":
             print("========================================================")
             continue
 
-        temp_file_to_clean = None
+        document = None
         try:
             print(f"GAIA 🤖 : Attempting to fetch text from: {user_url} 🚀")
-            temp_file_path = get_text_from_url(user_url, service)
+            document = get_text_from_url(user_url, service)
 
             print("========================================================")
-            if temp_file_path:
-                temp_file_to_clean = temp_file_path
-                print("GAIA 🤖 : Text fetched and stored in temporary file. Sending to Gaia AI agent for universal extraction... 🧠")
+            if document:
+                print("GAIA 🤖 : Text fetched. Sending to Gaia AI agent for universal extraction... 🧠")
                 try:
-                    extracted_info, full_webpage_text = extract_info_with_gaia_agent(temp_file_path)
+                    extracted_info, full_webpage_text = extract_info_with_gaia_agent(
+                        document, on_field=lambda key, value: print(f"GAIA 🤖 : {key}: {json.dumps(value, ensure_ascii=False)} ✨"),
+                        schema=extraction_schema,
+                    )
                 except json.JSONDecodeError as e:
                     print(f"GAIA 🤖 : Error: Initial AI extraction response was not valid JSON. {e} ❗")
                     print("GAIA 🤖 : Please check the Gaia AI agent's response format. 😕")
                     print("========================================================")
                     extracted_info = None 
+                    full_webpage_text = None
+                except SchemaValidationError as e:
+                    print(f"GAIA 🤖 : Error: The AI response did not match the --schema: {e} ❗")
+                    print("========================================================")
+                    extracted_info = None
                     full_webpage_text = None 
 
                 if extracted_info: 
@@ -248,8 +537,8 @@ if __name__ == "__main__":
 
 
        
-                        qa_system_prompt = "You are a highly intelligent, insightful, and adaptable AI assistant of GAIANET. Based on the provided webpage content, answer the user's question. If a direct answer isn't present, use your intelligence to infer, evaluate, or provide a reasoned assessment based on the information and implications of the text. This includes subjective qualities or potential 'ratings' if the content describes features that support such an assessment. Always ensure your response is logically derived from and consistent with the provided content. If an answer truly cannot be formed, state so professionally."
-                        qa_text_context = full_webpage_text[:15000]
+                        qa_text_context = full_webpage_text
+                        qa_index = RetrievalIndex(full_webpage_text)
 
                         while True:
                             user_question = input("YOU ❓ : Your question: ").strip()
@@ -265,18 +554,19 @@ if __name__ == "__main__":
                                 break
 
 
-                            qa_user_message = f"Based on the following content, please answer the question:\n\nContent:\n{qa_text_context}\n\nQuestion: {user_question}"
+                            qa_user_message = QA_MESSAGE.format(qa_index.context_for(user_question), user_question)
 
                             try:
-                                qa_completion = client.chat.completions.create(
+                                print("GAIA 💡 : **AI Answer:** ", end="", flush=True)
+                                for delta in client.stream_chat(
                                     model=model,
                                     messages=[
-                                        {"role": "system", "content": qa_system_prompt},
+                                        {"role": "system", "content": QA_SYSTEM_PROMPT},
                                         {"role": "user", "content": qa_user_message},
                                     ],
-                                )
-                                qa_answer = qa_completion.choices[0].message.content
-                                print(f"GAIA 💡 : **AI Answer:** {qa_answer}\n")
+                                ):
+                                    print(delta, end="", flush=True)
+                                print("\n")
                                 print("========================================================")
                             except Exception as e:
                                 print(f"GAIA 🤖 : Error getting AI answer: {e} ❗")
@@ -297,9 +587,8 @@ if __name__ == "__main__":
                 print("========================================================")
 
         finally:
-            if temp_file_to_clean and os.path.exists(os.path.dirname(temp_file_to_clean)):
-                print(f"GAIA 🤖 : Cleaning up temporary directory: {os.path.dirname(temp_file_to_clean)} 🧹")
-                shutil.rmtree(os.path.dirname(temp_file_to_clean))
+            if document:
+                document.release()
             print("========================================================")
 
     print("\n--- Script finished ---")
\ No newline at end of file
@@ -0,0 +1,200 @@
+# HTTP-FIRST FETCH TIER. A PLAIN GET IS TRIED BEFORE STARTING CHROME.
+
+# Pages that come back as server-rendered HTML are used directly. Pages that look client-rendered
+# (almost no text, a <noscript> wall, an empty SPA root) are escalated to the Selenium path.
+# The tier that worked is remembered per domain so repeat domains skip the wasted attempt.
+
+import os
+import re
+import json
+import logging
+import threading
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from driver_pool import USER_AGENT, load_page, navigation_status
+from http_cache import get_http_cache
+from politeness import HostThrottled, get_scheduler, THROTTLE_STATUSES
+from instrumentation import span
+from resilience import TERMINAL, classify, classify_status, get_breaker
+
+try:
+    import brotli  # noqa: F401  (lets urllib3 decode "br" responses)
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+logger = logging.getLogger(__name__)
+
+HTTP_TIER = "http"
+BROWSER_TIER = "browser"
+HTTP_TIMEOUT = 10
+MIN_TEXT_CHARS = int(os.getenv("GAIA_MIN_STATIC_TEXT_CHARS", "500"))
+SPA_TEXT_CHARS = 2000
+POOL_HOSTS = 32
+POOL_PER_HOST = 8
+TIER_MEMORY_FILE = os.getenv("GAIA_TIER_MEMORY_FILE")
+
+_SCRIPT_STYLE_RE = re.compile(r"<(script|style|template)\b.*?</\1\s*>", re.I | re.S)
+_NOSCRIPT_RE = re.compile(r"<noscript\b[^>]*>(.*?)</noscript\s*>", re.I | re.S)
+_TAG_RE = re.compile(r"<[^>]+>")
+_NOSCRIPT_WALL_RE = re.compile(r"(enable|requires?|turn on|need)\s+javascript|javascript\s+(is\s+)?(required|disabled)", re.I)
+_SPA_ROOT_RE = re.compile(
+    r"<div[^>]+id=[\"'](root|app|__next|__nuxt|svelte|main-app)[\"'][^>]*>\s*</div>"
+    r"|\bng-app\b|\bng-version=|data-reactroot|window\.__INITIAL_STATE__|window\.__NUXT__",
+    re.I,
+)
+_META_CHARSET_RE = re.compile(rb"<meta[^>]+charset\s*=\s*[\"']?\s*([\w.:-]+)", re.I)
+META_SNIFF_BYTES = 2048
+
+
+class DomainTierMemory:
+    def __init__(self, path: str | None = TIER_MEMORY_FILE):
+        self.path = path
+        self._tiers = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self._tiers = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning("Ignoring unreadable tier memory file %s: %s", path, e)
+
+    def get(self, domain: str) -> str | None:
+        with self._lock:
+            return self._tiers.get(domain)
+
+    def record(self, domain: str, tier: str):
+        with self._lock:
+            if self._tiers.get(domain) == tier:
+                return
+            self._tiers[domain] = tier
+            if self.path:
+                try:
+                    with open(self.path, 'w', encoding='utf-8') as f:
+                        json.dump(self._tiers, f, indent=2)
+                except OSError as e:
+                    logger.warning("Could not save tier memory to %s: %s", self.path, e)
+
+
+tier_memory = DomainTierMemory()
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=POOL_PER_HOST)
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+            _session.headers.update({
+                "User-Agent": USER_AGENT,
+                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+                "Accept-Encoding": ACCEPT_ENCODING,
+                "Accept-Language": "en-US,en;q=0.9",
+            })
+        return _session
+
+
+def domain_of(url: str) -> str:
+    return urlsplit(url).hostname or ""
+
+
+def decode_html(resp: requests.Response) -> str:
+    # requests falls back to ISO-8859-1 for text/html without a charset; browsers look at the page first.
+    if "charset=" in resp.headers.get("Content-Type", "").lower():
+        return resp.text
+    body = resp.content
+    if body.startswith(b"\xef\xbb\xbf"):
+        return body[3:].decode('utf-8', errors='replace')
+    match = _META_CHARSET_RE.search(body[:META_SNIFF_BYTES])
+    if match:
+        try:
+            return body.decode(match.group(1).decode('ascii'), errors='replace')
+        except LookupError:
+            pass  # unknown charset name, sniff instead
+    try:
+        return body.decode('utf-8')
+    except UnicodeDecodeError:
+        return body.decode(resp.apparent_encoding or 'utf-8', errors='replace')
+
+
+def looks_client_rendered(html: str) -> bool:
+    without_code = _SCRIPT_STYLE_RE.sub(" ", html)
+    noscript_text = " ".join(_NOSCRIPT_RE.findall(without_code))
+    visible = _NOSCRIPT_RE.sub(" ", without_code)
+    text_len = len(" ".join(_TAG_RE.sub(" ", visible).split()))
+    if text_len < MIN_TEXT_CHARS:
+        return True
+    if _NOSCRIPT_WALL_RE.search(_TAG_RE.sub(" ", noscript_text)) and text_len < SPA_TEXT_CHARS:
+        return True
+    return bool(_SPA_ROOT_RE.search(html)) and text_len < SPA_TEXT_CHARS
+
+
+def fetch_static(url: str, timeout: float = HTTP_TIMEOUT) -> tuple[str | None, str | None]:
+    # Returns (html, cached_text). html is None when the browser is needed; cached_text is set
+    # instead when the server answered 304 for a page whose cleaned text we already have.
+    domain = domain_of(url)
+    if tier_memory.get(domain) == BROWSER_TIER:
+        logger.info("%s is known to need a browser, skipping HTTP tier", domain)
+        return None, None
+    breaker = get_breaker(domain)
+    if breaker.state == "open":
+        logger.info("%s is failing, skipping HTTP tier", domain)
+        return None, None
+    http_cache = get_http_cache()
+    conditional = http_cache.conditional_headers(url) if http_cache else {}
+    try:
+        with span("http_fetch") as fields:
+            resp = get_http_session().get(url, timeout=timeout, allow_redirects=True, headers=conditional)
+            fields.update(status=resp.status_code, bytes=len(resp.content))
+    except requests.RequestException as e:
+        # A DNS failure or refused connection opens the domain's breaker, so the browser tier fails fast too.
+        kind = classify(e)
+        if kind != TERMINAL:
+            breaker.record_failure(kind)
+        logger.info("HTTP tier failed for %s (%s): %s", url, kind, e)
+        return None, None
+    get_scheduler().observe(url, resp.status_code, resp.headers.get("Retry-After"))
+    if resp.status_code >= 500:
+        breaker.record_failure(classify_status(resp.status_code))
+    else:
+        breaker.record_success()
+    if resp.status_code == 304 and conditional:
+        cached_text = http_cache.not_modified(url)
+        if cached_text is not None:
+            logger.info("%s not modified since last visit, reusing stored text", url)
+            return None, cached_text
+        return None, None
+    content_type = resp.headers.get("Content-Type", "")
+    if resp.status_code != 200 or "html" not in content_type.lower():
+        logger.info("HTTP tier got status %s (%s) for %s, escalating", resp.status_code, content_type or "no type", url)
+        if resp.status_code in (401, 403):
+            tier_memory.record(domain, BROWSER_TIER)
+        return None, None
+    html = decode_html(resp)
+    if looks_client_rendered(html):
+        logger.info("%s looks client-rendered, escalating to browser", url)
+        tier_memory.record(domain, BROWSER_TIER)
+        return None, None
+    tier_memory.record(domain, HTTP_TIER)
+    if http_cache:
+        http_cache.store_validators(url, resp.headers.get("ETag"), resp.headers.get("Last-Modified"), len(resp.content))
+    return html, None
+
+
+def fetch_in_browser(pool, url: str, timeout: float) -> str:
+    # One browser-tier attempt under the HTTP tier's per-host gap and 429/503 back-off; wrap it in
+    # call_with_retries and every retry waits its turn too.
+    scheduler = get_scheduler()
+    scheduler.pace(url)
+    with pool.driver() as driver:
+        html = load_page(driver, url, timeout)
+        status = navigation_status(driver)
+    scheduler.observe(url, status)
+    if status in THROTTLE_STATUSES:
+        raise HostThrottled(f"{domain_of(url)} answered {status} to the browser")
+    return html
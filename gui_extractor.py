@@ -15,19 +15,25 @@ import threading
 import logging
 import validators
 import requests
-from bs4 import BeautifulSoup
 from dotenv import load_dotenv
-from openai import OpenAI, OpenAIError
-from selenium import webdriver
+from openai import OpenAIError
 from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
+from driver_binary import get_chrome_service
+from driver_pool import get_driver_pool, shutdown_driver_pool
+from fetcher import fetch_static, fetch_in_browser, domain_of
+from text_extract import clean_html
+from document import Document
+from context_packing import pack_for_extraction
+from retrieval import RetrievalIndex
+from json_stream import stream_json_fields
+from structured_data import harvest, merge_prefilled, reduce_extraction
+from resilience import call_with_retries, with_budget
+from json_repair import load_llm_json
+from instrumentation import traced, start_metrics_server, typical_seconds
+from http_cache import remember_page_text, remembered_structured
+from llm_gateway import get_gateway
+from extraction_cache import ExtractionCache, get_extraction_cache
 from tkinter import messagebox, filedialog
-from retry import retry
-import tempfile
 from datetime import datetime
 from PIL import Image, ImageTk 
 
@@ -40,11 +46,9 @@ MODEL_NAME = os.getenv("MODEL")
 MAX_BYTES = 100 * 1024 * 1024
 RETRIES = 3
 TIMEOUT = 20
-API_RETRIES = 3
 APP_VERSION = "1.0.0"
 
-OPENAI_CLIENT = OpenAI(base_url=f"{GAIA_DOMAIN_URL}/v1", api_key=OPENAI_API_KEY, timeout=90.0)
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+LLM_GATEWAY = None  # set under __main__: the spawned HTML cleaning workers re-import this module
 logger = logging.getLogger(__name__)
 
 UNIVERSAL_PROMPT = """
@@ -120,75 +124,109 @@ QA_SYSTEM_PROMPT = """
 You are a highly intelligent, insightful, and adaptable AI assistant of *GAIANET*(made by gaia, by gaia, of gaia). Based on the provided webpage content, answer the user's question. If a direct answer isn't present, use your intelligence to infer, evaluate, or provide a reasoned assessment based on the information and implications of the text. This includes subjective qualities or potential 'ratings' if the content describes features that support such an assessment. Always ensure your response is logically derived from and consistent with the provided content. If an answer truly cannot be formed, state so professionally.
 """
 
-def fetch_page_text(url: str, driver_service: Service, max_bytes: int = MAX_BYTES, retries: int = RETRIES, timeout: int = TIMEOUT) -> str | None:
-    ua = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    opts = Options()
-    for arg in ("--headless", "--no-sandbox", "--disable-gpu", "--disable-dev-shm-usage", "--log-level=3"):
-        opts.add_argument(arg)
-    opts.add_argument(f"user-agent={ua}")
+@traced("fetch_page")
+def fetch_page_text(url: str, driver_service: Service, max_bytes: int = MAX_BYTES, retries: int = RETRIES, timeout: int = TIMEOUT) -> Document | None:
+    fetch_start = time.perf_counter()
+    page_source, text = fetch_static(url)
+    served_over_http = page_source is not None
+    if text is not None:
+        logger.info("%s not modified since the last visit, reusing stored text", url)
+    elif served_over_http:
+        logger.info("Fetched %s over plain HTTP, browser not needed", url)
+    else:
+        pool = get_driver_pool(driver_service)
 
-    for attempt in range(1, retries + 1):
-        try:
-            driver = webdriver.Chrome(service=driver_service, options=opts)
-            driver.set_page_load_timeout(timeout)
-            driver.get(url)
-            WebDriverWait(driver, timeout).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
-            soup = BeautifulSoup(driver.page_source, 'html.parser')
-            for tag in soup(["script", "style", "header", "footer", "nav", "aside", "noscript"]):
-                tag.decompose()
-            text = soup.get_text(separator=' ', strip=True)
-            text = " ".join(text.split())
-            if len(text.encode('utf-8')) > max_bytes:
-                text = text[:max_bytes]
-            with tempfile.NamedTemporaryFile(delete=False, mode='w', encoding='utf-8', suffix='.txt') as f:
-                f.write(text)
-                return f.name
-        except Exception as e:
-            logger.error("Fetch attempt #%d failed: %s", attempt, e)
-        finally:
-            if driver:
-                driver.quit()
-    return None
+        def load_in_browser():
+            return fetch_in_browser(pool, url, timeout)
 
+        def on_retry(attempt, error, delay):
+            logger.warning("Fetch attempt #%d failed, retrying in %.1fs: %s", attempt, delay, error)
 
-@retry(OpenAIError, tries=API_RETRIES, delay=1, backoff=2)
-def extract_structure(file_path: str) -> dict | None:
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            text = f.read()
-        logger.info("Sending %d characters to AI for JSON extraction", len(text[:15000]))
-        resp = OPENAI_CLIENT.chat.completions.create(
-            model=MODEL_NAME,
-            messages=[
-                {"role": "system", "content": UNIVERSAL_PROMPT},
-                {"role": "user", "content": f"{text[:15000]}"},
-            ],
-            response_format={"type": "json_object"}
-        )
-        data = json.loads(resp.choices[0].message.content)
-        if not isinstance(data, dict) or "main_content_type" not in data:
-            logger.error("Invalid JSON structure from AI: %s", data)
+        try:
+            page_source = call_with_retries(load_in_browser, domain_of(url), attempts=retries, on_retry=on_retry)
+        except Exception as e:
+            logger.error("Could not fetch %s: %s", url, e)
             return None
+    timings = {"fetch": round(time.perf_counter() - fetch_start, 3)}
+    source = "not_modified" if text is not None else ("http" if served_over_http else "browser")
+    structured = remembered_structured(url) if text is not None else {}
+    if text is None:
+        structured = harvest(page_source)
+        clean_start = time.perf_counter()
+        text = clean_html(page_source)
+        timings["clean"] = round(time.perf_counter() - clean_start, 3)
+        if len(text.encode('utf-8')) > max_bytes:
+            text = text[:max_bytes]
+        if served_over_http:
+            remember_page_text(url, text, structured)
+    return Document(url, text, source, timings, structured=structured)
+
+
+@traced("extract_page")
+def extract_structure(document: Document, on_field=None) -> dict | None:
+    try:
+        prefilled, remaining = reduce_extraction(document.structured)
+        if on_field:
+            for key, value in prefilled.items():
+                on_field(key, value)
+        if prefilled and remaining is None:
+            logger.info("All key fields found in structured data (%s), skipping the AI call", ", ".join(prefilled))
+            return prefilled
+        system_prompt = remaining.prompt if prefilled else UNIVERSAL_PROMPT
+        text = pack_for_extraction(document.text, system_prompt)
+        cache = get_extraction_cache()
+        cache_key = ExtractionCache.make_key(text, MODEL_NAME, system_prompt)
+        data = cache.get(cache_key) if cache else None
+        if data is not None:
+            logger.info("Page text unchanged since a previous extraction, using cached JSON")
+        else:
+            logger.info("Sending %d characters to AI for JSON extraction", len(text))
+            request = dict(
+                model=MODEL_NAME,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": text},
+                ],
+                response_format={"type": "json_object"}
+            )
+            if on_field:
+                content, _ = stream_json_fields(LLM_GATEWAY.stream_chat(**request), on_field)
+            else:
+                content = LLM_GATEWAY.chat(**request).choices[0].message.content
+            data = load_llm_json(content, LLM_GATEWAY.chat, MODEL_NAME)
+            if not isinstance(data, dict):
+                logger.error("Invalid JSON structure from AI: %s", data)
+                return None
+            if cache:
+                cache.put(cache_key, data)  # the model's answer only, like the CLI and Streamlit versions
+        data = merge_prefilled(prefilled, data)
+        if "main_content_type" not in data:
+            logger.warning("AI response has no main_content_type, keeping the other fields")
+            data["main_content_type"] = None
         logger.info("Successfully extracted JSON structure")
         return data
     except (OpenAIError, json.JSONDecodeError) as e:
         logger.error("Extraction error: %s", e)
         return None
 
-@retry(OpenAIError, tries=API_RETRIES, delay=1, backoff=2)
-def answer_question(context: str, question: str) -> str:
+@traced("answer_question")
+def answer_question(index: RetrievalIndex, question: str, on_delta=None) -> str:
     try:
-        prompt = f"{context[:15000]}\n\nQuestion: {question}"
+        prompt = f"{index.context_for(question)}\n\nQuestion: {question}"
         logger.info("Sending Q&A request with question: %s", question[:50])
-        resp = OPENAI_CLIENT.chat.completions.create(
+        parts = []
+        for delta in LLM_GATEWAY.stream_chat(
             model=MODEL_NAME,
             messages=[
                 {"role": "system", "content": QA_SYSTEM_PROMPT},
                 {"role": "user", "content": prompt},
             ],
-        )
+        ):
+            parts.append(delta)
+            if on_delta:
+                on_delta(delta)
         logger.info("Received Q&A response")
-        return resp.choices[0].message.content.strip()
+        return "".join(parts).strip()
     except OpenAIError as e:
         logger.error("Q&A error: %s", e)
         return f"Error: Failed to get answer from AI - {str(e)}"
@@ -200,9 +238,10 @@ class GAIAApp(ctk.CTk):
         self.title("GAIA 🤖 Data Extractor")
         self.geometry("1000x800")
         self._history = []
-        self._temp_files = []  
+        self._documents = []
         self._lock = threading.Lock()
         self.page_text = ""
+        self.qa_index = None
         self._last_action = "None"
         self._timer_running = False
         self._timer_thread = None
@@ -235,10 +274,10 @@ class GAIAApp(ctk.CTk):
         self.tabview.add("Q&A")
         self.tabview.add("History")
         self.status_lbl = ctk.CTkLabel(self.tabview.tab("Extract"), text="", text_color="#cccccc")
-        self.timer_lbl = ctk.CTkLabel(self.tabview.tab("Extract"), text="Elapsed: 0s (expected: 30sec)", text_color="#cccccc")
+        self.timer_lbl = ctk.CTkLabel(self.tabview.tab("Extract"), text="Elapsed: 0s", text_color="#cccccc")
         self.progress_bar = ctk.CTkProgressBar(self.tabview.tab("Extract"), mode="indeterminate", width=300)
         self.q_status_lbl = ctk.CTkLabel(self.tabview.tab("Q&A"), text="", text_color="#cccccc")
-        self.q_timer_lbl = ctk.CTkLabel(self.tabview.tab("Q&A"), text="Elapsed: 0s (expected: 30sec)", text_color="#cccccc")
+        self.q_timer_lbl = ctk.CTkLabel(self.tabview.tab("Q&A"), text="Elapsed: 0s", text_color="#cccccc")
         self.q_progress_bar = ctk.CTkProgressBar(self.tabview.tab("Q&A"), mode="indeterminate", width=300)
         self.build_extract_tab()
         self.build_qa_tab()
@@ -364,14 +403,18 @@ class GAIAApp(ctk.CTk):
     def start_timer(self, tab: str = "Extract"):
         self._timer_running = True
         start_time = time.time()
+        # Estimate from this session's own recent runs instead of a fixed guess.
+        stages = ("fetch_page", "extract_page") if tab == "Extract" else ("answer_question",)
+        typical = [typical_seconds(stage) for stage in stages]
+        expected = f" (typical: {sum(typical):.0f}s)" if all(t is not None for t in typical) else ""
         def update_timer():
             while self._timer_running:
                 elapsed = int(time.time() - start_time)
                 if tab == "Extract":
-                    self.timer_lbl.configure(text=f"Elapsed: {elapsed}s (expected: 30s)")
+                    self.timer_lbl.configure(text=f"Elapsed: {elapsed}s{expected}")
                     self.timer_lbl.update()
                 else:
-                    self.q_timer_lbl.configure(text=f"Elapsed: {elapsed}s (expected: 30s)")
+                    self.q_timer_lbl.configure(text=f"Elapsed: {elapsed}s{expected}")
                     self.q_timer_lbl.update()
                 time.sleep(1)
         self._timer_thread = threading.Thread(target=update_timer, daemon=True)
@@ -393,16 +436,15 @@ class GAIAApp(ctk.CTk):
             self.q_progress_bar.grid_remove()
 
 
-    def cleanup_temp_files(self):
-        for tmp in self._temp_files:
-            if os.path.exists(tmp):
-                os.remove(tmp)
-                logger.info("Cleaned up temporary file: %s", tmp)
-        self._temp_files.clear()
+    def release_documents(self):
+        for document in self._documents:
+            document.release()
+        self._documents.clear()
 
 
     def on_closing(self):
-        self.cleanup_temp_files()
+        self.release_documents()
+        shutdown_driver_pool()
         self.destroy()
 
 
@@ -417,27 +459,37 @@ class GAIAApp(ctk.CTk):
         self.extract_btn.configure(state="disabled")
         self.clear_btn.configure(state="disabled")
         self.json_box.delete("1.0", "end")
-        self.set_status("Installing chromedriver…")
+        self.set_status("Locating chromedriver…")
         self.progress_bar.grid(row=6, column=0, pady=5, sticky="ew")
         self.progress_bar.start()
         self.timer_lbl.grid(row=7, column=0, pady=5, sticky="ew")
         self.start_timer()
-        threading.Thread(target=self.do_extract, args=(url,), daemon=True).start()
+        threading.Thread(target=with_budget(self.do_extract), args=(url,), daemon=True).start()  # fresh retry budget per click
 
 
     def do_extract(self, url):
-        tmp = None
         try:
-            svc = Service(ChromeDriverManager().install())
+            svc = get_chrome_service()
             self.set_status("Fetching page…")
-            tmp = fetch_page_text(url, svc)
-            if not tmp:
+            document = fetch_page_text(url, svc)
+            if not document:
                 raise RuntimeError("Failed to fetch page text after retries.")
+            logger.info("Fetched %s: %s", url, document.summary())
             self.set_status("Extracting JSON…")
-            self._temp_files.append(tmp)
-            data = extract_structure(tmp)
+            self.release_documents()
+            self._documents.append(document)
+            live_fields = {}
+
+            def show_field(key, value):
+                live_fields[key] = value
+                self.json_box.delete("1.0", "end")
+                self.json_box.insert("1.0", json.dumps(live_fields, indent=2))
+
+            data = extract_structure(document, on_field=show_field)
+            self.json_box.delete("1.0", "end")
             with self._lock:
-                self.page_text = open(tmp, encoding="utf-8").read() if tmp else ""
+                self.page_text = document.text
+                self.qa_index = RetrievalIndex(self.page_text)
             if data:
                 self.json_box.insert("1.0", json.dumps(data, indent=2))
                 self._history.append((url, data))
@@ -465,6 +517,7 @@ class GAIAApp(ctk.CTk):
         self.ans_box.delete("1.0", "end")
         with self._lock:
             self.page_text = ""
+            self.qa_index = None
         self._last_action = "Cleared fields"
         self.status_bar_lbl.configure(text=f"Version {APP_VERSION} | Last Action: {self._last_action}")
         self.set_status("")
@@ -485,12 +538,13 @@ class GAIAApp(ctk.CTk):
         self.q_progress_bar.start()
         self.q_timer_lbl.grid(row=7, column=0, pady=5, sticky="ew")
         self.start_timer(tab="Q&A")
-        threading.Thread(target=self.do_ask, args=(q,), daemon=True).start()
+        threading.Thread(target=with_budget(self.do_ask), args=(q,), daemon=True).start()
 
     def do_ask(self, question):
         try:
-            ans = answer_question(self.page_text, question)
-            self.ans_box.insert("1.0", ans)
+            ans = answer_question(self.qa_index, question, on_delta=lambda delta: self.ans_box.insert("end", delta))
+            if ans.startswith("Error:"):
+                self.ans_box.insert("end", ans)
             self._last_action = f"Answered question: {question[:30]}..."
         except Exception as e:
             self.ans_box.insert("1.0", f"Error: {e}")
@@ -503,5 +557,8 @@ class GAIAApp(ctk.CTk):
             self.status_bar_lbl.configure(text=f"Version {APP_VERSION} | Last Action: {self._last_action}")
 
 if __name__ == "__main__":
+    LLM_GATEWAY = get_gateway(f"{GAIA_DOMAIN_URL}/v1", OPENAI_API_KEY, timeout=90.0)
+    start_metrics_server()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
     app = GAIAApp()
     app.mainloop()
\ No newline at end of file
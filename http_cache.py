@@ -0,0 +1,128 @@
+# CONDITIONAL-REQUEST CACHE (ETag / Last-Modified) FOR PAGES SERVED OVER THE HTTP TIER.
+
+# For every URL we keep the response validators, the cleaned text we produced from it and the
+# structured data (JSON-LD / microdata / OpenGraph) harvested from its HTML. Repeat visits send
+# If-None-Match / If-Modified-Since and, on a 304, reuse both without downloading the page,
+# starting a browser or parsing any HTML. Keeping the structured data matters: a page it fully
+# answered never reached the LLM, so it has no extraction cache entry to fall back on.
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from extraction_cache import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+HTTP_CACHE_ENABLED = os.getenv("GAIA_HTTP_CACHE", "1") != "0"
+
+
+class ConditionalCache:
+    def __init__(self, path: str):
+        self.path = path
+        self.stats = {"revalidations": 0, "not_modified": 0, "bytes_saved": 0}
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            " url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, body_bytes INTEGER NOT NULL,"
+            " text TEXT, updated_at REAL NOT NULL, structured TEXT)"
+        )
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(pages)")}
+        if "structured" not in columns:  # cache files from before structured data was stored
+            self._db.execute("ALTER TABLE pages ADD COLUMN structured TEXT")
+        self._db.commit()
+
+    def conditional_headers(self, url: str) -> dict:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT etag, last_modified FROM pages WHERE url = ? AND text IS NOT NULL", (url,)
+            ).fetchone()
+        if row is None:
+            return {}
+        etag, last_modified = row
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        if headers:
+            self.stats["revalidations"] += 1
+        return headers
+
+    def not_modified(self, url: str) -> str | None:
+        # Called on a 304: returns the stored text and counts the download we skipped.
+        with self._lock:
+            row = self._db.execute("SELECT text, body_bytes FROM pages WHERE url = ?", (url,)).fetchone()
+            if row is None or row[0] is None:
+                return None
+            self._db.execute("UPDATE pages SET updated_at = ? WHERE url = ?", (time.time(), url))
+            self._db.commit()
+        self.stats["not_modified"] += 1
+        self.stats["bytes_saved"] += row[1]
+        return row[0]
+
+    def store_validators(self, url: str, etag: str | None, last_modified: str | None, body_bytes: int):
+        with self._lock:
+            if not etag and not last_modified:
+                self._db.execute("DELETE FROM pages WHERE url = ?", (url,))
+            else:
+                # Text is filled in by store_text() once the page has been cleaned.
+                self._db.execute(
+                    "INSERT OR REPLACE INTO pages (url, etag, last_modified, body_bytes, text, updated_at)"
+                    " VALUES (?, ?, ?, ?, NULL, ?)", (url, etag, last_modified, body_bytes, time.time())
+                )
+            self._db.commit()
+
+    def store_text(self, url: str, text: str, structured: dict | None = None):
+        with self._lock:
+            self._db.execute(
+                "UPDATE pages SET text = ?, structured = ?, updated_at = ? WHERE url = ?",
+                (text, json.dumps(structured or {}, ensure_ascii=False), time.time(), url),
+            )
+            self._db.commit()
+
+    def structured(self, url: str) -> dict:
+        with self._lock:
+            row = self._db.execute("SELECT structured FROM pages WHERE url = ?", (url,)).fetchone()
+        try:
+            return json.loads(row[0]) if row and row[0] else {}
+        except ValueError:
+            return {}
+
+    def summary(self) -> dict:
+        return {**self.stats, "fetches_avoided": self.stats["not_modified"]}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_http_cache() -> ConditionalCache | None:
+    global _cache
+    if not HTTP_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = ConditionalCache(os.path.join(CACHE_DIR, "http.sqlite"))
+            except (OSError, sqlite3.Error) as e:
+                logger.warning("HTTP cache disabled, could not open it: %s", e)
+                return None
+        return _cache
+
+
+def remember_page_text(url: str, text: str, structured: dict | None = None):
+    cache = get_http_cache()
+    if cache:
+        cache.store_text(url, text, structured)
+
+
+def remembered_structured(url: str) -> dict:
+    # Structured data stored with the page text, for a 304 revisit.
+    cache = get_http_cache()
+    return cache.structured(url) if cache else {}
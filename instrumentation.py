@@ -0,0 +1,237 @@
+# PIPELINE INSTRUMENTATION SHARED BY THE CLI, STREAMLIT AND GUI VERSIONS.
+
+# Every stage of a page's trip (driver checkout, navigation, HTTP fetch, parse, clean, prompt build,
+# LLM queue wait, LLM call, JSON parse) is timed as a span. Spans feed per-stage histograms, Gaia
+# token usage feeds counters, and both are served in Prometheus text format on GAIA_METRICS_PORT.
+# With GAIA_JSON_LOG set (a file path, or "-" for stderr) every span is also written as one JSON line.
+
+import os
+import sys
+import json
+import time
+import logging
+import threading
+import functools
+import multiprocessing
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+METRICS_PORT = int(os.getenv("GAIA_METRICS_PORT", "0"))  # 0 = no metrics endpoint
+METRICS_HOST = os.getenv("GAIA_METRICS_HOST", "127.0.0.1")
+JSON_LOG = os.getenv("GAIA_JSON_LOG")
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+RECENT_SPANS = 50  # per stage, for typical_seconds()
+
+_current_url = contextvars.ContextVar("gaia_url", default=None)
+_lock = threading.Lock()
+_histograms = {}  # stage -> {"buckets": [...], "sum": float, "count": int}
+_counters = {}  # (name, labels) -> value
+_gauges = {}  # (name, labels) -> value
+_recent = {}  # stage -> deque of recent durations
+_json_log = None
+_server = None
+
+HELP = {
+    "gaia_stage_seconds": "Time spent in each pipeline stage",
+    "gaia_stage_errors_total": "Pipeline stages that raised an error",
+    "gaia_llm_tokens_total": "Gaia tokens used, by kind (prompt/completion) and source (usage/estimate)",
+    "gaia_llm_requests_total": "Gaia requests completed",
+    "gaia_llm_in_flight": "Gaia requests currently running",
+    "gaia_llm_waiting": "Gaia requests waiting for capacity",
+}
+
+
+def _labels(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(labels) -> str:
+    if not labels:
+        return ""
+    escaped = (f'{k}="{v}"' for k, v in ((k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+                                         for k, v in labels))
+    return "{" + ",".join(escaped) + "}"
+
+
+def _write_json(event: dict):
+    global _json_log
+    if not JSON_LOG:
+        return
+    line = json.dumps(event, ensure_ascii=False, default=str)
+    with _lock:
+        if _json_log is None:
+            _json_log = sys.stderr if JSON_LOG == "-" else open(JSON_LOG, 'a', encoding='utf-8', buffering=1)
+        _json_log.write(line + "\n")
+
+
+def inc(name: str, amount: float = 1, **labels):
+    key = (name, _labels(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def set_gauge(name: str, value: float, **labels):
+    with _lock:
+        _gauges[(name, _labels(labels))] = value
+
+
+def observe(stage: str, seconds: float, ok: bool = True, **fields):
+    with _lock:
+        hist = _histograms.get(stage)
+        if hist is None:
+            hist = _histograms[stage] = {"buckets": [0] * len(BUCKETS), "sum": 0.0, "count": 0}
+            _recent[stage] = deque(maxlen=RECENT_SPANS)
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                hist["buckets"][i] += 1
+        hist["sum"] += seconds
+        hist["count"] += 1
+        if ok:
+            _recent[stage].append(seconds)
+    if not ok:
+        inc("gaia_stage_errors_total", stage=stage)
+    _write_json({"ts": round(time.time(), 3), "event": "span", "stage": stage, "seconds": round(seconds, 4),
+                 "ok": ok, "url": _current_url.get(), **fields})
+
+
+@contextmanager
+def span(stage: str, **fields):
+    # Times the block as one stage; the yielded dict can be filled with extra fields for the JSON log.
+    extra = dict(fields)
+    start = time.perf_counter()
+    ok = True
+    try:
+        yield extra
+    except BaseException as e:
+        ok = False
+        extra["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        observe(stage, time.perf_counter() - start, ok, **extra)
+
+
+@contextmanager
+def trace(url: str):
+    # Tags the spans recorded in this thread (or asyncio task) with the page URL.
+    token = _current_url.set(url)
+    try:
+        yield
+    finally:
+        _current_url.reset(token)
+
+
+def current_url() -> str | None:
+    return _current_url.get()
+
+
+def traced(stage: str):
+    # Decorator for front-end entry points: times the whole call as one stage, tagged with the URL
+    # taken from the first argument (a URL string or anything with a .url, such as a Document).
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            first = args[0] if args else None
+            url = first if isinstance(first, str) and "://" in first else getattr(first, "url", None)
+            with trace(url or current_url()), span(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def record_tokens(prompt_tokens: int, completion_tokens: int, estimated: bool = False, **fields):
+    source = "estimate" if estimated else "usage"
+    inc("gaia_llm_tokens_total", prompt_tokens, kind="prompt", source=source)
+    inc("gaia_llm_tokens_total", completion_tokens, kind="completion", source=source)
+    inc("gaia_llm_requests_total")
+    _write_json({"ts": round(time.time(), 3), "event": "tokens", "prompt_tokens": prompt_tokens,
+                 "completion_tokens": completion_tokens, "source": source, "url": _current_url.get(), **fields})
+
+
+def typical_seconds(stage: str) -> float | None:
+    # Mean of the last RECENT_SPANS successful runs of a stage, e.g. for a progress estimate.
+    with _lock:
+        recent = list(_recent.get(stage, ()))
+    return sum(recent) / len(recent) if recent else None
+
+
+def stage_summary() -> dict:
+    with _lock:
+        return {stage: {"count": h["count"], "total": round(h["sum"], 3), "avg": round(h["sum"] / h["count"], 3)}
+                for stage, h in _histograms.items() if h["count"]}
+
+
+def token_summary() -> dict:
+    with _lock:
+        totals = {}
+        for (name, labels), value in _counters.items():
+            if name == "gaia_llm_tokens_total":
+                kind = dict(labels)["kind"]
+                totals[kind] = totals.get(kind, 0) + value
+        totals["requests"] = sum(v for (name, _), v in _counters.items() if name == "gaia_llm_requests_total")
+    return totals
+
+
+def render_prometheus() -> str:
+    lines = []
+    with _lock:
+        histograms = {stage: {"buckets": list(h["buckets"]), "sum": h["sum"], "count": h["count"]}
+                      for stage, h in _histograms.items()}
+        counters = dict(_counters)
+        gauges = dict(_gauges)
+    lines += [f"# HELP gaia_stage_seconds {HELP['gaia_stage_seconds']}", "# TYPE gaia_stage_seconds histogram"]
+    for stage, hist in sorted(histograms.items()):
+        for bound, count in zip(BUCKETS, hist["buckets"]):
+            lines.append(f'gaia_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {count}')
+        lines.append(f'gaia_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {hist["count"]}')
+        lines.append(f'gaia_stage_seconds_sum{{stage="{stage}"}} {hist["sum"]:.6f}')
+        lines.append(f'gaia_stage_seconds_count{{stage="{stage}"}} {hist["count"]}')
+    for kind, values in (("counter", counters), ("gauge", gauges)):
+        for name in sorted({name for name, _ in values}):
+            lines += [f"# HELP {name} {HELP.get(name, name)}", f"# TYPE {name} {kind}"]
+            for (metric, labels), value in sorted(values.items()):
+                if metric == name:
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug("metrics: " + format, *args)
+
+
+def is_worker_process() -> bool:
+    # parent_process() is only set once a spawned child starts running its task; while the child
+    # re-imports __main__ only the process name (set first by multiprocessing) gives it away.
+    return multiprocessing.parent_process() is not None or multiprocessing.current_process().name != "MainProcess"
+
+
+def start_metrics_server(port: int = METRICS_PORT, host: str = METRICS_HOST) -> int | None:
+    # Safe to call from every front-end and on every Streamlit rerun; returns the bound port.
+    global _server
+    if not port or is_worker_process():
+        return None
+    with _lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError as e:
+                logger.warning("Could not serve metrics on %s:%s: %s", host, port, e)
+                return None
+            threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+            logger.info("Serving Prometheus metrics on http://%s:%d/metrics", host, _server.server_port)
+        return _server.server_port
@@ -0,0 +1,175 @@
+# RESUMABLE JOB STORE FOR LARGE URL LISTS (`--batch FILE --job-db JOB.sqlite`, `--resume JOB.sqlite`).
+
+# Every URL of a job is a row with its state (pending, fetched, extracted or failed), attempt count,
+# last error and result. Results are committed in the same transaction that marks the URL done, so
+# a crash or Ctrl-C loses at most the pages that were in flight. Resuming skips extracted URLs and
+# retries failed ones with exponential backoff until they run out of attempts. Failures that are not
+# worth retrying (a 404, a bad request, an unparseable answer) give up straight away.
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from batch import run_batch, FETCH_WORKERS, LLM_WORKERS
+from resilience import RetryBudget
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = int(os.getenv("GAIA_JOB_MAX_ATTEMPTS", "3"))
+RETRY_BACKOFF = float(os.getenv("GAIA_JOB_RETRY_BACKOFF", "5"))  # seconds before the first retry, doubled each time
+MAX_BACKOFF = 300.0
+STATES = ("pending", "fetched", "extracted", "failed")
+
+
+class JobStore:
+    def __init__(self, path: str, max_attempts: int = MAX_ATTEMPTS, backoff: float = RETRY_BACKOFF):
+        self.path = path
+        self.max_attempts = max(1, max_attempts)
+        self.backoff = backoff
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS items ("
+                " item_id TEXT PRIMARY KEY, url TEXT NOT NULL, position INTEGER NOT NULL,"
+                " state TEXT NOT NULL DEFAULT 'pending', attempts INTEGER NOT NULL DEFAULT 0, error TEXT,"
+                " result TEXT, next_attempt_at REAL NOT NULL DEFAULT 0, updated_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_items_state ON items(state, position)")
+            self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+    def set_meta(self, key: str, value):
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+    def get_meta(self, key: str, default=None):
+        with self._lock:
+            row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def add_items(self, items) -> int:
+        # items: (item_id, url) pairs. Already known ids are left untouched, so re-adding a list is a no-op.
+        now = time.time()
+        with self._lock, self._db:
+            start = self._db.execute("SELECT COALESCE(MAX(position), -1) + 1 FROM items").fetchone()[0]
+            before = self._db.total_changes
+            self._db.executemany(
+                "INSERT OR IGNORE INTO items (item_id, url, position, updated_at) VALUES (?, ?, ?, ?)",
+                ((item_id, url, start + i, now) for i, (item_id, url) in enumerate(items)),
+            )
+            return self._db.total_changes - before
+
+    def due_items(self, now: float | None = None) -> list[tuple[str, str]]:
+        # Pending items, items interrupted after fetching, and failed items whose backoff has elapsed.
+        now = time.time() if now is None else now
+        with self._lock:
+            return self._db.execute(
+                "SELECT item_id, url FROM items WHERE state IN ('pending', 'fetched')"
+                " OR (state = 'failed' AND attempts < ? AND next_attempt_at <= ?) ORDER BY position",
+                (self.max_attempts, now),
+            ).fetchall()
+
+    def next_retry_at(self) -> float | None:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT MIN(next_attempt_at) FROM items WHERE state = 'failed' AND attempts < ?", (self.max_attempts,)
+            ).fetchone()
+        return row[0]
+
+    def mark_fetched(self, item_id: str):
+        with self._lock, self._db:
+            self._db.execute("UPDATE items SET state = 'fetched', updated_at = ? WHERE item_id = ?", (time.time(), item_id))
+
+    def complete(self, item_id: str, result):
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE items SET state = 'extracted', attempts = attempts + 1, error = NULL, result = ?, updated_at = ?"
+                " WHERE item_id = ?",
+                (json.dumps(result, ensure_ascii=False), time.time(), item_id),
+            )
+
+    def fail(self, item_id: str, error: str, retryable: bool = True):
+        now = time.time()
+        with self._lock, self._db:
+            row = self._db.execute("SELECT attempts FROM items WHERE item_id = ?", (item_id,)).fetchone()
+            attempts = (row[0] if row else 0) + 1
+            if not retryable:
+                attempts = max(attempts, self.max_attempts)
+            delay = min(self.backoff * 2 ** (attempts - 1), MAX_BACKOFF)
+            self._db.execute(
+                "UPDATE items SET state = 'failed', attempts = ?, error = ?, next_attempt_at = ?, updated_at = ?"
+                " WHERE item_id = ?",
+                (attempts, error, now + delay, now, item_id),
+            )
+
+    def record(self, record: dict):
+        # run_batch() result hook: one transaction per finished URL.
+        if record.get("status") == "ok":
+            self.complete(record["id"], record.get("data"))
+        else:
+            self.fail(record["id"], record.get("error") or record.get("status", "failed"), record.get("retryable", True))
+
+    def summary(self) -> dict:
+        with self._lock:
+            rows = self._db.execute("SELECT state, COUNT(*) FROM items GROUP BY state").fetchall()
+            exhausted = self._db.execute(
+                "SELECT COUNT(*) FROM items WHERE state = 'failed' AND attempts >= ?", (self.max_attempts,)
+            ).fetchone()[0]
+        counts = {state: 0 for state in STATES}
+        counts.update(dict(rows))
+        counts["total"] = sum(counts[state] for state in STATES)
+        counts["gave_up"] = exhausted
+        return counts
+
+    def items(self) -> list[dict]:
+        # Every URL of the job in input order, with its state and, once extracted, its result.
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT item_id, url, state, attempts, error, result FROM items ORDER BY position"
+            ).fetchall()
+        return [{"id": item_id, "url": url, "state": state, "attempts": attempts, "error": error,
+                 "data": json.loads(result) if result is not None else None}
+                for item_id, url, state, attempts, error, result in rows]
+
+    def export(self, output_path: str) -> int:
+        # Writes every extracted result, in input order, as JSONL.
+        rows = [item for item in self.items() if item["state"] == "extracted"]
+        with open(output_path, 'w', encoding='utf-8') as out:
+            for item in rows:
+                out.write(json.dumps({"id": item["id"], "url": item["url"], "data": item["data"]}, ensure_ascii=False) + "\n")
+        return len(rows)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def run_job(store: JobStore, fetch_fn, extract_fn, output_path: str, fetch_workers: int = FETCH_WORKERS,
+            llm_workers: int = LLM_WORKERS, budget: RetryBudget | None = None, **batch_options) -> dict:
+    # Runs every due item through run_batch(), then waits out the backoff and retries failures
+    # until nothing is left to retry. Returns the store summary plus the time spent.
+    # All passes share one retry budget, a fresh one per job unless the caller passes its own.
+    budget = budget if budget is not None else RetryBudget()
+    started = time.perf_counter()
+    while True:
+        due = store.due_items()
+        if due:
+            logger.info("Job %s: %d URLs to process", store.path, len(due))
+            run_batch(due, fetch_fn, extract_fn, output_path, fetch_workers, llm_workers,
+                      on_fetched=store.mark_fetched, on_record=store.record, budget=budget, **batch_options)
+            continue
+        retry_at = store.next_retry_at()
+        if retry_at is None:
+            break
+        delay = max(0.0, retry_at - time.time())
+        logger.info("Job %s: retrying failed URLs in %.1fs", store.path, delay)
+        time.sleep(delay)
+    summary = store.summary()
+    summary["seconds"] = round(time.perf_counter() - started, 2)
+    summary["retries"] = budget.summary()
+    return summary
@@ -0,0 +1,187 @@
+# LOCAL REPAIR OF MALFORMED JSON ANSWERS BEFORE ANYTHING IS RE-ASKED.
+
+# Models sometimes wrap the object in ```json fences, add a sentence after it, use Python-style single
+# quotes or True/None, leave trailing commas, or get cut off mid-object. All of that is fixed here
+# without another request: truncated objects are closed after the last complete member. Only when the
+# local pass fails is the model shown its own broken output (not the page again) and asked to fix it.
+# Counters show how often each path was needed.
+
+import os
+import re
+import json
+import logging
+import threading
+from instrumentation import span
+
+logger = logging.getLogger(__name__)
+
+LLM_REPAIR_ENABLED = os.getenv("GAIA_LLM_JSON_REPAIR", "1") != "0"
+MAX_REPAIR_CHARS = 12000  # broken outputs longer than this are not worth sending back
+
+REPAIR_PROMPT = """The text below was meant to be a single JSON object but it is not valid JSON ({error}).
+Return ONLY the corrected JSON object. Keep every key and value that is there; do not add, drop or invent
+fields, and do not add markdown or explanations."""
+
+stats = {"clean": 0, "repaired": 0, "llm_repaired": 0, "failed": 0, "coerced": 0}
+_stats_lock = threading.Lock()
+
+_FENCE_RE = re.compile(r"```[a-zA-Z]*\s*\n?(.*?)(?:```|$)", re.S)
+_LITERALS = {"True": "true", "False": "false", "None": "null", "true": "true", "false": "false", "null": "null"}
+
+
+def _count(**amounts):
+    with _stats_lock:
+        for key, amount in amounts.items():
+            stats[key] += amount
+
+
+def summary() -> dict:
+    with _stats_lock:
+        result = dict(stats)
+    total = result["clean"] + result["repaired"] + result["llm_repaired"] + result["failed"]
+    result["total"] = total
+    result["repair_rate"] = round((result["repaired"] + result["llm_repaired"]) / total, 3) if total else 0.0
+    return result
+
+
+def _drop_trailing_comma(out: list[str]):
+    while out and out[-1].isspace():
+        out.pop()
+    if out and out[-1] == ',':
+        out.pop()
+
+
+def repair_json(text: str) -> list[str]:
+    # Returns candidate JSON strings, best first. More than one only when the text was truncated.
+    fenced = _FENCE_RE.search(text)
+    if fenced and fenced.group(1).strip():
+        text = fenced.group(1)
+    starts = [i for i in (text.find('{'), text.find('[')) if i >= 0]
+    if not starts:
+        return [text]
+    out, stack, cuts = [], [], []
+    quote, escape = None, False
+    i = min(starts)
+    while i < len(text):
+        ch = text[i]
+        if quote:
+            if escape:
+                out.append("'" if ch == "'" else '\\' + ch)
+                escape = False
+            elif ch == '\\':
+                escape = True
+            elif ch == quote:
+                out.append('"')
+                quote = None
+            elif ch == '"':
+                out.append('\\"')
+            else:
+                out.append(ch)
+        elif ch in '"\'':
+            quote = ch
+            out.append('"')
+        elif ch in '{[':
+            stack.append('}' if ch == '{' else ']')
+            out.append(ch)
+            cuts.append((len(out), tuple(stack)))
+        elif ch in '}]':
+            _drop_trailing_comma(out)
+            out.append(stack.pop() if stack else ch)
+            if not stack:
+                break  # end of the top-level value; anything after it is prose
+        elif ch == ',':
+            cuts.append((len(out), tuple(stack)))
+            out.append(ch)
+        elif ch.isalpha():
+            end = i
+            while end < len(text) and (text[end].isalnum() or text[end] == '_'):
+                end += 1
+            word = text[i:end]
+            out.append(_LITERALS.get(word, word))
+            i = end
+            continue
+        else:
+            out.append(ch)
+        i += 1
+    if not stack:
+        return [''.join(out)]
+    # Truncated: first try closing what is there, then cut back to each earlier complete member.
+    candidates = []
+    if not quote:
+        closed = out[:]
+        _drop_trailing_comma(closed)
+        candidates.append(''.join(closed) + ''.join(reversed(stack)))
+    for position, open_stack in reversed(cuts):
+        head = out[:position]
+        _drop_trailing_comma(head)
+        candidates.append(''.join(head) + ''.join(reversed(open_stack)))
+    return candidates
+
+
+def parse_json(text: str):
+    # json.loads() with the local repair pass; raises the original json.JSONDecodeError if nothing parses.
+    text = text or ""
+    with span("json_parse") as fields:
+        try:
+            value = json.loads(text)
+            _count(clean=1)
+            return value
+        except json.JSONDecodeError as e:
+            error = e
+        fields["repaired"] = True
+        for candidate in repair_json(text):
+            try:
+                value = json.loads(candidate, strict=False)
+            except json.JSONDecodeError:
+                continue
+            _count(repaired=1)
+            logger.info("Repaired malformed JSON from the model locally (%s)", error.msg)
+            return value
+        raise error
+
+
+def _ask_for_repair(chat, model: str, content: str, error: json.JSONDecodeError):
+    response = chat(
+        model=model,
+        messages=[
+            {"role": "system", "content": REPAIR_PROMPT.format(error=error.msg)},
+            {"role": "user", "content": content},
+        ],
+        response_format={"type": "json_object"},
+    )
+    fixed = response.choices[0].message.content or ""
+    try:
+        return json.loads(fixed)
+    except json.JSONDecodeError:
+        return json.loads(repair_json(fixed)[0], strict=False)
+
+
+def coerce_to_schema(value, schema):
+    # Shared by single-page answers and each document of a micro-batched answer.
+    coerced = schema.coerce(value)
+    if coerced != value:
+        _count(coerced=1)
+    return coerced
+
+
+def load_llm_json(content: str, chat=None, model: str | None = None, schema=None):
+    # Parses a model answer: as-is, then repaired locally, then (given the gateway's chat) by asking
+    # the model to fix its own output. With an ExtractionSchema, values are coerced to its types.
+    try:
+        value = parse_json(content)
+    except json.JSONDecodeError as e:
+        if chat is None or not LLM_REPAIR_ENABLED or len(content or "") > MAX_REPAIR_CHARS:
+            _count(failed=1)
+            raise
+        logger.warning("Model output is not valid JSON even after local repair (%s), asking the model to fix it", e.msg)
+        try:
+            value = _ask_for_repair(chat, model, content, e)
+        except Exception as repair_error:
+            # Callers already handle JSONDecodeError, so a failed repair call surfaces as the original error.
+            logger.warning("JSON repair call failed: %s", repair_error)
+            _count(failed=1)
+            raise e
+        _count(llm_repaired=1)
+    if schema is not None:
+        value = coerce_to_schema(value, schema)
+    return value
@@ -0,0 +1,75 @@
+# INCREMENTAL JSON PARSER FOR STREAMED EXTRACTION RESPONSES.
+
+# Fed the completion text chunk by chunk, it emits each top-level field of the JSON object
+# ("title", "price", ...) as soon as that field's value has closed, instead of waiting for the
+# whole response. Anything before the first "{" (code fences, chatter) is ignored.
+
+import json
+
+
+class IncrementalJSONParser:
+    def __init__(self):
+        self.fields = {}
+        self.done = False
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._member = []
+
+    def feed(self, chunk: str) -> list[tuple[str, object]]:
+        emitted = []
+        for ch in chunk:
+            if self.done:
+                break
+            if not self._started:
+                if ch == '{':
+                    self._started = True
+                    self._depth = 1
+                continue
+            if self._in_string:
+                self._member.append(ch)
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+            if ch == '"':
+                self._in_string = True
+            elif ch in '{[':
+                self._depth += 1
+            elif ch in '}]':
+                self._depth -= 1
+            if self._depth == 0 or (self._depth == 1 and ch == ','):
+                emitted.extend(self._flush_member())
+                self.done = self._depth == 0
+                continue
+            self._member.append(ch)
+        return emitted
+
+    def _flush_member(self) -> list[tuple[str, object]]:
+        text = ''.join(self._member).strip()
+        self._member = []
+        if not text:
+            return []
+        try:
+            member = json.loads('{' + text + '}')
+        except json.JSONDecodeError:
+            return []
+        self.fields.update(member)
+        return list(member.items())
+
+
+def stream_json_fields(deltas, on_field=None) -> tuple[str, dict]:
+    # Consumes an iterator of text deltas; calls on_field(key, value) as each field closes.
+    # Returns the full raw text and the fields parsed along the way.
+    parser = IncrementalJSONParser()
+    parts = []
+    for delta in deltas:
+        parts.append(delta)
+        for key, value in parser.feed(delta):
+            if on_field:
+                on_field(key, value)
+    return ''.join(parts), parser.fields
@@ -0,0 +1,306 @@
+# SHARED ASYNC LLM GATEWAY FOR ALL GAIA CALLS (CLI, STREAMLIT AND GUI VERSIONS).
+
+# One AsyncOpenAI client per Gaia node, running on a background event loop. Every request goes
+# through an in-flight cap plus requests/min and tokens/min buckets, so callers wait for capacity
+# (backpressure) instead of hammering the node and collecting 429s.
+
+import os
+import time
+import queue
+import asyncio
+import logging
+import threading
+from openai import AsyncOpenAI, RateLimitError
+from resilience import (CircuitOpenError, RETRYABLE, backoff_delay, budget_scope, classify, current_budget,
+                        get_breaker)
+from instrumentation import current_url, observe, record_tokens, set_gauge, trace
+
+logger = logging.getLogger(__name__)
+
+MAX_IN_FLIGHT = int(os.getenv("GAIA_MAX_IN_FLIGHT", "4"))
+REQUESTS_PER_MINUTE = int(os.getenv("GAIA_RPM", "0"))  # 0 = unlimited
+TOKENS_PER_MINUTE = int(os.getenv("GAIA_TPM", "0"))  # 0 = unlimited
+RATE_LIMIT_RETRIES = 5
+LLM_RETRIES = int(os.getenv("GAIA_LLM_RETRIES", "3"))  # retries for timeouts, resets and 5xx
+DEFAULT_COOLDOWN = 5.0
+COMPLETION_TOKEN_GUESS = 512
+_END_OF_STREAM = object()
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+def estimate_message_tokens(messages: list[dict]) -> int:
+    return sum(estimate_tokens(m.get("content") or "") + 4 for m in messages)
+
+
+class TokenBucket:
+    def __init__(self, per_minute: int):
+        self.capacity = per_minute
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1):
+        if not self.capacity:
+            return
+        amount = min(amount, self.capacity)
+        async with self._lock:  # FIFO, so a big request is not starved by small ones
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def adjust(self, amount: float):
+        # Corrects an estimate once the real usage is known (positive = used more than reserved).
+        if self.capacity:
+            self._refill()
+            self.tokens -= amount
+
+
+class LLMGateway:
+    def __init__(self, base_url: str, api_key: str, max_in_flight: int = MAX_IN_FLIGHT,
+                 requests_per_minute: int = REQUESTS_PER_MINUTE, tokens_per_minute: int = TOKENS_PER_MINUTE,
+                 timeout: float = 90.0):
+        self.base_url = base_url
+        self.client = AsyncOpenAI(base_url=base_url, api_key=api_key, timeout=timeout, max_retries=0)
+        self.max_in_flight = max(1, max_in_flight)
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+        self._requests = TokenBucket(requests_per_minute)
+        self._tokens = TokenBucket(tokens_per_minute)
+        self._cooldown_until = 0.0
+        self.breaker = get_breaker(base_url)
+        self.stats = {"requests": 0, "in_flight": 0, "waiting": 0, "rate_limited": 0, "retries": 0,
+                      "prompt_tokens": 0, "completion_tokens": 0}
+
+    async def _wait_for_cooldown(self):
+        delay = self._cooldown_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _start_cooldown(self, error: RateLimitError):
+        retry_after = None
+        if error.response is not None:
+            retry_after = error.response.headers.get("retry-after")
+        try:
+            delay = float(retry_after) if retry_after else DEFAULT_COOLDOWN
+        except ValueError:
+            delay = DEFAULT_COOLDOWN
+        self._cooldown_until = max(self._cooldown_until, time.monotonic() + delay)
+        logger.warning("Gaia node %s rate limited us, pausing all requests for %.1fs", self.base_url, delay)
+
+    def _reservation(self, kwargs: dict) -> int:
+        return estimate_message_tokens(kwargs.get("messages", [])) + kwargs.get("max_tokens", COMPLETION_TOKEN_GUESS)
+
+    def _publish_load(self):
+        set_gauge("gaia_llm_in_flight", self.stats["in_flight"], node=self.base_url)
+        set_gauge("gaia_llm_waiting", self.stats["waiting"], node=self.base_url)
+
+    async def _acquire(self, reserved: int):
+        start = time.perf_counter()
+        self.stats["waiting"] += 1
+        self._publish_load()
+        try:
+            await self._wait_for_cooldown()
+            await self._requests.acquire(1)
+            await self._tokens.acquire(reserved)
+            await self._slots.acquire()
+        finally:
+            self.stats["waiting"] -= 1
+        self.stats["in_flight"] += 1
+        self._publish_load()
+        observe("llm_queue", time.perf_counter() - start)
+
+    def _release(self):
+        self.stats["in_flight"] -= 1
+        self._slots.release()
+        self._publish_load()
+
+    def _record_usage(self, prompt_tokens: int, completion_tokens: int, reserved: int, estimated: bool = False):
+        self.stats["requests"] += 1
+        self.stats["prompt_tokens"] += prompt_tokens
+        self.stats["completion_tokens"] += completion_tokens
+        self._tokens.adjust(prompt_tokens + completion_tokens - reserved)
+        record_tokens(prompt_tokens, completion_tokens, estimated, node=self.base_url)
+
+    def _check_circuit(self):
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"Gaia node {self.base_url} is failing, not sending more requests for now")
+
+    def _rate_limited(self, error: RateLimitError, attempt: int):
+        self.stats["rate_limited"] += 1
+        self.breaker.record_failure(RETRYABLE)
+        self._start_cooldown(error)
+        if attempt >= RATE_LIMIT_RETRIES:
+            raise error
+
+    def _retry_delay(self, error: Exception, failures: int) -> float:
+        # How long to wait before retrying a failed call; re-raises errors that should not be retried.
+        kind = classify(error)
+        self.breaker.record_error(kind)
+        budget = current_budget()
+        if kind != RETRYABLE or failures >= LLM_RETRIES or (budget is not None and not budget.spend()):
+            raise error
+        self.stats["retries"] += 1
+        delay = backoff_delay(failures)
+        logger.warning("Gaia call to %s failed (%s), retrying in %.1fs", self.base_url, error, delay)
+        return delay
+
+    async def achat(self, **kwargs):
+        kwargs = {k: v for k, v in kwargs.items() if v is not None}
+        reserved = self._reservation(kwargs)
+        rate_limited = failures = 0
+        while True:
+            self._check_circuit()
+            await self._acquire(reserved)
+            retry_delay = 0.0
+            started = time.perf_counter()
+            try:
+                response = await self.client.chat.completions.create(**kwargs)
+            except RateLimitError as e:
+                observe("llm", time.perf_counter() - started, False, model=kwargs.get("model"), error="rate_limited")
+                self._rate_limited(e, rate_limited)
+                rate_limited += 1
+                continue
+            except Exception as e:
+                observe("llm", time.perf_counter() - started, False, model=kwargs.get("model"), error=str(e))
+                retry_delay = self._retry_delay(e, failures)
+                failures += 1
+                continue
+            finally:
+                self._release()
+                self.breaker.release()
+                if retry_delay > 0:
+                    await asyncio.sleep(retry_delay)
+            self.breaker.record_success()
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                self._record_usage(usage.prompt_tokens or 0, usage.completion_tokens or 0, reserved)
+            else:
+                self._record_usage(estimate_message_tokens(kwargs.get("messages", [])), 0, reserved, estimated=True)
+            observe("llm", time.perf_counter() - started, model=kwargs.get("model"),
+                    prompt_tokens=usage.prompt_tokens if usage else None, completion_tokens=usage.completion_tokens if usage else None)
+            return response
+
+    async def astream_chat(self, **kwargs):
+        # Yields content deltas as the node generates them. Retries only happen before the first
+        # delta, so callers never see duplicated output.
+        kwargs = {k: v for k, v in kwargs.items() if v is not None}
+        kwargs.setdefault("stream_options", {"include_usage": True})  # usage arrives in a final chunk with no choices
+        reserved = self._reservation(kwargs)
+        rate_limited = failures = 0
+        while True:
+            self._check_circuit()
+            await self._acquire(reserved)
+            retry_delay = 0.0
+            started = time.perf_counter()
+            try:
+                try:
+                    stream = await self.client.chat.completions.create(stream=True, **kwargs)
+                except RateLimitError as e:
+                    observe("llm", time.perf_counter() - started, False, model=kwargs.get("model"), error="rate_limited")
+                    self._rate_limited(e, rate_limited)
+                    rate_limited += 1
+                    continue
+                except Exception as e:
+                    observe("llm", time.perf_counter() - started, False, model=kwargs.get("model"), error=str(e))
+                    retry_delay = self._retry_delay(e, failures)
+                    failures += 1
+                    continue
+                completion_chars = 0
+                first_token = usage = None
+                async for chunk in stream:
+                    usage = getattr(chunk, "usage", None) or usage
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        if first_token is None:
+                            first_token = time.perf_counter() - started
+                        completion_chars += len(delta)
+                        yield delta
+                self.breaker.record_success()
+                if usage is not None:
+                    self._record_usage(usage.prompt_tokens or 0, usage.completion_tokens or 0, reserved)
+                else:  # the server ignored stream_options
+                    prompt_tokens = estimate_message_tokens(kwargs.get("messages", []))
+                    self._record_usage(prompt_tokens, completion_chars // 4 + 1, reserved, estimated=True)
+                observe("llm", time.perf_counter() - started, model=kwargs.get("model"), stream=True,
+                        first_token_seconds=round(first_token, 4) if first_token is not None else None)
+                return
+            finally:
+                self._release()
+                self.breaker.release()  # a cancelled or failed stream must not leave the probe pending
+                if retry_delay > 0:
+                    await asyncio.sleep(retry_delay)
+
+    def chat(self, **kwargs):
+        # Blocking entry point for the threaded front-ends; waits here when the node is saturated.
+        url, budget = current_url(), current_budget()
+
+        async def traced_chat():
+            with trace(url), budget_scope(budget):  # the gateway loop does not see the caller's context
+                return await self.achat(**kwargs)
+
+        return asyncio.run_coroutine_threadsafe(traced_chat(), _get_loop()).result()
+
+    def stream_chat(self, **kwargs):
+        # Blocking generator over astream_chat() for the threaded front-ends.
+        deltas = queue.Queue()
+        url, budget = current_url(), current_budget()
+
+        async def pump():
+            try:
+                with trace(url), budget_scope(budget):
+                    async for delta in self.astream_chat(**kwargs):
+                        deltas.put(delta)
+                deltas.put(_END_OF_STREAM)
+            except Exception as e:
+                deltas.put(e)
+
+        future = asyncio.run_coroutine_threadsafe(pump(), _get_loop())
+        try:
+            while True:
+                item = deltas.get()
+                if item is _END_OF_STREAM:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            future.cancel()
+
+
+_loop = None
+_gateways = {}
+_lock = threading.Lock()
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="llm-gateway", daemon=True).start()
+        return _loop
+
+
+def get_gateway(base_url: str, api_key: str, timeout: float = 90.0) -> LLMGateway:
+    loop = _get_loop()
+    with _lock:
+        gateway = _gateways.get(base_url)
+    if gateway is None:
+        # Built on the gateway loop so its semaphore and buckets belong to that loop.
+        async def build():
+            return LLMGateway(base_url, api_key, timeout=timeout)
+        gateway = asyncio.run_coroutine_threadsafe(build(), loop).result()
+        with _lock:
+            gateway = _gateways.setdefault(base_url, gateway)
+    return gateway
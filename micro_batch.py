@@ -0,0 +1,88 @@
+# MICRO-BATCHED EXTRACTION: SEVERAL SMALL PAGES IN ONE GAIA REQUEST.
+
+# For short listing/category pages the extraction system prompt costs more tokens than the page
+# itself. Small documents are grouped up to a token budget and sent together, each wrapped in a
+# <document id="..."> block, and the model answers with one JSON object keyed by document id.
+# If that combined answer cannot be split back out, callers fall back to one request per document.
+
+import os
+import json
+import logging
+import threading
+from json_repair import parse_json
+
+logger = logging.getLogger(__name__)
+
+MICRO_BATCH_TOKENS = int(os.getenv("GAIA_MICRO_BATCH_TOKENS", "3000"))
+MICRO_BATCH_MAX_DOCS = int(os.getenv("GAIA_MICRO_BATCH_MAX_DOCS", "8"))
+SMALL_DOC_TOKENS = int(os.getenv("GAIA_SMALL_DOC_TOKENS", "800"))
+
+BATCH_INSTRUCTIONS = """
+You will now receive SEVERAL independent web pages in one message. Each page is wrapped in
+<document id="..."> ... </document> tags. Apply all of the instructions above to each page on its own.
+Return ONE JSON object whose keys are exactly the document ids and whose values are the JSON object
+you would have returned for that page alone. Do not merge information between pages.
+"""
+
+stats = {"requests": 0, "documents": 0, "fallbacks": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(**amounts):
+    with _stats_lock:
+        for key, amount in amounts.items():
+            stats[key] += amount
+
+
+def plan_groups(sizes: list[int], token_budget: int = MICRO_BATCH_TOKENS, max_docs: int = MICRO_BATCH_MAX_DOCS,
+                small_tokens: int = SMALL_DOC_TOKENS) -> list[list[int]]:
+    # Greedy first-fit over document indices; large documents always get a group of their own.
+    groups, current, used = [], [], 0
+    for i, size in enumerate(sizes):
+        if max_docs <= 1 or size > small_tokens:
+            groups.append([i])
+            continue
+        if current and (used + size > token_budget or len(current) >= max_docs):
+            groups.append(current)
+            current, used = [], 0
+        current.append(i)
+        used += size
+    if current:
+        groups.append(current)
+    return groups
+
+
+def build_messages(system_prompt: str, texts: dict[str, str]) -> list[dict]:
+    blocks = "\n\n".join(f'<document id="{doc_id}">\n{text}\n</document>' for doc_id, text in texts.items())
+    return [
+        {"role": "system", "content": system_prompt + BATCH_INSTRUCTIONS},
+        {"role": "user", "content": f"Extract information from each of the following web pages:\n\n{blocks}"},
+    ]
+
+
+def split_response(content: str, doc_ids: list[str]) -> dict[str, dict]:
+    # Returns the per-document objects that came back intact; missing or malformed ones are left out.
+    data = parse_json(content)
+    if not isinstance(data, dict):
+        raise ValueError("micro-batch response is not a JSON object")
+    return {doc_id: data[doc_id] for doc_id in doc_ids if isinstance(data.get(doc_id), dict)}
+
+
+def extract_group(chat, model: str, system_prompt: str, texts: dict[str, str]) -> dict[str, dict]:
+    # chat(**kwargs) is the gateway's blocking chat(); texts maps document id -> packed page text.
+    doc_ids = list(texts)
+    response = chat(
+        model=model,
+        messages=build_messages(system_prompt, texts),
+        response_format={"type": "json_object"},
+    )
+    _count(requests=1, documents=len(texts))
+    try:
+        results = split_response(response.choices[0].message.content or "", doc_ids)
+    except (json.JSONDecodeError, ValueError) as e:
+        logger.warning("Could not split micro-batch of %d documents (%s), falling back to single requests", len(doc_ids), e)
+        results = {}
+    missing = len(doc_ids) - len(results)
+    if missing:
+        _count(fallbacks=missing)
+    return results
@@ -0,0 +1,172 @@
+# CHANGE DETECTION FOR SCHEDULED RE-RUNS (`python extractor.py --monitor FILE`).
+
+# For every URL we store a fingerprint of the cleaned text, a 64-bit SimHash over word shingles and a
+# hash per section, together with the JSON extracted last time. On the next run a page is only sent
+# to Gaia again when a "relevant" section changed (one holding prices, ratings, dates or the fields
+# the prompt asks for) or when the SimHash moved by more than the threshold. Otherwise the previous
+# JSON is reused, so unchanged pages cost the fetch only. Changed pages get a diff of the JSON.
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from context_packing import split_chunks, tokenize, field_keywords, _extraction_score
+from extraction_cache import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+MONITOR_DB = os.getenv("GAIA_MONITOR_DB", os.path.join(CACHE_DIR, "monitor.sqlite"))
+SIMHASH_THRESHOLD = int(os.getenv("GAIA_MONITOR_SIMHASH_BITS", "3"))
+SECTION_CHARS = 800
+RELEVANT_SCORE = 1.0  # sections scoring at least this for the extraction prompt are "relevant"
+SHINGLE_WORDS = 3
+
+
+def fingerprint(text: str) -> str:
+    return hashlib.sha256(' '.join(text.split()).lower().encode('utf-8')).hexdigest()
+
+
+def simhash(text: str, bits: int = 64) -> int:
+    words = tokenize(text)
+    shingles = [' '.join(words[i:i + SHINGLE_WORDS]) for i in range(max(1, len(words) - SHINGLE_WORDS + 1))]
+    weights = [0] * bits
+    for shingle in shingles:
+        h = int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=bits // 8).digest(), 'big')
+        for bit in range(bits):
+            weights[bit] += 1 if h >> bit & 1 else -1
+    return sum(1 << bit for bit in range(bits) if weights[bit] > 0)
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def section_hashes(text: str, system_prompt: str | None = None) -> list[tuple[str, bool]]:
+    # (hash, relevant) per section; a section is relevant when it scores for the extraction prompt.
+    keywords = field_keywords(system_prompt)
+    return [(hashlib.sha1(' '.join(s.split()).lower().encode('utf-8')).hexdigest()[:16], _extraction_score(s, keywords) >= RELEVANT_SCORE)
+            for s in split_chunks(text, SECTION_CHARS)]
+
+
+def signature(text: str, system_prompt: str | None = None) -> dict:
+    return {"fingerprint": fingerprint(text), "simhash": simhash(text), "sections": section_hashes(text, system_prompt)}
+
+
+def diff_json(old, new, path: str = "") -> dict:
+    # {"added": {path: value}, "removed": {path: value}, "changed": {path: {"old": .., "new": ..}}}
+    diff = {"added": {}, "removed": {}, "changed": {}}
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key in old.keys() | new.keys():
+            child = f"{path}.{key}" if path else str(key)
+            before, after = old.get(key), new.get(key)  # a null field counts as a missing one
+            if before is None and after is None:
+                continue
+            if after is None:
+                diff["removed"][child] = before
+            elif before is None:
+                diff["added"][child] = after
+            else:
+                for kind, entries in diff_json(before, after, child).items():
+                    diff[kind].update(entries)
+    elif old != new:
+        diff["changed"][path or "$"] = {"old": old, "new": new}
+    return diff
+
+
+class ChangeReport:
+    def __init__(self, changed: bool, reason: str, signature: dict, previous: dict | None = None, distance: int | None = None,
+                 sections_changed: int = 0):
+        self.changed = changed
+        self.reason = reason  # "new", "identical", "relevant_section", "simhash" or "below_threshold"
+        self.signature = signature
+        self.previous = previous  # JSON extracted on the last run, if any
+        self.distance = distance
+        self.sections_changed = sections_changed
+
+    def summary(self) -> dict:
+        return {"changed": self.changed, "reason": self.reason, "simhash_distance": self.distance,
+                "sections_changed": self.sections_changed}
+
+
+class PageMonitor:
+    def __init__(self, path: str = MONITOR_DB, threshold: int = SIMHASH_THRESHOLD):
+        self.path = path
+        self.threshold = threshold
+        self.stats = {"checked": 0, "changed": 0, "unchanged": 0}
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            " url TEXT NOT NULL, profile TEXT NOT NULL, fingerprint TEXT NOT NULL, simhash TEXT NOT NULL,"
+            " sections TEXT NOT NULL, extracted TEXT NOT NULL, checked_at REAL NOT NULL, changed_at REAL NOT NULL,"
+            " PRIMARY KEY (url, profile))"
+        )
+        self._db.commit()
+
+    def check(self, url: str, text: str, system_prompt: str | None = None, profile: str = "universal") -> ChangeReport:
+        # profile separates results for different prompts/schemas on the same URL.
+        new = signature(text, system_prompt)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT fingerprint, simhash, sections, extracted FROM pages WHERE url = ? AND profile = ?", (url, profile)
+            ).fetchone()
+            self.stats["checked"] += 1
+        if row is None:
+            report = ChangeReport(True, "new", new)
+        else:
+            old_fingerprint, old_simhash, old_sections, extracted = row
+            previous = json.loads(extracted)
+            old_hashes = {h for h, _ in json.loads(old_sections)}
+            changed_sections = [(h, relevant) for h, relevant in new["sections"] if h not in old_hashes]
+            distance = hamming(int(old_simhash), new["simhash"])
+            if old_fingerprint == new["fingerprint"]:
+                report = ChangeReport(False, "identical", new, previous, 0)
+            elif any(relevant for _, relevant in changed_sections):
+                report = ChangeReport(True, "relevant_section", new, previous, distance, len(changed_sections))
+            elif distance > self.threshold:
+                report = ChangeReport(True, "simhash", new, previous, distance, len(changed_sections))
+            else:
+                report = ChangeReport(False, "below_threshold", new, previous, distance, len(changed_sections))
+        if not report.changed:
+            self.touch(url, profile)
+        with self._lock:
+            self.stats["changed" if report.changed else "unchanged"] += 1
+        return report
+
+    def touch(self, url: str, profile: str = "universal"):
+        with self._lock:
+            self._db.execute("UPDATE pages SET checked_at = ? WHERE url = ? AND profile = ?", (time.time(), url, profile))
+            self._db.commit()
+
+    def record(self, url: str, report: ChangeReport, extracted: dict, profile: str = "universal"):
+        # Only called after a successful extraction, so a failed run is retried next time.
+        now = time.time()
+        sig = report.signature
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO pages (url, profile, fingerprint, simhash, sections, extracted, checked_at, changed_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, profile, sig["fingerprint"], str(sig["simhash"]), json.dumps(sig["sections"]),
+                 json.dumps(extracted, ensure_ascii=False), now, now),
+            )
+            self._db.commit()
+
+    def summary(self) -> dict:
+        return dict(self.stats)
+
+
+_monitor = None
+_monitor_lock = threading.Lock()
+
+
+def get_monitor(threshold: int = SIMHASH_THRESHOLD) -> PageMonitor:
+    global _monitor
+    with _monitor_lock:
+        if _monitor is None:
+            _monitor = PageMonitor(MONITOR_DB, threshold)
+        return _monitor
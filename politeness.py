@@ -0,0 +1,228 @@
+# PER-DOMAIN POLITENESS SCHEDULER FOR THE BATCH FETCH STAGE.
+
+# URLs are queued per host and handed to fetch workers round-robin across hosts, so a slow or
+# throttling site never blocks the rest of the batch. Each host gets at most GAIA_MAX_PER_HOST
+# concurrent fetches and a minimum gap between request starts: the larger of GAIA_HOST_DELAY and the
+# robots.txt Crawl-delay. A 429 or 503 widens that gap (honouring Retry-After), and successful fetches
+# narrow it back. Per-host latency, error and throttle counts are kept for the batch summary.
+# Browser-tier loads and their retries take the same gap through pace(), in batch runs and single
+# extractions alike, and report the status they got through observe().
+
+import os
+import time
+import logging
+import threading
+from collections import deque
+from urllib import robotparser
+from urllib.parse import urlsplit
+import requests
+from driver_pool import USER_AGENT
+
+logger = logging.getLogger(__name__)
+
+MAX_PER_HOST = int(os.getenv("GAIA_MAX_PER_HOST", "2"))
+HOST_DELAY = float(os.getenv("GAIA_HOST_DELAY", "0.5"))  # seconds between request starts on one host
+MAX_HOST_DELAY = 60.0
+THROTTLE_FACTOR = 2.0
+RECOVERY_FACTOR = 0.8
+RESPECT_ROBOTS = os.getenv("GAIA_RESPECT_ROBOTS", "1") != "0"
+ROBOTS_TIMEOUT = 5
+THROTTLE_STATUSES = (429, 503)
+FETCH_QUEUE_SIZE = int(os.getenv("GAIA_FETCH_QUEUE_SIZE", "1000"))  # URLs held ahead of the fetch workers
+
+
+class HostThrottled(Exception):
+    # Raised by the browser tier for a 429/503 page so the retry loop waits out the widened gap.
+    pass
+
+
+def host_of(url: str) -> str:
+    return urlsplit(url).hostname or ""
+
+
+class HostState:
+    def __init__(self, name: str, base_delay: float):
+        self.name = name
+        self.active = 0
+        self.base_delay = base_delay
+        self.delay = base_delay
+        self.next_allowed = 0.0
+        self.robots_loaded = not RESPECT_ROBOTS
+        self.robots_loading = False
+        self.stats = {"fetches": 0, "errors": 0, "throttled": 0, "latency_total": 0.0, "latency_max": 0.0}
+
+    def ready(self, now: float, max_active: int) -> bool:
+        return self.active < max_active and now >= self.next_allowed and not self.robots_loading
+
+    def summary(self) -> dict:
+        fetches = self.stats["fetches"]
+        return {
+            "fetches": fetches,
+            "errors": self.stats["errors"],
+            "throttled": self.stats["throttled"],
+            "avg_latency": round(self.stats["latency_total"] / fetches, 3) if fetches else None,
+            "max_latency": round(self.stats["latency_max"], 3),
+            "delay": round(self.delay, 2),
+        }
+
+
+class PolitenessScheduler:
+    # Shared per-host state (slots, gaps, robots, stats). Each batch run drains its own FetchQueue.
+    def __init__(self, max_per_host: int = MAX_PER_HOST, delay: float = HOST_DELAY):
+        self.max_per_host = max(1, max_per_host)
+        self.delay = delay
+        self._hosts = {}
+        self._cond = threading.Condition()
+
+    def _host(self, name: str) -> HostState:
+        host = self._hosts.get(name)
+        if host is None:
+            host = self._hosts[name] = HostState(name, self.delay)
+        return host
+
+    def queue(self, maxsize: int = FETCH_QUEUE_SIZE) -> "FetchQueue":
+        return FetchQueue(self, maxsize)
+
+    def _load_robots(self, host: HostState, url: str):
+        # Done outside the lock by the first worker to reach a host; the host is paused meanwhile.
+        crawl_delay = None
+        parts = urlsplit(url)
+        parser = robotparser.RobotFileParser()
+        try:
+            resp = requests.get(f"{parts.scheme}://{parts.netloc}/robots.txt", timeout=ROBOTS_TIMEOUT,
+                                headers={"User-Agent": USER_AGENT})
+            if resp.status_code == 200:
+                parser.parse(resp.text.splitlines())
+                crawl_delay = parser.crawl_delay(USER_AGENT)
+        except requests.RequestException as e:
+            logger.debug("Could not read robots.txt for %s: %s", host.name, e)
+        with self._cond:
+            if crawl_delay:
+                host.base_delay = max(host.base_delay, float(crawl_delay))
+                host.delay = max(host.delay, host.base_delay)
+                logger.info("%s asks for a crawl delay of %ss", host.name, crawl_delay)
+            host.robots_loaded = True
+            host.robots_loading = False
+            self._cond.notify_all()
+
+    def release(self, url: str, latency: float, ok: bool = True):
+        with self._cond:
+            host = self._host(host_of(url))
+            host.active = max(0, host.active - 1)
+            host.stats["fetches"] += 1
+            host.stats["latency_total"] += latency
+            host.stats["latency_max"] = max(host.stats["latency_max"], latency)
+            if not ok:
+                host.stats["errors"] += 1
+            self._cond.notify_all()
+
+    def observe(self, url: str, status: int | None, retry_after: str | None = None):
+        # Called by the fetch tiers for every response: widens the gap on 429/503, narrows it on success.
+        with self._cond:
+            host = self._host(host_of(url))
+            if status in THROTTLE_STATUSES:
+                host.stats["throttled"] += 1
+                delay = host.delay * THROTTLE_FACTOR
+                try:
+                    delay = max(delay, float(retry_after)) if retry_after else delay
+                except ValueError:
+                    pass
+                host.delay = min(max(delay, host.base_delay, 1.0), MAX_HOST_DELAY)
+                host.next_allowed = max(host.next_allowed, time.monotonic() + host.delay)
+                logger.warning("%s answered %s, slowing down to one request every %.1fs", host.name, status, host.delay)
+            elif status is not None and status < 400:
+                host.delay = max(host.base_delay, host.delay * RECOVERY_FACTOR)
+
+    def pace(self, url: str):
+        # Waits until the host's gap has passed and claims the next request start. Used by fetches that
+        # do not come out of a FetchQueue (or follow one on the same host), so it takes no slot.
+        with self._cond:
+            host = self._host(host_of(url))
+            while (wait := host.next_allowed - time.monotonic()) > 0:
+                self._cond.wait(min(wait, MAX_HOST_DELAY))
+            host.next_allowed = time.monotonic() + host.delay
+
+    def summary(self) -> dict:
+        with self._cond:
+            return {name: host.summary() for name, host in self._hosts.items()}
+
+
+class FetchQueue:
+    # One queue per host, served round-robin; get() only hands out URLs whose host has a free slot
+    # and whose gap has elapsed, so one slow site never holds up the others. put() blocks while
+    # maxsize URLs are waiting, so a huge input file is not read into memory up front.
+    def __init__(self, scheduler: PolitenessScheduler, maxsize: int = FETCH_QUEUE_SIZE):
+        self.scheduler = scheduler
+        self.maxsize = maxsize
+        self._queues = {}
+        self._order = deque()
+        self._size = 0
+        self._closed = False
+
+    def put(self, item, url: str):
+        with self.scheduler._cond:
+            while self.maxsize > 0 and self._size >= self.maxsize:
+                self.scheduler._cond.wait()
+            self._size += 1
+            name = host_of(url)
+            if name not in self._queues:
+                self._queues[name] = deque()
+                self._order.append(name)
+            self._queues[name].append((item, url))
+            self.scheduler._cond.notify_all()
+
+    def close(self):
+        # No more items will be added; get() returns None once every queue is drained.
+        with self.scheduler._cond:
+            self._closed = True
+            self.scheduler._cond.notify_all()
+
+    def _pick(self, now: float):
+        for _ in range(len(self._order)):
+            name = self._order[0]
+            self._order.rotate(-1)
+            host = self.scheduler._host(name)
+            if self._queues[name] and host.ready(now, self.scheduler.max_per_host):
+                item, url = self._queues[name].popleft()
+                self._size -= 1
+                self.scheduler._cond.notify_all()  # wakes a put() waiting for room
+                host.active += 1
+                host.next_allowed = now + host.delay
+                if not host.robots_loaded:
+                    host.robots_loading = True
+                return host, item, url
+        return None
+
+    def _next_wakeup(self, now: float) -> float | None:
+        hosts = [self.scheduler._host(name) for name, queue in self._queues.items() if queue]
+        waits = [h.next_allowed - now for h in hosts if h.active < self.scheduler.max_per_host and not h.robots_loading]
+        return max(0.01, min(waits)) if waits else None
+
+    def get(self):
+        # Blocks until some host may be fetched again; returns (item, url) or None when finished.
+        cond = self.scheduler._cond
+        with cond:
+            while True:
+                now = time.monotonic()
+                picked = self._pick(now)
+                if picked:
+                    break
+                if self._closed and not any(self._queues.values()):
+                    return None
+                cond.wait(timeout=self._next_wakeup(now))
+        host, item, url = picked
+        if host.robots_loading:
+            self.scheduler._load_robots(host, url)
+        return item, url
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> PolitenessScheduler:
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = PolitenessScheduler()
+        return _scheduler
@@ -0,0 +1,245 @@
+# SHARED RETRY POLICY FOR PAGE FETCHES AND GAIA CALLS.
+
+# Failures are classified before anything is retried: timeouts, connection resets, 429 and 5xx are
+# worth another attempt, while 404s, auth errors and bad requests are not. A DNS failure or refused
+# connection means the host is unreachable, which opens that endpoint's circuit breaker at once so
+# later URLs on the same host fail fast. Retries back off exponentially with full jitter and draw on
+# a retry budget shared by the whole job, so a bad run cannot spend hours retrying. The budget is
+# scoped with budget_scope() (one per batch job, service request or GUI/Streamlit action), so a
+# long-running process never exhausts it for good.
+
+import os
+import time
+import json
+import random
+import logging
+import threading
+import functools
+import contextvars
+from contextlib import contextmanager
+import requests
+import openai
+
+try:
+    from selenium.common.exceptions import WebDriverException, TimeoutException as BrowserTimeout
+except ImportError:
+    WebDriverException = BrowserTimeout = None
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE = "retryable"
+TERMINAL = "terminal"
+UNREACHABLE = "unreachable"  # terminal, and the whole endpoint should be treated as down
+
+BASE_DELAY = float(os.getenv("GAIA_RETRY_BASE_DELAY", "1.0"))
+MAX_DELAY = float(os.getenv("GAIA_RETRY_MAX_DELAY", "30"))
+RETRY_BUDGET = int(os.getenv("GAIA_RETRY_BUDGET", "200"))  # retries per job, request or user action; 0 = unlimited
+BREAKER_FAILURES = int(os.getenv("GAIA_BREAKER_FAILURES", "5"))
+BREAKER_RESET = float(os.getenv("GAIA_BREAKER_RESET", "60"))
+
+RETRYABLE_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+_UNREACHABLE_MARKERS = ("err_name_not_resolved", "name or service not known", "nodename nor servname",
+                        "failed to resolve", "getaddrinfo failed", "err_connection_refused", "connection refused",
+                        "err_address_unreachable", "no route to host")
+_RETRYABLE_MARKERS = ("timed out", "timeout", "err_connection_reset", "connection reset", "err_connection_closed",
+                      "err_network_changed", "err_empty_response", "invalid session id", "chrome not reachable",
+                      "disconnected")
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+def classify_status(status: int) -> str:
+    if status in RETRYABLE_STATUSES or status >= 500:
+        return RETRYABLE
+    return TERMINAL
+
+
+def classify(error: BaseException) -> str:
+    if isinstance(error, CircuitOpenError):
+        return UNREACHABLE
+    message = str(error).lower()
+    if any(marker in message for marker in _UNREACHABLE_MARKERS):
+        return UNREACHABLE
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError, openai.RateLimitError,
+                          openai.InternalServerError)):
+        return RETRYABLE
+    if isinstance(error, openai.APIStatusError):
+        return classify_status(error.status_code)
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return classify_status(error.response.status_code)
+    if isinstance(error, (requests.Timeout, requests.ConnectionError, requests.exceptions.ChunkedEncodingError,
+                          TimeoutError, ConnectionError)):
+        return RETRYABLE
+    if isinstance(error, (json.JSONDecodeError, ValueError, KeyError, TypeError)):
+        return TERMINAL
+    if BrowserTimeout is not None and isinstance(error, BrowserTimeout):
+        return RETRYABLE
+    if WebDriverException is not None and isinstance(error, WebDriverException):
+        return RETRYABLE if any(marker in message for marker in _RETRYABLE_MARKERS) else TERMINAL
+    return RETRYABLE
+
+
+def backoff_delay(attempt: int, base: float = BASE_DELAY, cap: float = MAX_DELAY) -> float:
+    # Full jitter: uniform in [0, min(cap, base * 2^attempt)], attempt counting from 0.
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = BREAKER_FAILURES, reset_timeout: float = BREAKER_RESET):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self.opened_at >= self.reset_timeout else "open"
+
+    def allow(self) -> bool:
+        # When half-open, a single probe call is let through; the rest keep failing fast.
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self, kind: str = RETRYABLE):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if kind == UNREACHABLE or self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    logger.warning("Circuit for %s opened after %d failures, failing fast for %.0fs",
+                                   self.name, self.failures, self.reset_timeout)
+                self.opened_at = time.monotonic()
+
+    def record_error(self, kind: str):
+        # A terminal error (404, bad request, unparseable answer) means the endpoint did answer.
+        if kind == TERMINAL:
+            self.record_success()
+        else:
+            self.record_failure(kind)
+
+    def release(self):
+        # Ends a probe that finished without a verdict (cancelled, interrupted) so the next call can probe.
+        with self._lock:
+            self._probing = False
+
+
+class RetryBudget:
+    def __init__(self, total: int = RETRY_BUDGET):
+        self.total = total
+        self.spent = 0
+        self._lock = threading.Lock()
+
+    def reset(self, total: int | None = None):
+        with self._lock:
+            self.total = self.total if total is None else total
+            self.spent = 0
+
+    def spend(self) -> bool:
+        with self._lock:
+            if self.total and self.spent >= self.total:
+                return False
+            self.spent += 1
+            return True
+
+    def summary(self) -> dict:
+        return {"total": self.total, "spent": self.spent}
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+_current_budget = contextvars.ContextVar("gaia_retry_budget", default=None)
+
+
+def current_budget() -> RetryBudget | None:
+    # None outside any scope: each call is then bounded only by its own attempt limit.
+    return _current_budget.get()
+
+
+@contextmanager
+def budget_scope(budget: RetryBudget | None = None):
+    budget = budget if budget is not None else RetryBudget()
+    token = _current_budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _current_budget.reset(token)
+
+
+def with_budget(fn, budget: RetryBudget | None = None):
+    # Wraps fn so it runs inside a budget scope; for worker threads, which do not inherit context.
+    budget = budget if budget is not None else RetryBudget()
+
+    @functools.wraps(fn)
+    def scoped(*args, **kwargs):
+        with budget_scope(budget):
+            return fn(*args, **kwargs)
+    return scoped
+
+
+def get_breaker(endpoint: str) -> CircuitBreaker:
+    with _breakers_lock:
+        breaker = _breakers.get(endpoint)
+        if breaker is None:
+            breaker = _breakers[endpoint] = CircuitBreaker(endpoint)
+        return breaker
+
+
+def open_circuits() -> list[str]:
+    with _breakers_lock:
+        return [name for name, breaker in _breakers.items() if breaker.state != "closed"]
+
+
+def _should_retry(error: BaseException, kind: str, attempt: int, attempts: int, budget: RetryBudget | None) -> bool:
+    if kind != RETRYABLE or attempt + 1 >= attempts:
+        return False
+    if budget is not None and not budget.spend():
+        logger.warning("Retry budget of %d exhausted, not retrying: %s", budget.total, error)
+        return False
+    return True
+
+
+def call_with_retries(fn, endpoint: str, attempts: int = 3, base_delay: float = BASE_DELAY, max_delay: float = MAX_DELAY,
+                      budget: RetryBudget | None = None, on_retry=None):
+    # on_retry(attempt, error, delay) is called before each sleep, e.g. to print progress.
+    # Without an explicit budget, retries draw on the caller's budget_scope().
+    budget = budget if budget is not None else current_budget()
+    breaker = get_breaker(endpoint)
+    for attempt in range(attempts):
+        if not breaker.allow():
+            raise CircuitOpenError(f"{endpoint} is failing, skipping it for now")
+        try:
+            result = fn()
+        except Exception as e:
+            kind = classify(e)
+            breaker.record_error(kind)
+            if not _should_retry(e, kind, attempt, attempts, budget):
+                raise
+            delay = backoff_delay(attempt, base_delay, max_delay)
+            if on_retry:
+                on_retry(attempt + 1, e, delay)
+            time.sleep(delay)
+            continue
+        finally:
+            breaker.release()
+        breaker.record_success()
+        return result
+
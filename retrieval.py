@@ -0,0 +1,72 @@
+# PER-DOCUMENT RETRIEVAL INDEX FOR THE Q&A LOOP.
+
+# Built once right after extraction. Each question then sends only the top-k passages that match it
+# instead of resending the first 15k characters, and questions can be answered from anywhere in the
+# page. Ranking is BM25 over sentence chunks; if GAIA_EMBEDDING_MODEL names a sentence-transformers
+# model and the package is installed, cosine similarity of local embeddings is blended in.
+
+import os
+import logging
+import threading
+from context_packing import BM25, split_chunks, tokenize, pack_chunks
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:
+    SentenceTransformer = None
+
+logger = logging.getLogger(__name__)
+
+RETRIEVAL_CHUNK_CHARS = 400
+RETRIEVAL_TOP_K = int(os.getenv("GAIA_QA_TOP_K", "6"))
+RETRIEVAL_TOKEN_BUDGET = int(os.getenv("GAIA_QA_TOKEN_BUDGET", "3000"))
+EMBEDDING_MODEL = os.getenv("GAIA_EMBEDDING_MODEL")
+EMBEDDING_WEIGHT = 0.5
+
+_embedder = None
+_embedder_lock = threading.Lock()
+
+
+def get_embedder():
+    global _embedder
+    if not EMBEDDING_MODEL or SentenceTransformer is None:
+        return None
+    with _embedder_lock:
+        if _embedder is None:
+            try:
+                _embedder = SentenceTransformer(EMBEDDING_MODEL)
+            except Exception as e:
+                logger.warning("Could not load embedding model %s, using BM25 only: %s", EMBEDDING_MODEL, e)
+                return None
+        return _embedder
+
+
+class RetrievalIndex:
+    def __init__(self, text: str, chunk_chars: int = RETRIEVAL_CHUNK_CHARS):
+        self.chunks = split_chunks(text, chunk_chars)
+        self.bm25 = BM25([tokenize(c) for c in self.chunks])
+        self.embedder = get_embedder()
+        self.embeddings = None
+        if self.embedder is not None and self.chunks:
+            self.embeddings = self.embedder.encode(self.chunks, normalize_embeddings=True)
+        logger.info("Built retrieval index over %d chunks (embeddings: %s)", len(self.chunks), self.embeddings is not None)
+
+    def scores(self, question: str) -> list[float]:
+        scores = self.bm25.scores(tokenize(question))
+        if self.embeddings is None:
+            return scores
+        top = max(scores) or 1.0
+        similarities = self.embeddings @ self.embedder.encode([question], normalize_embeddings=True)[0]
+        return [(1 - EMBEDDING_WEIGHT) * s / top + EMBEDDING_WEIGHT * float(sim) for s, sim in zip(scores, similarities)]
+
+    def search(self, question: str, k: int = RETRIEVAL_TOP_K) -> list[tuple[int, float]]:
+        scored = sorted(enumerate(self.scores(question)), key=lambda item: -item[1])
+        return [(i, score) for i, score in scored[:k] if score > 0]
+
+    def context_for(self, question: str, k: int = RETRIEVAL_TOP_K, token_budget: int = RETRIEVAL_TOKEN_BUDGET) -> str:
+        hits = dict(self.search(question, k))
+        if not hits:
+            # Nothing matched lexically (e.g. "summarise this page"): fall back to the opening passages.
+            hits = {i: 1.0 for i in range(min(k, len(self.chunks)))}
+        scores = [hits.get(i, 0.0) for i in range(len(self.chunks))]
+        return pack_chunks(self.chunks, scores, token_budget, lead_chunks=0, candidates=list(hits))
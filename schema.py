@@ -0,0 +1,207 @@
+# SCHEMA-DRIVEN TARGETED EXTRACTION (`python extractor.py --schema ...` OR `extract_with_schema()`).
+
+# Instead of the long universal prompt, a user schema (a JSON Schema, a {"field": "type"} mapping or
+# a plain "price:number, availability" field list) is compiled into a minimal prompt that asks only
+# for those fields. The response is validated against the schema, and results are cached per
+# schema hash, so changing the schema never returns stale results for the old one.
+
+import os
+import re
+import json
+import hashlib
+import logging
+from context_packing import pack_for_extraction
+from extraction_cache import ExtractionCache, get_extraction_cache
+from json_repair import load_llm_json
+
+logger = logging.getLogger(__name__)
+
+JSON_TYPES = {
+    "string": (str,),
+    "number": (int, float),
+    "integer": (int,),
+    "boolean": (bool,),
+    "array": (list,),
+    "object": (dict,),
+    "null": (type(None),),
+}
+SCHEMA_MESSAGE = "Extract the requested fields from the following web page content:\n\n{}"
+
+
+class SchemaValidationError(ValueError):
+    def __init__(self, errors: list[str]):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+
+def _types_of(spec: dict) -> list[str]:
+    types = spec.get("type")
+    if types is None:
+        return []
+    types = [types] if isinstance(types, str) else list(types)
+    unknown = [t for t in types if t not in JSON_TYPES]
+    if unknown:
+        raise ValueError(f"Unsupported schema type(s): {', '.join(unknown)}")
+    return types
+
+
+class ExtractionSchema:
+    def __init__(self, properties: dict[str, dict], required: list[str] | None = None):
+        if not properties:
+            raise ValueError("An extraction schema needs at least one field")
+        self.properties = properties
+        self.required = [name for name in (required or []) if name in properties]
+        for spec in properties.values():
+            _types_of(spec)
+        canonical = json.dumps({"properties": properties, "required": self.required}, sort_keys=True)
+        self.hash = hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:16]
+        self.prompt = self._compile()
+
+    @classmethod
+    def from_json(cls, data) -> "ExtractionSchema":
+        if isinstance(data, list):
+            return cls({str(name): {} for name in data})
+        if not isinstance(data, dict):
+            raise ValueError("A schema must be a JSON object or a list of field names")
+        if isinstance(data.get("properties"), dict):
+            return cls(data["properties"], data.get("required"))
+        # Shorthand: {"price": "number", "title": {"type": "string", "description": "..."}}
+        return cls({name: spec if isinstance(spec, dict) else {"type": spec} for name, spec in data.items()})
+
+    @classmethod
+    def from_field_list(cls, text: str) -> "ExtractionSchema":
+        properties = {}
+        for item in text.split(","):
+            name, _, type_name = item.strip().partition(":")
+            if name:
+                properties[name.strip()] = {"type": type_name.strip()} if type_name.strip() else {}
+        return cls(properties)
+
+    def _compile(self) -> str:
+        # Field names are bolded so context packing picks them up as relevance keywords.
+        lines = []
+        for name, spec in self.properties.items():
+            types = [t for t in _types_of(spec) if t != "null"]
+            notes = []
+            if spec.get("description"):
+                notes.append(spec["description"].rstrip(".") + ".")
+            if spec.get("enum"):
+                notes.append(f"One of: {', '.join(json.dumps(v) for v in spec['enum'])}.")
+            if name in self.required:
+                notes.append("Required.")
+            line = f"- **{name}**" + (f" ({' or '.join(types)})" if types else "")
+            lines.append(line + (f": {' '.join(notes)}" if notes else ""))
+        return (
+            "Extract the following fields from the web page text and return ONLY a JSON object with exactly these keys:\n"
+            + "\n".join(lines)
+            + "\nUse null for any field the page does not state. Do not add other keys, markdown or explanations."
+        )
+
+    def coerce(self, data) -> dict:
+        # Converts values the model wrote in the wrong type where the intent is unambiguous:
+        # "$1,299.00" -> 1299.0 for numbers, "yes" -> true, a lone value -> [value] for arrays.
+        # Keys outside the schema are kept; validate() decides what is returned.
+        if not isinstance(data, dict):
+            return data
+        result = dict(data)
+        for name, spec in self.properties.items():
+            if result.get(name) is not None:
+                result[name] = _coerce_value(result[name], spec)
+        return result
+
+    def validate(self, data) -> dict:
+        # Returns the object restricted to the schema's fields; raises SchemaValidationError on mismatches.
+        if not isinstance(data, dict):
+            raise SchemaValidationError(["response is not a JSON object"])
+        errors, result = [], {}
+        for name, spec in self.properties.items():
+            value = data.get(name)
+            result[name] = value
+            if value is None:
+                if name in self.required:
+                    errors.append(f"{name} is required")
+                continue
+            types = _types_of(spec)
+            if types and not any(isinstance(value, JSON_TYPES[t]) and not (t in ("number", "integer") and isinstance(value, bool))
+                                 for t in types):
+                errors.append(f"{name} should be {' or '.join(types)}, got {type(value).__name__}")
+            elif spec.get("enum") and value not in spec["enum"]:
+                errors.append(f"{name} should be one of {spec['enum']}, got {value!r}")
+        if errors:
+            raise SchemaValidationError(errors)
+        return result
+
+
+_NUMBER_RE = re.compile(r'-?\d[\d,]*(?:\.\d+)?|-?\.\d+')
+_BOOLEANS = {"true": True, "yes": True, "y": True, "1": True, "false": False, "no": False, "n": False, "0": False}
+_NULLS = {"", "null", "none", "n/a", "na", "not available", "not found", "unknown"}
+
+
+def _coerce_value(value, spec: dict):
+    types = [t for t in _types_of(spec) if t != "null"]
+    if isinstance(value, str) and value.strip().lower() in _NULLS and "string" not in types:
+        return None
+    if not types or any(isinstance(value, JSON_TYPES[t]) and not (t in ("number", "integer") and isinstance(value, bool))
+                        for t in types):
+        if spec.get("enum") and isinstance(value, str) and value not in spec["enum"]:
+            # Case and whitespace differences only: "in stock" -> "In Stock".
+            matches = [v for v in spec["enum"] if isinstance(v, str) and v.strip().lower() == value.strip().lower()]
+            return matches[0] if matches else value
+        return value
+    for t in types:
+        if t in ("number", "integer") and isinstance(value, str):
+            found = _NUMBER_RE.findall(value)
+            if len(found) == 1:
+                number = float(found[0].replace(",", ""))
+                if t == "integer" and number.is_integer():
+                    return int(number)
+                if t == "number":
+                    return int(number) if number.is_integer() and "." not in found[0] else number
+        elif t == "boolean" and isinstance(value, (str, int)) and str(value).strip().lower() in _BOOLEANS:
+            return _BOOLEANS[str(value).strip().lower()]
+        elif t == "string" and isinstance(value, (int, float)) and not isinstance(value, bool):
+            return str(value)
+        elif t == "array" and not isinstance(value, list):
+            return [value]
+        elif t in ("string", "number", "integer", "boolean") and isinstance(value, list) and len(value) == 1:
+            return _coerce_value(value[0], spec)
+    return value
+
+
+def load_schema(spec: str) -> ExtractionSchema:
+    # spec is a path to a JSON file, inline JSON, or a comma-separated field list.
+    if os.path.isfile(spec):
+        with open(spec, 'r', encoding='utf-8') as f:
+            return ExtractionSchema.from_json(json.load(f))
+    if spec.lstrip().startswith(('{', '[')):
+        return ExtractionSchema.from_json(json.loads(spec))
+    return ExtractionSchema.from_field_list(spec)
+
+
+def schema_message(text: str, schema: ExtractionSchema) -> str:
+    return SCHEMA_MESSAGE.format(pack_for_extraction(text, schema.prompt))
+
+
+def extract_with_schema(text: str, schema: ExtractionSchema | str | dict | list, gateway, model: str) -> dict:
+    # Python API: extract only the schema's fields from page text through an LLMGateway.
+    if not isinstance(schema, ExtractionSchema):
+        schema = load_schema(schema) if isinstance(schema, str) else ExtractionSchema.from_json(schema)
+    message = schema_message(text, schema)
+    cache = get_extraction_cache()
+    cache_key = ExtractionCache.make_key(message, model, schema.prompt)
+    cached = cache.get(cache_key) if cache else None
+    if cached is not None:
+        return cached
+    response = gateway.chat(
+        model=model,
+        messages=[
+            {"role": "system", "content": schema.prompt},
+            {"role": "user", "content": message},
+        ],
+        response_format={"type": "json_object"},
+    )
+    data = schema.validate(load_llm_json(response.choices[0].message.content or "", gateway.chat, model, schema))
+    logger.info("Extracted %d schema fields (schema %s)", len(data), schema.hash)
+    if cache:
+        cache.put(cache_key, data)
+    return data
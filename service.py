@@ -0,0 +1,366 @@
+# HEADLESS EXTRACTION SERVICE: ONE LONG-RUNNING PROCESS SERVING EXTRACTION AND Q&A OVER HTTP.
+
+# run by (python service.py --host 127.0.0.1 --port 8000)
+# Every request shares the same warm driver pool, LLM gateway, HTTP/extraction caches, politeness
+# scheduler and circuit breakers, instead of each CLI, Streamlit or GUI session building its own.
+#   POST /extract        {"url": ..., "schema": optional}          -> extracted JSON for one page
+#   POST /extract/batch  {"urls": [...], "schema": optional}       -> 202 with a job id, runs in the background
+#   GET  /jobs/<id>      progress counts; per-URL results once the job is done (or with ?results=1)
+#   POST /ask            {"url" or "text": ..., "question": ...}   -> answer from the page's retrieval index
+#   GET  /health, GET /metrics (Prometheus)
+# Batch jobs are kept in a SQLite job store per job under GAIA_SERVICE_JOB_DIR, so their results
+# survive a restart; an interrupted job can be finished with `python extractor.py --resume <job>/job.sqlite`.
+
+import os
+import sys
+import json
+import time
+import uuid
+import logging
+import argparse
+import threading
+from collections import OrderedDict
+from urllib.parse import urlsplit, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import extractor
+from extractor import (get_text_from_url, extract_info_with_gaia_agent, extract_and_release, extract_many_and_release,
+                       QA_SYSTEM_PROMPT, QA_MESSAGE)
+from driver_pool import get_driver_pool
+from driver_binary import get_chrome_service
+from retrieval import RetrievalIndex
+from extraction_cache import CACHE_DIR
+from job_store import JobStore, run_job, MAX_ATTEMPTS
+from batch import FETCH_WORKERS, LLM_WORKERS
+from politeness import get_scheduler
+from micro_batch import MICRO_BATCH_MAX_DOCS
+from schema import ExtractionSchema, SchemaValidationError, load_schema
+from resilience import CircuitOpenError, RetryBudget, budget_scope, classify, open_circuits, TERMINAL
+from instrumentation import render_prometheus, traced
+
+logger = logging.getLogger(__name__)
+
+SERVICE_HOST = os.getenv("GAIA_SERVICE_HOST", "127.0.0.1")
+SERVICE_PORT = int(os.getenv("GAIA_SERVICE_PORT", "8000"))
+JOB_DIR = os.getenv("GAIA_SERVICE_JOB_DIR", os.path.join(CACHE_DIR, "jobs"))
+MAX_BATCH_URLS = int(os.getenv("GAIA_SERVICE_MAX_BATCH", "5000"))
+MAX_BODY_BYTES = 4 * 1024 * 1024
+QA_PAGES = int(os.getenv("GAIA_SERVICE_QA_PAGES", "32"))  # retrieval indexes kept for /ask, most recent first
+
+
+class RequestError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class BatchJob:
+    def __init__(self, job_id: str, store: JobStore, output_path: str):
+        self.id = job_id
+        self.store = store
+        self.output_path = output_path
+        self.status = "queued"
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+
+    def summary(self, with_results: bool = False) -> dict:
+        result = {"job_id": self.id, "status": self.status, "created": self.created, "finished": self.finished,
+                  "counts": self.store.summary()}
+        if self.error:
+            result["error"] = self.error
+        if with_results:
+            result["results"] = self.store.items()
+        return result
+
+
+class ExtractionService:
+    def __init__(self, service_obj, fetch_workers: int = FETCH_WORKERS, llm_workers: int = LLM_WORKERS,
+                 job_dir: str = JOB_DIR, max_attempts: int = MAX_ATTEMPTS):
+        self.service_obj = service_obj
+        self.fetch_workers = fetch_workers
+        self.llm_workers = llm_workers
+        self.job_dir = job_dir
+        self.max_attempts = max_attempts
+        self.jobs = {}
+        self.indexes = OrderedDict()  # url -> RetrievalIndex, for /ask
+        self.lock = threading.Lock()
+        self.started = time.time()
+        get_driver_pool(service_obj, size=fetch_workers)
+
+    def fetch(self, url: str):
+        return get_text_from_url(url, self.service_obj)
+
+    def _remember_index(self, url: str, text: str) -> RetrievalIndex:
+        index = RetrievalIndex(text)
+        with self.lock:
+            self.indexes[url] = index
+            self.indexes.move_to_end(url)
+            while len(self.indexes) > QA_PAGES:
+                self.indexes.popitem(last=False)
+        return index
+
+    def _index_for(self, url: str) -> RetrievalIndex:
+        with self.lock:
+            index = self.indexes.get(url)
+            if index is not None:
+                self.indexes.move_to_end(url)
+                return index
+        document = self.fetch(url)
+        if document is None:
+            raise RequestError(502, f"could not fetch {url}")
+        try:
+            return self._remember_index(url, document.text)
+        finally:
+            document.release()
+
+    @traced("service_extract")
+    def extract(self, url: str, schema: ExtractionSchema | None = None) -> dict:
+        document = self.fetch(url)
+        if document is None:
+            raise RequestError(502, f"could not fetch {url}")
+        try:
+            data, text = extract_info_with_gaia_agent(document, schema=schema)
+            self._remember_index(url, text)
+            return {"url": url, "source": document.source, "timings": document.timings, "data": data}
+        finally:
+            document.release()
+
+    @traced("service_ask")
+    def ask(self, question: str, url: str | None = None, text: str | None = None) -> dict:
+        index = RetrievalIndex(text) if text is not None else self._index_for(url)
+        response = extractor.client.chat(
+            model=extractor.model,
+            messages=[
+                {"role": "system", "content": QA_SYSTEM_PROMPT},
+                {"role": "user", "content": QA_MESSAGE.format(index.context_for(question), question)},
+            ],
+        )
+        return {"url": url, "question": question, "answer": response.choices[0].message.content}
+
+    def submit_batch(self, items: list[tuple[str, str]], schema: ExtractionSchema | None = None,
+                     micro_batch: int = MICRO_BATCH_MAX_DOCS) -> BatchJob:
+        job_id = uuid.uuid4().hex[:12]
+        path = os.path.join(self.job_dir, job_id)
+        store = JobStore(os.path.join(path, "job.sqlite"), self.max_attempts)
+        store.add_items(items)
+        schema_spec = json.dumps({"properties": schema.properties, "required": schema.required}) if schema else None
+        store.set_meta("options", {"mode": "batch", "schema": schema_spec,
+                                   "output": os.path.join(path, "results.jsonl"), "micro_batch": micro_batch})
+        job = BatchJob(job_id, store, os.path.join(path, "results.jsonl"))
+        with self.lock:
+            self.jobs[job_id] = job
+        threading.Thread(target=self._run_job, args=(job, schema, micro_batch), name=f"job-{job_id}", daemon=True).start()
+        return job
+
+    def _run_job(self, job: BatchJob, schema: ExtractionSchema | None, micro_batch: int):
+        job.status = "running"
+        try:
+            run_job(
+                job.store, self.fetch,
+                lambda document: extract_and_release(document, schema),
+                job.output_path,
+                fetch_workers=self.fetch_workers,
+                llm_workers=self.llm_workers,
+                extract_many_fn=(lambda documents: extract_many_and_release(documents, micro_batch, schema))
+                if micro_batch > 1 else None,
+                group_size=micro_batch,
+                scheduler=get_scheduler(),
+                budget=RetryBudget(),
+            )
+            job.status = "done"
+        except Exception as e:
+            logger.exception("Batch job %s failed", job.id)
+            job.status, job.error = "failed", str(e)
+        finally:
+            job.finished = time.time()
+
+    def job(self, job_id: str) -> BatchJob | None:
+        with self.lock:
+            job = self.jobs.get(job_id)
+        path = os.path.join(self.job_dir, job_id)
+        if job is None and job_id.isalnum() and os.path.exists(os.path.join(path, "job.sqlite")):
+            # A job from before a restart: its results are on disk, but nothing is running it any more.
+            job = BatchJob(job_id, JobStore(os.path.join(path, "job.sqlite"), self.max_attempts),
+                           os.path.join(path, "results.jsonl"))
+            counts = job.store.summary()
+            job.status = "interrupted" if counts["pending"] or counts["fetched"] else "done"
+            with self.lock:
+                job = self.jobs.setdefault(job_id, job)
+        return job
+
+    def health(self) -> dict:
+        with self.lock:
+            running = sum(job.status in ("queued", "running") for job in self.jobs.values())
+        return {"status": "ok", "uptime": round(time.time() - self.started, 1), "jobs_running": running,
+                "open_circuits": open_circuits()}
+
+
+def _parse_schema(spec) -> ExtractionSchema | None:
+    if spec in (None, "", {}, []):
+        return None
+    try:
+        if isinstance(spec, str):
+            if os.path.isfile(spec):
+                raise ValueError("schema must be given inline, not as a path on the server")
+            return load_schema(spec)
+        return ExtractionSchema.from_json(spec)
+    except (ValueError, TypeError) as e:
+        raise RequestError(400, f"invalid schema: {e}")
+
+
+def _parse_url(value) -> str:
+    if not isinstance(value, str) or not value.strip().startswith(('http://', 'https://')):
+        raise RequestError(400, "url must start with http:// or https://")
+    return value.strip()
+
+
+def _batch_items(urls) -> list[tuple[str, str]]:
+    # Accepts plain URLs or {"id": ..., "url": ...} objects, like a --batch JSONL file.
+    if not isinstance(urls, list) or not urls:
+        raise RequestError(400, "urls must be a non-empty list")
+    if len(urls) > MAX_BATCH_URLS:
+        raise RequestError(413, f"at most {MAX_BATCH_URLS} URLs per batch")
+    items, seen = [], set()
+    for position, entry in enumerate(urls, 1):
+        item_id, url = str(position), entry
+        if isinstance(entry, dict):
+            url = entry.get("url")
+            item_id = str(entry.get("id", item_id))
+        if item_id in seen:
+            raise RequestError(400, f"duplicate id {item_id!r}")
+        seen.add(item_id)
+        items.append((item_id, _parse_url(url)))
+    return items
+
+
+def make_handler(service: ExtractionService):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            parts = urlsplit(self.path)
+            path = parts.path.rstrip("/")
+            if path == "/health":
+                self._json(200, service.health())
+            elif path == "/metrics":
+                self._send(200, render_prometheus().encode('utf-8'), "text/plain; version=0.0.4; charset=utf-8")
+            elif path.startswith("/jobs/"):
+                job = service.job(path[len("/jobs/"):])
+                if job is None:
+                    self._json(404, {"error": "unknown job"})
+                    return
+                with_results = job.status not in ("queued", "running") or parse_qs(parts.query).get("results") == ["1"]
+                self._json(200, job.summary(with_results))
+            else:
+                self._json(404, {"error": "not found"})
+
+        def do_POST(self):
+            path = urlsplit(self.path).path.rstrip("/")
+            try:
+                with budget_scope(RetryBudget()):  # one retry budget per request
+                    self._dispatch(path, self._body())
+            except RequestError as e:
+                self._json(e.status, {"error": str(e)})
+            except CircuitOpenError as e:
+                self._json(503, {"error": str(e)})
+            except (json.JSONDecodeError, SchemaValidationError) as e:
+                self._json(422, {"error": f"the model's answer could not be used: {e}"})
+            except Exception as e:
+                logger.exception("%s failed", path)
+                self._json(500 if classify(e) == TERMINAL else 503, {"error": str(e), "kind": classify(e)})
+
+        def _dispatch(self, path: str, body: dict):
+            if path == "/extract":
+                self._json(200, service.extract(_parse_url(body.get("url")), _parse_schema(body.get("schema"))))
+            elif path == "/extract/batch":
+                micro_batch = body.get("micro_batch", MICRO_BATCH_MAX_DOCS)
+                if not isinstance(micro_batch, int) or micro_batch < 1:
+                    raise RequestError(400, "micro_batch must be a positive integer")
+                job = service.submit_batch(_batch_items(body.get("urls")), _parse_schema(body.get("schema")),
+                                           micro_batch)
+                self._json(202, {"job_id": job.id, "status": job.status, "status_url": f"/jobs/{job.id}"})
+            elif path == "/ask":
+                question = body.get("question")
+                if not isinstance(question, str) or not question.strip():
+                    raise RequestError(400, "question is required")
+                text = body.get("text")
+                if text is not None and not isinstance(text, str):
+                    raise RequestError(400, "text must be a string")
+                url = None if text is not None else _parse_url(body.get("url"))
+                self._json(200, service.ask(question.strip(), url, text))
+            else:
+                self._json(404, {"error": "not found"})
+
+        def _body(self) -> dict:
+            length = int(self.headers.get("Content-Length") or 0)
+            if length > MAX_BODY_BYTES:
+                raise RequestError(413, "request body too large")
+            try:
+                body = json.loads(self.rfile.read(length) or b"{}")
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                raise RequestError(400, "request body must be JSON")
+            if not isinstance(body, dict):
+                raise RequestError(400, "request body must be a JSON object")
+            return body
+
+        def _json(self, status: int, payload: dict):
+            self._send(status, json.dumps(payload, ensure_ascii=False).encode('utf-8'), "application/json")
+
+        def _send(self, status: int, data: bytes, content_type: str):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            logger.info("%s " + format, self.address_string(), *args)
+
+    return Handler
+
+
+def serve(service: ExtractionService, host: str = SERVICE_HOST, port: int = SERVICE_PORT) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="gaia-service", daemon=True).start()
+    return server
+
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(description="GAIA extraction service (HTTP API)")
+    parser.add_argument("--host", default=SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    parser.add_argument("--fetch-workers", type=int, default=FETCH_WORKERS, help="concurrent page fetches per batch job (also the driver pool size)")
+    parser.add_argument("--llm-workers", type=int, default=LLM_WORKERS, help="concurrent Gaia extraction calls per batch job")
+    parser.add_argument("--max-attempts", type=int, default=MAX_ATTEMPTS, help="attempts per URL before a batch job gives up on it")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    print("========================================================")
+    print("✨ GAIA 🤖 : Extraction Service Starting ✨")
+    service_obj = None
+    try:
+        service_obj = get_chrome_service()
+        print(f"GAIA 🤖 : Using Chrome Driver at {service_obj.path}. ✅")
+    except Exception as e:
+        print(f"GAIA 🤖 : Error locating Chrome Driver: {e}. Pages that need a browser will fail. ⚠️")
+    service = ExtractionService(service_obj, args.fetch_workers, args.llm_workers, max_attempts=args.max_attempts)
+    try:
+        server = serve(service, args.host, args.port)
+    except OSError as e:
+        print(f"GAIA 🤖 : Could not listen on {args.host}:{args.port}: {e} ❌")
+        return 1
+    print(f"GAIA 🤖 : Listening on http://{args.host}:{server.server_port} (Ctrl-C to stop) 🌐")
+    print("========================================================")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        print("\nGAIA 🤖 : Shutting down. Goodbye! 👋")
+        server.shutdown()
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
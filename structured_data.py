@@ -0,0 +1,284 @@
+# DETERMINISTIC PRE-EXTRACTION OF JSON-LD, MICRODATA AND OPENGRAPH DATA FROM THE RAW PAGE SOURCE.
+
+# Text cleaning drops every <script> tag, including application/ld+json, yet that is where most
+# shops and news sites already publish name, price, availability, rating and author. This module
+# reads it from the raw HTML into the same keys UNIVERSAL_SYSTEM_PROMPT asks for. When the fields
+# that matter for the detected page type are all present the Gaia call is skipped; otherwise the
+# model is only asked for the fields that are still missing.
+
+import os
+import re
+import json
+import html
+import logging
+from schema import ExtractionSchema
+from instrumentation import span
+
+try:
+    from lxml import html as lxml_html
+except ImportError:
+    lxml_html = None
+
+logger = logging.getLogger(__name__)
+
+STRUCTURED_DATA_ENABLED = os.getenv("GAIA_STRUCTURED_DATA", "1") != "0"
+MIN_PREFILLED_FIELDS = 2
+
+UNIVERSAL_FIELDS = {
+    "title": {"description": "The main title of the page or content"},
+    "summary": {"description": "A concise 2-4 sentence overview of the page's main topic or purpose"},
+    "main_content_type": {"description": 'The page\'s primary content type, e.g. "article", "product listing", "blog post", "recipe"'},
+    "author": {"description": "The author's name for articles or blogs"},
+    "publication_date": {"description": "The date the content was published, YYYY-MM-DD if possible"},
+    "product_name": {"description": "The name of the product"},
+    "price": {"description": 'The current price including currency symbol, e.g. "$199.99"; the lowest if a range is shown'},
+    "currency": {"description": 'The currency of the price, e.g. "USD", "INR", "EUR"'},
+    "availability": {"description": 'Stock status, e.g. "In Stock", "Out of Stock"'},
+    "rating": {"description": 'The average rating, e.g. "4.5 out of 5 stars"'},
+    "number_of_reviews": {"description": "The total number of reviews"},
+    "key_details": {"type": ["array", "null"], "description": "A short list (3-5 items) of the most important facts or features"},
+}
+# Fields that must be present before the LLM call can be skipped, and the fields worth asking for.
+REQUIRED_FIELDS = {
+    "product listing": ("title", "product_name", "price", "currency", "availability", "summary"),
+    "article": ("title", "author", "publication_date", "summary"),
+    "blog post": ("title", "author", "publication_date", "summary"),
+}
+TYPE_FIELDS = {
+    "product listing": ("title", "summary", "main_content_type", "product_name", "price", "currency", "availability",
+                        "rating", "number_of_reviews", "key_details"),
+    "article": ("title", "summary", "main_content_type", "author", "publication_date", "key_details"),
+    "blog post": ("title", "summary", "main_content_type", "author", "publication_date", "key_details"),
+}
+CONTENT_TYPES = {
+    "product": "product listing", "productgroup": "product listing",
+    "article": "article", "newsarticle": "article", "report": "article", "scholarlyarticle": "article",
+    "techarticle": "article", "blogposting": "blog post", "recipe": "recipe", "faqpage": "FAQ",
+}
+CURRENCY_SYMBOLS = {"USD": "$", "EUR": "€", "GBP": "£", "INR": "₹", "JPY": "¥"}
+AVAILABILITY = {"instock": "In Stock", "outofstock": "Out of Stock", "limitedavailability": "Limited Stock",
+                "soldout": "Sold Out", "preorder": "Pre-Order", "backorder": "Back Order", "discontinued": "Discontinued"}
+
+_JSON_LD_RE = re.compile(r'<script[^>]*type\s*=\s*["\']?application/ld\+json["\']?[^>]*>(.*?)</script>', re.I | re.S)
+_META_RE = re.compile(r'<meta\s[^>]*>', re.I)
+_ATTR_RE = re.compile(r'([\w:.-]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\')')
+
+
+def _first(value):
+    if isinstance(value, list):
+        return _first(value[0]) if value else None
+    return value
+
+
+def _text(value) -> str | None:
+    value = _first(value)
+    if isinstance(value, dict):
+        value = value.get("name") or value.get("@value")
+    if value is None:
+        return None
+    value = ' '.join(str(value).split())
+    return value or None
+
+
+def _type_of(node: dict) -> str | None:
+    types = node.get("@type") or node.get("type")
+    for t in (types if isinstance(types, list) else [types]):
+        name = str(t or "").rsplit("/", 1)[-1].lower()
+        if name in CONTENT_TYPES:
+            return name
+    return None
+
+
+def _walk(data):
+    # Yields every JSON-LD node, flattening @graph containers and nested lists.
+    if isinstance(data, list):
+        for item in data:
+            yield from _walk(item)
+    elif isinstance(data, dict):
+        yield data
+        if "@graph" in data:
+            yield from _walk(data["@graph"])
+        if "mainEntity" in data:
+            yield from _walk(data["mainEntity"])
+
+
+def _number(value):
+    try:
+        number = float(str(_first(value)).replace(",", ""))
+    except (TypeError, ValueError):
+        return None
+    return int(number) if number.is_integer() else number
+
+
+def _format_price(amount, currency: str | None) -> str | None:
+    number = _number(amount)
+    if number is None:
+        return _text(amount)
+    formatted = f"{number:,.2f}" if isinstance(number, float) or currency else str(number)
+    symbol = CURRENCY_SYMBOLS.get((currency or "").upper())
+    if symbol:
+        return f"{symbol}{formatted}"
+    return f"{formatted} {currency}" if currency else formatted
+
+
+def _availability(value) -> str | None:
+    value = _text(value)
+    if not value:
+        return None
+    name = value.rsplit("/", 1)[-1]  # "https://schema.org/InStock" -> "InStock"
+    return AVAILABILITY.get(name.lower(), re.sub(r'(?<=[a-z])(?=[A-Z])', ' ', name))
+
+
+def _map_node(node: dict) -> dict:
+    kind = _type_of(node)
+    fields = {"main_content_type": CONTENT_TYPES[kind]}
+    if CONTENT_TYPES[kind] == "product listing":
+        fields["product_name"] = _text(node.get("name"))
+        fields["title"] = fields["product_name"]
+        offers = _first(node.get("offers")) or {}
+        if isinstance(offers, dict):
+            currency = _text(offers.get("priceCurrency"))
+            amount = offers.get("price") or offers.get("lowPrice")
+            if amount is None and isinstance(offers.get("priceSpecification"), dict):
+                amount = offers["priceSpecification"].get("price")
+                currency = currency or _text(offers["priceSpecification"].get("priceCurrency"))
+            fields["price"] = _format_price(amount, currency) if amount is not None else None
+            fields["currency"] = currency
+            fields["availability"] = _availability(offers.get("availability"))
+        rating = node.get("aggregateRating")
+        if isinstance(rating, dict):
+            value = _number(rating.get("ratingValue"))
+            best = _number(rating.get("bestRating")) or 5
+            fields["rating"] = f"{value} out of {best} stars" if value is not None else None
+            fields["number_of_reviews"] = _number(rating.get("reviewCount") or rating.get("ratingCount"))
+    else:
+        fields["title"] = _text(node.get("headline") or node.get("name"))
+        author = node.get("author") or node.get("creator")
+        if isinstance(author, list):
+            fields["author"] = ", ".join(filter(None, (_text(a) for a in author))) or None
+        else:
+            fields["author"] = _text(author)
+        published = _text(node.get("datePublished") or node.get("dateCreated"))
+        fields["publication_date"] = published[:10] if published and re.match(r'\d{4}-\d{2}-\d{2}', published) else published
+    fields["summary"] = _text(node.get("description"))
+    return fields
+
+
+def _json_ld_nodes(page_source: str) -> list[dict]:
+    nodes = []
+    for block in _JSON_LD_RE.findall(page_source):
+        block = block.strip().removeprefix("<!--").removesuffix("-->").strip()
+        try:
+            data = json.loads(block, strict=False)
+        except json.JSONDecodeError:
+            continue
+        nodes.extend(_walk(data))
+    return nodes
+
+
+def _microdata_item(element) -> dict:
+    item = {"@type": element.get("itemtype", "")}
+    for prop in element.iterdescendants():
+        name = prop.get("itemprop")
+        if not name:
+            continue
+        # Only direct properties: skip ones that belong to a nested itemscope.
+        owner = prop.getparent()
+        while owner is not None and owner is not element and owner.get("itemscope") is None:
+            owner = owner.getparent()
+        if owner is not element:
+            continue
+        if prop.get("itemscope") is not None:
+            value = _microdata_item(prop)
+        else:
+            value = prop.get("content") or prop.get("datetime") or prop.get("href") or prop.get("src") or prop.text_content()
+        item.setdefault(name, value)
+    return item
+
+
+def _microdata_nodes(page_source: str) -> list[dict]:
+    if lxml_html is None or "itemscope" not in page_source:
+        return []
+    try:
+        root = lxml_html.fromstring(page_source)
+    except (ValueError, TypeError) as e:
+        logger.debug("Could not parse page for microdata: %s", e)
+        return []
+    return [_microdata_item(el) for el in root.xpath("//*[@itemscope and not(@itemprop)]")]
+
+
+def _opengraph_fields(page_source: str) -> dict:
+    meta = {}
+    for tag in _META_RE.findall(page_source):
+        attrs = {k.lower(): html.unescape(v1 or v2) for k, v1, v2 in _ATTR_RE.findall(tag)}
+        key = (attrs.get("property") or attrs.get("name") or "").lower()
+        if key and "content" in attrs:
+            meta.setdefault(key, attrs["content"])
+    og_type = meta.get("og:type", "").lower()
+    fields = {
+        "title": _text(meta.get("og:title")),
+        "summary": _text(meta.get("og:description")),
+    }
+    if og_type.startswith("product"):
+        currency = _text(meta.get("product:price:currency") or meta.get("og:price:currency"))
+        amount = meta.get("product:price:amount") or meta.get("og:price:amount")
+        fields.update({
+            "main_content_type": "product listing",
+            "product_name": fields["title"],
+            "price": _format_price(amount, currency) if amount else None,
+            "currency": currency,
+            "availability": _availability(meta.get("product:availability") or meta.get("og:availability")),
+        })
+    elif og_type == "article":
+        published = _text(meta.get("article:published_time"))
+        fields.update({
+            "main_content_type": "article",
+            "author": _text(meta.get("article:author") or meta.get("author")),
+            "publication_date": published[:10] if published else None,
+        })
+    return fields
+
+
+def harvest(page_source: str | None) -> dict:
+    # JSON-LD first, then microdata, then OpenGraph; earlier sources win for each field.
+    if not STRUCTURED_DATA_ENABLED or not page_source:
+        return {}
+    result = {}
+    with span("parse") as fields:
+        for node in _json_ld_nodes(page_source) + _microdata_nodes(page_source):
+            if _type_of(node):
+                for key, value in _map_node(node).items():
+                    if value is not None and result.get(key) is None:
+                        result[key] = value
+        for key, value in _opengraph_fields(page_source).items():
+            if value is not None and result.get(key) is None:
+                result[key] = value
+        fields["structured_fields"] = len(result)
+    return result
+
+
+def reduce_extraction(structured: dict | None, schema: ExtractionSchema | None = None) -> tuple[dict, ExtractionSchema | None]:
+    # Returns (prefilled fields, schema for what is still missing). An empty dict means the page
+    # had too little structured data to help; a None schema means the LLM call can be skipped.
+    structured = structured or {}
+    if schema is not None:
+        prefilled = {name: structured[name] for name in schema.properties if structured.get(name) is not None}
+        if not prefilled:
+            return {}, None
+        missing = {name: spec for name, spec in schema.properties.items() if name not in prefilled}
+        required = [name for name in schema.required if name in missing]
+        return prefilled, (ExtractionSchema(missing, required) if missing else None)
+
+    content_type = structured.get("main_content_type")
+    if content_type not in REQUIRED_FIELDS or len(structured) < MIN_PREFILLED_FIELDS:
+        return {}, None
+    prefilled = {name: value for name, value in structured.items() if value is not None}
+    if all(prefilled.get(name) is not None for name in REQUIRED_FIELDS[content_type]):
+        return prefilled, None
+    missing = {name: UNIVERSAL_FIELDS[name] for name in TYPE_FIELDS[content_type] if name not in prefilled}
+    return prefilled, ExtractionSchema(missing)
+
+
+def merge_prefilled(prefilled: dict, extracted: dict) -> dict:
+    # The model only filled the gaps: its nulls must not overwrite values the page already published.
+    return {**prefilled, **{key: value for key, value in extracted.items() if value is not None}}
@@ -0,0 +1,68 @@
+from urllib.parse import urlsplit
+from driver_pool import DriverPool, PooledDriver
+
+
+def origin_of(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+class FakeBrowser:
+    # One tab of a CDP-capable browser: a page with iframes, cookies for every site it touched and
+    # storage kept per origin, so a reset is judged by what is left afterwards.
+    def __init__(self, cdp: bool = True):
+        self.cdp = cdp
+        self.window_handles = ["main"]
+        self.switch_to = self
+        self.url = "about:blank"
+        self.frames = []
+        self.cookies = set()
+        self.storage = {}
+
+    def visit(self, url: str, frames: tuple[str, ...] = ()):
+        self.url, self.frames = url, list(frames)
+        for page in (url, *frames):
+            self.cookies.add(urlsplit(page).hostname)
+            self.storage.setdefault(origin_of(page), {})["seen"] = "1"
+
+    def window(self, handle):
+        pass
+
+    def execute_script(self, script):
+        pass  # page-level clear() only reaches the top document, which a real reset cannot rely on
+
+    def execute_cdp_cmd(self, cmd, params):
+        if not self.cdp:
+            raise RuntimeError("no CDP")
+        if cmd == "Page.getFrameTree":
+            node = lambda url, children=(): {"frame": {"url": url, "securityOrigin": origin_of(url)},
+                                             "childFrames": list(children)}
+            return {"frameTree": node(self.url, [node(frame) for frame in self.frames])}
+        if cmd == "Network.clearBrowserCookies":
+            self.cookies.clear()
+        elif cmd == "Storage.clearDataForOrigin":
+            self.storage.pop(params["origin"], None)  # exact origins only, like Chrome
+        return {}
+
+    def delete_all_cookies(self):
+        self.cookies = {host for host in self.cookies if host != urlsplit(self.url).hostname}
+
+    def get(self, url):
+        self.url, self.frames = url, []
+
+
+def test_reset_clears_cookies_and_storage_of_page_and_iframes():
+    browser = FakeBrowser()
+    browser.visit("https://shop.test/item", frames=("https://reviews.test/widget", "https://pay.test/frame"))
+    DriverPool(service=None)._reset(PooledDriver(browser))
+    assert browser.cookies == set()
+    assert browser.storage == {}
+    assert browser.url == "about:blank"
+
+
+def test_reset_without_cdp_falls_back_to_webdriver_cookies():
+    browser = FakeBrowser(cdp=False)
+    browser.visit("https://shop.test/item")
+    DriverPool(service=None)._reset(PooledDriver(browser))
+    assert browser.cookies == set()
+    assert browser.url == "about:blank"
@@ -0,0 +1,51 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import fetcher
+from text_extract import clean_html
+
+PAGE = ("<html><head><title>Café menu</title></head><body>"
+        + "<p>Café au lait, crème brûlée and masala chai for ₹1,299 a month.</p>" * 20 + "</body></html>")
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(body: bytes, content_type: str) -> str:
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_port}/page"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def no_http_cache(monkeypatch):
+    monkeypatch.setattr(fetcher, "get_http_cache", lambda: None)
+
+
+def test_utf8_page_without_charset_header(serve):
+    html, _ = fetcher.fetch_static(serve(PAGE.encode("utf-8"), "text/html"))
+    assert "Café au lait, crème brûlée and masala chai for ₹1,299" in clean_html(html)
+
+
+def test_meta_charset_is_used_when_header_has_none(serve):
+    page = PAGE.replace("₹", "EUR ").replace("<head>", "<head><meta charset='windows-1252'>")
+    html, _ = fetcher.fetch_static(serve(page.encode("cp1252"), "text/html"))
+    assert "crème brûlée" in html
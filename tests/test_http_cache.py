@@ -0,0 +1,26 @@
+import sqlite3
+from http_cache import ConditionalCache
+
+
+def test_structured_data_survives_a_304(tmp_path):
+    cache = ConditionalCache(str(tmp_path / "http.sqlite"))
+    url = "https://shop.test/item"
+    structured = {"product_name": "Trail Shoe", "price": "$89.00"}
+    cache.store_validators(url, '"v1"', None, 2048)
+    cache.store_text(url, "Trail Shoe $89.00", structured)
+    assert cache.conditional_headers(url) == {"If-None-Match": '"v1"'}
+    assert cache.not_modified(url) == "Trail Shoe $89.00"
+    assert cache.structured(url) == structured
+
+
+def test_cache_files_without_structured_column_are_upgraded(tmp_path):
+    path = str(tmp_path / "http.sqlite")
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE pages (url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, body_bytes INTEGER NOT NULL,"
+               " text TEXT, updated_at REAL NOT NULL)")
+    db.execute("INSERT INTO pages VALUES ('https://a.test', '\"x\"', NULL, 10, 'old text', 0)")
+    db.commit()
+    db.close()
+    cache = ConditionalCache(path)
+    assert cache.not_modified("https://a.test") == "old text"
+    assert cache.structured("https://a.test") == {}
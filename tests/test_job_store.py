@@ -0,0 +1,40 @@
+import json
+from job_store import JobStore, run_job
+
+ITEMS = [("a", "https://shop.test/a"), ("b", "https://shop.test/b"), ("c", "https://shop.test/c")]
+
+
+def test_resume_skips_extracted_and_keeps_interrupted_items(tmp_path):
+    path = str(tmp_path / "job.sqlite")
+    store = JobStore(path)
+    assert store.add_items(ITEMS) == 3
+    store.complete("a", {"title": "A"})
+    store.mark_fetched("b")  # the run stopped while "b" was being extracted
+    store.close()
+
+    resumed = JobStore(path)
+    assert resumed.add_items(ITEMS) == 0
+    assert resumed.due_items() == ITEMS[1:]
+    assert resumed.summary()["extracted"] == 1
+
+
+def test_run_job_retries_transient_failures_and_gives_up_on_terminal_ones(tmp_path):
+    store = JobStore(str(tmp_path / "job.sqlite"), max_attempts=3, backoff=0)
+    store.add_items(ITEMS)
+    calls = {}
+
+    def extract(page: str) -> dict:
+        calls[page] = calls.get(page, 0) + 1
+        if page.endswith("/b") and calls[page] == 1:
+            raise TimeoutError("node busy")
+        if page.endswith("/c"):
+            raise ValueError("unparseable answer")
+        return {"url": page}
+
+    summary = run_job(store, lambda url: url, extract, str(tmp_path / "out.jsonl"), fetch_workers=1, llm_workers=1)
+    assert (summary["extracted"], summary["failed"], summary["gave_up"]) == (2, 1, 1)
+    assert calls == {"https://shop.test/a": 1, "https://shop.test/b": 2, "https://shop.test/c": 1}
+
+    export = tmp_path / "export.jsonl"
+    assert store.export(str(export)) == 2
+    assert [json.loads(line)["id"] for line in export.read_text().splitlines()] == ["a", "b"]
@@ -0,0 +1,42 @@
+import json
+from types import SimpleNamespace
+import pytest
+from json_repair import load_llm_json, parse_json
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"price": 10}', {"price": 10}),
+    ('Here you go:\n```json\n{"price": 10}\n```', {"price": 10}),
+    ('{"price": 10,}\nHope this helps!', {"price": 10}),
+    ("{'title': 'Mug', 'stock': True, 'sale': None}", {"title": "Mug", "stock": True, "sale": None}),
+    ('{"tags": ["a", "b",], "x": 1', {"tags": ["a", "b"], "x": 1}),
+    ('{"title": "Mug", "specs": {"weight": "300g"}, "description": "Hand-thrown st',
+     {"title": "Mug", "specs": {"weight": "300g"}}),
+])
+def test_parse_json_repairs_common_model_mistakes_locally(text, expected):
+    assert parse_json(text) == expected
+
+
+def test_parse_json_raises_when_nothing_is_recoverable():
+    with pytest.raises(json.JSONDecodeError):
+        parse_json("I could not find a product on this page.")
+
+
+def test_load_llm_json_asks_the_model_to_fix_its_own_output():
+    sent = []
+
+    def chat(**kwargs):
+        sent.append(kwargs)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content='{"price": 10}'))])
+
+    broken = "price: ten dollars"
+    assert load_llm_json(broken, chat=chat, model="m") == {"price": 10}
+    assert len(sent) == 1 and sent[0]["messages"][-1]["content"] == broken
+
+
+def test_load_llm_json_keeps_the_original_error_when_the_repair_call_fails():
+    def chat(**kwargs):
+        raise TimeoutError("node busy")
+
+    with pytest.raises(json.JSONDecodeError):
+        load_llm_json("price: ten dollars", chat=chat, model="m")
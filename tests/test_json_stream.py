@@ -0,0 +1,27 @@
+import json
+from json_stream import IncrementalJSONParser, stream_json_fields
+
+ANSWER = {"title": "Trail Shoe {v2}", "price": "$89.00", "specs": {"weight": "300 g", "sizes": [40, 41]},
+          "summary": "A \"light\" shoe, for trails."}
+
+
+def test_fields_are_emitted_as_soon_as_they_close():
+    text = "```json\n" + json.dumps(ANSWER) + "\n```"
+    sent, seen = [], []
+
+    def deltas():
+        for i in range(0, len(text), 5):
+            sent.append(text[i:i + 5])
+            yield text[i:i + 5]
+
+    raw, fields = stream_json_fields(deltas(), lambda key, value: seen.append((key, value, len(sent))))
+    assert raw == text and fields == ANSWER
+    assert [key for key, _, _ in seen] == list(ANSWER)
+    assert seen[0][2] < len(sent) // 2  # the title arrived long before the end of the stream
+
+
+def test_parser_stops_at_the_closing_brace():
+    parser = IncrementalJSONParser()
+    assert parser.feed('Sure! {"a": 1, "b": [1, {"c": "}"}]') == [("a", 1)]
+    assert parser.feed('} trailing {"ignored": true}') == [("b", [1, {"c": "}"}])]
+    assert parser.done and parser.fields == {"a": 1, "b": [1, {"c": "}"}]}
@@ -0,0 +1,60 @@
+import uuid
+import asyncio
+from types import SimpleNamespace
+import llm_gateway
+from llm_gateway import LLMGateway
+
+
+def streaming_gateway(usage):
+    sent = {}
+
+    async def chunks():
+        for piece in ("hello ", "world"):
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))], usage=None)
+        if usage is not None:
+            yield SimpleNamespace(choices=[], usage=usage)
+
+    async def create(**kwargs):
+        sent.update(kwargs)
+        return chunks()
+
+    gateway = LLMGateway(f"http://{uuid.uuid4().hex}.test/v1", "key")
+    gateway.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    return gateway, sent
+
+
+def stream_text(gateway) -> str:
+    async def run():
+        return "".join([d async for d in gateway.astream_chat(model="m", messages=[{"role": "user", "content": "hi"}])])
+    return asyncio.run(run())
+
+
+def test_stream_records_usage_from_final_chunk():
+    gateway, sent = streaming_gateway(SimpleNamespace(prompt_tokens=120, completion_tokens=7))
+    assert stream_text(gateway) == "hello world"
+    assert sent["stream_options"] == {"include_usage": True}
+    assert (gateway.stats["prompt_tokens"], gateway.stats["completion_tokens"]) == (120, 7)
+
+
+def test_stream_without_usage_falls_back_to_estimate():
+    gateway, _ = streaming_gateway(None)
+    assert stream_text(gateway) == "hello world"
+    assert gateway.stats["completion_tokens"] == len("hello world") // 4 + 1
+
+
+def test_retry_with_zero_backoff_is_still_retried(monkeypatch):
+    monkeypatch.setattr(llm_gateway, "backoff_delay", lambda attempt: 0.0)
+    calls = []
+
+    async def create(**kwargs):
+        calls.append(kwargs)
+        if len(calls) == 1:
+            raise TimeoutError("node busy")
+        return SimpleNamespace(usage=SimpleNamespace(prompt_tokens=10, completion_tokens=2))
+
+    gateway = LLMGateway(f"http://{uuid.uuid4().hex}.test/v1", "key")
+    gateway.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    response = asyncio.run(gateway.achat(model="m", messages=[{"role": "user", "content": "hi"}]))
+    assert response.usage.prompt_tokens == 10
+    assert len(calls) == 2 and gateway.stats["retries"] == 1
+    assert gateway.breaker.failures == 0  # the success after the retry closed the failure streak
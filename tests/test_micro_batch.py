@@ -0,0 +1,30 @@
+import os
+import json
+from types import SimpleNamespace
+
+os.environ.setdefault("GAIA_DOMAIN_URL", "http://127.0.0.1:9")
+os.environ.setdefault("GAIA_API_KEY", "test")
+os.environ.setdefault("MODEL", "test-model")
+
+import extractor
+from document import Document
+from schema import ExtractionSchema
+
+
+def test_batched_answers_are_coerced_like_single_ones(monkeypatch):
+    schema = ExtractionSchema({"title": {"type": "string"}, "number_of_reviews": {"type": "integer"}})
+    requests = []
+
+    def chat(**kwargs):
+        requests.append(kwargs)
+        answer = {"doc0": {"title": "Trail Shoe", "number_of_reviews": "120"},
+                  "doc1": {"title": "Road Shoe", "number_of_reviews": "1,045"}}
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=json.dumps(answer)))])
+
+    monkeypatch.setattr(extractor, "client", SimpleNamespace(chat=chat))
+    monkeypatch.setattr(extractor, "get_extraction_cache", lambda: None)
+    documents = [Document(f"https://shop.test/{name}", f"{name} shoe, lightweight mesh upper.", "http")
+                 for name in ("trail", "road")]
+    results = extractor.extract_many_and_release(documents, schema=schema)
+    assert results == [{"title": "Trail Shoe", "number_of_reviews": 120}, {"title": "Road Shoe", "number_of_reviews": 1045}]
+    assert len(requests) == 1  # no page fell back to a request of its own
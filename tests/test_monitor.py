@@ -0,0 +1,14 @@
+from monitor import diff_json
+
+
+def test_null_field_only_in_new_result_is_not_a_change():
+    old = {"title": "Trail Shoe"}
+    new = {"title": "Trail Shoe", "rating": None}
+    assert diff_json(old, new) == {"added": {}, "removed": {}, "changed": {}}
+
+
+def test_removed_and_changed_fields():
+    old = {"title": "Trail Shoe", "price": "$89.00", "specs": {"weight": "300 g"}}
+    new = {"title": "Trail Shoe", "specs": {"weight": "280 g"}}
+    assert diff_json(old, new) == {"added": {}, "removed": {"price": "$89.00"},
+                                   "changed": {"specs.weight": {"old": "300 g", "new": "280 g"}}}
@@ -0,0 +1,51 @@
+import time
+import threading
+from contextlib import contextmanager
+import pytest
+import fetcher
+from politeness import HostThrottled, PolitenessScheduler
+
+
+class FakePool:
+    def __init__(self, status):
+        self.status = status
+        self.loads = []
+
+    @contextmanager
+    def driver(self, timeout=None):
+        yield self
+
+
+def test_pace_keeps_the_host_gap():
+    scheduler = PolitenessScheduler(delay=0.2)
+    started = time.monotonic()
+    scheduler.pace("https://shop.test/a")
+    scheduler.pace("https://shop.test/b")
+    scheduler.pace("https://other.test/a")  # another host is not held back
+    assert 0.2 <= time.monotonic() - started < 0.4
+
+
+def test_browser_429_raises_and_widens_the_gap(monkeypatch):
+    scheduler = PolitenessScheduler(delay=0.1)
+    pool = FakePool(429)
+    monkeypatch.setattr(fetcher, "get_scheduler", lambda: scheduler)
+    monkeypatch.setattr(fetcher, "load_page", lambda driver, url, timeout: driver.loads.append(url) or "<html></html>")
+    monkeypatch.setattr(fetcher, "navigation_status", lambda driver: driver.status)
+    with pytest.raises(HostThrottled):
+        fetcher.fetch_in_browser(pool, "https://shop.test/item", 5)
+    host = scheduler.summary()["shop.test"]
+    assert host["throttled"] == 1 and host["delay"] >= 1.0
+    assert pool.loads == ["https://shop.test/item"]
+
+
+def test_fetch_queue_put_blocks_while_full():
+    queue = PolitenessScheduler(delay=0).queue(maxsize=2)
+    queue.put("a", "https://shop.test/a")
+    queue.put("b", "https://other.test/b")
+    third = threading.Thread(target=queue.put, args=("c", "https://shop.test/c"), daemon=True)
+    third.start()
+    third.join(0.1)
+    assert third.is_alive()
+    assert queue.get() == ("a", "https://shop.test/a")
+    third.join(1)
+    assert not third.is_alive()
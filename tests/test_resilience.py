@@ -0,0 +1,103 @@
+import uuid
+import asyncio
+from types import SimpleNamespace
+import httpx
+import openai
+import pytest
+import llm_gateway
+from llm_gateway import LLMGateway
+import threading
+from resilience import UNREACHABLE, RetryBudget, budget_scope, call_with_retries, get_breaker, with_budget
+
+
+def half_open_breaker(name):
+    breaker = get_breaker(name)
+    breaker.reset_timeout = 0
+    breaker.record_failure(UNREACHABLE)
+    assert breaker.state == "half_open"
+    return breaker
+
+
+def fake_gateway(create):
+    gateway = LLMGateway(f"http://{uuid.uuid4().hex}.test/v1", "key")
+    gateway.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    half_open_breaker(gateway.base_url)
+    return gateway
+
+
+def test_terminal_error_during_probe_closes_breaker():
+    name = uuid.uuid4().hex
+    breaker = half_open_breaker(name)
+
+    def bad_request():
+        raise ValueError("bad input")
+
+    with pytest.raises(ValueError):
+        call_with_retries(bad_request, name, attempts=3, base_delay=0)
+    assert breaker.state == "closed"
+    assert call_with_retries(lambda: "ok", name) == "ok"
+
+
+def test_rate_limited_probe_counts_as_failure_and_frees_probe(monkeypatch):
+    monkeypatch.setattr(llm_gateway, "RATE_LIMIT_RETRIES", 0)
+    response = httpx.Response(429, headers={"retry-after": "0"}, request=httpx.Request("POST", "http://node.test"))
+
+    async def create(**kwargs):
+        raise openai.RateLimitError("slow down", response=response, body=None)
+
+    async def run():
+        gateway = fake_gateway(create)
+        failures = gateway.breaker.failures
+        with pytest.raises(openai.RateLimitError):
+            await gateway.achat(model="m", messages=[{"role": "user", "content": "hi"}])
+        return gateway.breaker, failures
+
+    breaker, failures = asyncio.run(run())
+    assert breaker.failures == failures + 1
+    assert breaker.allow()  # the next probe is let through instead of failing fast forever
+
+
+def test_cancelled_stream_frees_probe():
+    async def chunks():
+        for piece in ("a", "b", "c"):
+            await asyncio.sleep(0)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))], usage=None)
+
+    async def create(**kwargs):
+        return chunks()
+
+    async def run():
+        gateway = fake_gateway(create)
+        stream = gateway.astream_chat(model="m", messages=[{"role": "user", "content": "hi"}])
+        assert await stream.__anext__() == "a"
+        await stream.aclose()
+        return gateway.breaker
+
+    breaker = asyncio.run(run())
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+
+
+def flaky(calls):
+    def fn():
+        calls.append(1)
+        raise TimeoutError("timed out")
+    return fn
+
+
+def test_retry_budget_is_scoped_per_job():
+    name = uuid.uuid4().hex
+    get_breaker(name).failure_threshold = 100
+    job_budget = RetryBudget(1)
+    calls = []
+    worker = threading.Thread(target=with_budget(
+        lambda: pytest.raises(TimeoutError, call_with_retries, flaky(calls), name, 3, 0), job_budget))
+    worker.start()
+    worker.join()
+    assert (len(calls), job_budget.spent) == (2, 1)  # one retry, then the job's budget ran out
+
+    calls.clear()
+    with budget_scope(RetryBudget(5)) as fresh:  # a new job or user action starts with a full budget
+        with pytest.raises(TimeoutError):
+            call_with_retries(flaky(calls), name, attempts=3, base_delay=0)
+    assert (len(calls), fresh.spent, job_budget.spent) == (3, 2, 1)
@@ -0,0 +1,43 @@
+import pytest
+from schema import ExtractionSchema, SchemaValidationError, load_schema
+
+SCHEMA = {"properties": {"price": {"type": "number"}, "in_stock": {"type": "boolean"},
+                         "colors": {"type": "array"},
+                         "availability": {"type": "string", "enum": ["In Stock", "Sold Out"]},
+                         "title": {"type": "string", "description": "Product name."}},
+          "required": ["title"]}
+
+
+def test_field_list_and_shorthand_forms_compile_to_the_same_schema():
+    listed = load_schema("price:number, title")
+    shorthand = ExtractionSchema.from_json({"price": "number", "title": {}})
+    assert listed.properties == shorthand.properties == {"price": {"type": "number"}, "title": {}}
+    assert listed.hash == shorthand.hash
+
+
+def test_prompt_asks_only_for_the_schema_fields():
+    prompt = ExtractionSchema.from_json(SCHEMA).prompt
+    assert "- **price** (number)" in prompt
+    assert "- **title** (string): Product name. Required." in prompt
+    assert '"In Stock"' in prompt and "summary" not in prompt
+
+
+def test_hash_changes_with_the_schema():
+    assert load_schema("price:number").hash != load_schema("price:string").hash
+
+
+def test_coerce_fixes_unambiguous_type_mistakes():
+    schema = ExtractionSchema.from_json(SCHEMA)
+    answer = {"price": "$1,299.00", "in_stock": "yes", "colors": "red", "availability": "in stock",
+              "title": 42, "extra": "kept for validate() to drop"}
+    assert schema.validate(schema.coerce(answer)) == {"price": 1299.0, "in_stock": True, "colors": ["red"],
+                                                      "availability": "In Stock", "title": "42"}
+
+
+def test_validate_reports_every_mismatch():
+    schema = ExtractionSchema.from_json(SCHEMA)
+    with pytest.raises(SchemaValidationError) as error:
+        schema.validate({"price": "cheap", "availability": "Backorder"})
+    assert error.value.errors == ["price should be number, got str",
+                                  "availability should be one of ['In Stock', 'Sold Out'], got 'Backorder'",
+                                  "title is required"]
@@ -0,0 +1,8 @@
+from structured_data import merge_prefilled
+
+
+def test_model_nulls_do_not_overwrite_harvested_fields():
+    prefilled = {"product_name": "Trail Shoe", "price": "$89.00"}
+    answer = {"price": None, "rating": "4.5 out of 5 stars", "availability": None}
+    assert merge_prefilled(prefilled, answer) == {"product_name": "Trail Shoe", "price": "$89.00",
+                                                  "rating": "4.5 out of 5 stars"}
@@ -0,0 +1,38 @@
+import pytest
+import text_extract
+from text_extract import ENGINES, bs4_clean_text, clean_html, shutdown_clean_pool
+
+PAGE = """<html><head><title>Stoneware Mug</title><style>.x{color:red}</style>
+<script>var price = 1;</script></head><body>
+<nav>Home &rsaquo; Kitchen</nav><noscript>Enable JS</noscript>
+<h1>Stoneware&nbsp;Mug &amp; Saucer</h1>
+<template><p>Hidden variant</p></template>
+<svg><![CDATA[Price: 12 &euro;]]></svg>
+<textarea>Ask <b>a</b> question</textarea>
+<!-- a comment -->
+<p>Caf&eacute; price: &#8377;499</p></body></html>"""
+
+
+@pytest.mark.parametrize("engine", sorted(ENGINES))
+def test_engines_match_bs4_output(engine):
+    assert ENGINES[engine](PAGE) == bs4_clean_text(PAGE)
+
+
+def test_bs4_drops_boilerplate_and_decodes_entities():
+    text = bs4_clean_text(PAGE)
+    assert "Stoneware Mug & Saucer" in text and "Café price: ₹499" in text
+    assert "Ask a question" in text and "Price: 12 &euro;" in text  # textarea and CDATA are literal text
+    for hidden in ("var price", "color:red", "Enable JS", "Hidden variant", "a comment"):
+        assert hidden not in text
+
+
+def test_large_pages_are_cleaned_in_a_worker_process(monkeypatch):
+    if text_extract.CLEAN_WORKERS <= 0:
+        pytest.skip("cleaning workers are disabled")
+    monkeypatch.setattr(text_extract, "PROCESS_MIN_BYTES", 1)
+    try:
+        for engine in ENGINES:
+            assert clean_html(PAGE, engine) == bs4_clean_text(PAGE)
+        assert text_extract._pool is not None
+    finally:
+        shutdown_clean_pool()
@@ -0,0 +1,217 @@
+# HTML -> CLEAN TEXT ENGINES SHARED BY THE CLI, STREAMLIT AND GUI VERSIONS.
+
+# The "bs4" engine is the original BeautifulSoup(html.parser) + decompose() + get_text() path and is
+# kept as the reference for parity checks. The "lxml" engine produces the same text in a single
+# streaming pass: it never builds a tree, it just drops everything inside boilerplate tags while
+# the parser emits text events. Pick one with GAIA_TEXT_ENGINE=auto|lxml|selectolax|bs4.
+# Pages over GAIA_CLEAN_PROCESS_MIN_BYTES are cleaned in a process pool sized to the available cores,
+# so a multi-MB page no longer holds the GIL while fetch threads, the GUI or Streamlit wait. The raw
+# HTML reaches the worker through a shared memory block rather than being pickled.
+
+import os
+import sys
+import atexit
+import logging
+import threading
+import multiprocessing
+from multiprocessing import resource_tracker, shared_memory
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from bs4 import BeautifulSoup
+from instrumentation import span
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as SelectolaxParser
+except ImportError:
+    SelectolaxParser = None
+
+logger = logging.getLogger(__name__)
+
+
+
+def available_cores() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # not available on Windows and macOS
+        return os.cpu_count() or 1
+
+
+SKIP_TAGS = ('script', 'style', 'header', 'footer', 'nav', 'aside', 'noscript', 'template')
+TEXT_ENGINE = os.getenv("GAIA_TEXT_ENGINE", "auto")
+CLEAN_WORKERS = int(os.getenv("GAIA_CLEAN_WORKERS", str(available_cores())))  # 0 = always clean in the calling thread
+PROCESS_MIN_BYTES = int(os.getenv("GAIA_CLEAN_PROCESS_MIN_BYTES", str(512 * 1024)))  # smaller pages are not worth the hand-off
+# Python 3.13+ can attach to a block without registering it with the resource tracker; the parent owns it.
+_ATTACH_OPTIONS = {"track": False} if sys.version_info >= (3, 13) else {}
+# Before that, attaching on POSIX registers the block again, so the worker drops the registration itself.
+_UNREGISTER_ON_ATTACH = not _ATTACH_OPTIONS and os.name != "nt"
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def bs4_clean_text(html: str) -> str:
+    soup = BeautifulSoup(html, 'html.parser')
+    for tag in soup(list(SKIP_TAGS)):
+        tag.decompose()
+    return ' '.join(soup.get_text(separator=' ', strip=True).split())
+
+
+# html.parser only treats <textarea> as raw text on newer Python patch releases; older ones parse tags
+# inside it. lxml and lexbor always keep it raw, so they re-parse it whenever the reference does.
+_TEXTAREA_IS_MARKUP = bs4_clean_text("<textarea><b>x</b></textarea>") == "x"
+
+
+def _cdata(comment: str) -> str | None:
+    # lxml and lexbor report <![CDATA[...]]> outside SVG/MathML as a comment; bs4 keeps it as text.
+    if comment.startswith("[CDATA[") and comment.endswith("]]"):
+        return comment[7:-2]
+    return None
+
+
+class _TextCollector:
+    # lxml parser target: receives start/end/data events, so no tree is ever built. A single
+    # text node can arrive as several data() calls, so spaces are only added at tag boundaries.
+    def __init__(self):
+        self.parts = []
+        self.skip_depth = 0
+        self.textarea = None
+
+    def start(self, tag, attrib):
+        if self.skip_depth or tag in SKIP_TAGS:
+            self.skip_depth += 1
+        elif tag == 'textarea' and _TEXTAREA_IS_MARKUP:
+            self.textarea = []
+        self.parts.append(' ')
+
+    def end(self, tag):
+        if self.skip_depth:
+            self.skip_depth -= 1
+        elif tag == 'textarea' and self.textarea is not None:
+            self.parts.append(' ' + lxml_clean_text(''.join(self.textarea)))
+            self.textarea = None
+        self.parts.append(' ')
+
+    def data(self, data):
+        if self.skip_depth:
+            return
+        if self.textarea is not None:
+            self.textarea.append(data)
+        else:
+            self.parts.append(data)
+
+    def comment(self, text):
+        cdata = None if self.skip_depth else _cdata(text)
+        self.parts.append(' ' if cdata is None else f' {cdata} ')
+
+    def close(self):
+        return ' '.join(''.join(self.parts).split())
+
+
+def lxml_clean_text(html: str) -> str:
+    parser = etree.HTMLParser(target=_TextCollector(), recover=True)
+    parser.feed(html)
+    return parser.close() or ""
+
+
+def selectolax_clean_text(html: str) -> str:
+    tree = SelectolaxParser(html)
+    tree.strip_tags(list(SKIP_TAGS))
+    root = tree.root
+    if root is None:
+        return ""
+    # Collected first: replacing nodes while traverse() is walking them crashes lexbor.
+    special = [node for node in root.traverse(include_text=True)
+               if node.tag == '-comment' or (node.tag == 'textarea' and _TEXTAREA_IS_MARKUP)]
+    for node in special:
+        if node.tag == 'textarea':
+            node.replace_with(selectolax_clean_text(node.text()))
+        elif (cdata := _cdata(node.comment_content or "")) is not None:
+            node.replace_with(cdata)
+    return ' '.join(root.text(separator=' ', strip=True).split())
+
+
+ENGINES = {"bs4": bs4_clean_text}
+if etree is not None:
+    ENGINES["lxml"] = lxml_clean_text
+if SelectolaxParser is not None:
+    ENGINES["selectolax"] = selectolax_clean_text
+
+
+def get_engine(name: str = TEXT_ENGINE):
+    if name == "auto":
+        for candidate in ("lxml", "selectolax", "bs4"):
+            if candidate in ENGINES:
+                return ENGINES[candidate]
+    if name not in ENGINES:
+        logger.warning("Text engine %r is not available, falling back to bs4", name)
+        return bs4_clean_text
+    return ENGINES[name]
+
+
+def _clean_shared(name: str, size: int, engine: str) -> str:
+    # Runs in a worker process and decodes the HTML straight out of the parent's shared memory block.
+    block = shared_memory.SharedMemory(name=name, **_ATTACH_OPTIONS)
+    if _UNREGISTER_ON_ATTACH:
+        resource_tracker.unregister(block._name, "shared_memory")
+    try:
+        with block.buf[:size] as view:
+            html = str(view, 'utf-8')
+    finally:
+        block.close()
+    return get_engine(engine)(html)
+
+
+def get_clean_pool() -> ProcessPoolExecutor | None:
+    global _pool
+    if CLEAN_WORKERS <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            # "spawn" everywhere: forking a process that already runs fetch, gateway and GUI threads is unsafe.
+            _pool = ProcessPoolExecutor(max_workers=CLEAN_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+            logger.info("Started %d HTML cleaning worker processes", CLEAN_WORKERS)
+        return _pool
+
+
+def shutdown_clean_pool(wait: bool = True):
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=wait, cancel_futures=True)
+
+
+atexit.register(shutdown_clean_pool)
+
+
+def _clean_in_process(html: str, engine: str) -> str:
+    data = html.encode('utf-8')
+    size = len(data)
+    block = shared_memory.SharedMemory(create=True, size=max(1, size))  # may be rounded up to a page
+    try:
+        block.buf[:size] = data
+        del data
+        return get_clean_pool().submit(_clean_shared, block.name, size, engine).result()
+    finally:
+        block.close()
+        if _UNREGISTER_ON_ATTACH:
+            # Spawned workers share this process's tracker, so the worker's unregister also dropped ours.
+            resource_tracker.register(block._name, "shared_memory")
+        block.unlink()
+
+
+def clean_html(html: str, engine: str = TEXT_ENGINE) -> str:
+    offload = CLEAN_WORKERS > 0 and len(html) >= PROCESS_MIN_BYTES
+    with span("clean", engine=engine, html_bytes=len(html), process=offload):
+        if offload:
+            try:
+                return _clean_in_process(html, engine)
+            except (BrokenProcessPool, OSError) as e:
+                logger.warning("HTML cleaning worker failed (%s), cleaning in this process instead", e)
+                shutdown_clean_pool(wait=False)
+        return get_engine(engine)(html)